@@ -1,8 +1,27 @@
+import atexit
+import functools
 import importlib.resources as native_importlib_resources
+import os
 import pathlib
 import platform
-from contextlib import contextmanager
-from typing import Iterator
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, contextmanager
+from typing import (
+    IO,
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+
+import gtirb
 
 from .version import __version__
 
@@ -12,7 +31,49 @@ else:
     import importlib_resources  # type: ignore
 
 
-__all__ = ["ddisasm_path", "__version__"]
+__all__ = [
+    "BatchResult",
+    "ddisasm_path",
+    "disassemble",
+    "disassemble_many",
+    "__version__",
+]
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+
+def _executable_resource() -> "importlib_resources.abc.Traversable":
+    if platform.system() == "Windows":
+        executable_name = "ddisasm.exe"
+    else:
+        executable_name = "ddisasm"
+    return importlib_resources.files(__package__) / executable_name
+
+
+# Keeps an executable extracted by importlib_resources.as_file (e.g. when the
+# package is installed as a zip) alive until the interpreter exits.
+_extracted_executables = ExitStack()
+atexit.register(_extracted_executables.close)
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_ddisasm_path() -> pathlib.Path:
+    """
+    Locate the ddisasm executable on disk, extracting it at most once per
+    process.
+    """
+    return _extracted_executables.enter_context(
+        importlib_resources.as_file(_executable_resource())
+    )
+
+
+def _is_extracted(path: pathlib.Path) -> bool:
+    """
+    Determine if the executable at `path` is a temporary copy that is removed
+    when the interpreter exits.
+    """
+    resource = _executable_resource()
+    return not isinstance(resource, pathlib.Path) or resource != path
 
 
 @contextmanager
@@ -20,12 +81,210 @@ def ddisasm_path() -> Iterator[pathlib.Path]:
     """
     Retrieves the path on disk to the ddisasm executable.
     """
+    yield _resolve_ddisasm_path()
 
-    if platform.system() == "Windows":
-        executable_name = "ddisasm.exe"
-    else:
-        executable_name = "ddisasm"
 
-    template_path = importlib_resources.files(__package__) / executable_name
-    with importlib_resources.as_file(template_path) as actual_path:
-        yield actual_path
+def _ddisasm_args(
+    path: PathLike,
+    *,
+    threads: int = 1,
+    hints: Optional[PathLike] = None,
+    with_souffle_relations: bool = False,
+    souffle_relations_filter: Optional[Sequence[str]] = None,
+    skip_function_analysis: bool = False,
+    self_diagnose: bool = False,
+    ignore_errors: bool = False,
+    no_cfi_directives: bool = False,
+    debug_dir: Optional[PathLike] = None,
+    extra_args: Sequence[str] = (),
+) -> List[str]:
+    """
+    Build the ddisasm command-line arguments (excluding the executable and
+    the output options) for the given disassembly options.
+    """
+    args = [os.fspath(path), "-j", str(threads)]
+    if hints is not None:
+        args += ["--hints", os.fspath(hints)]
+    if with_souffle_relations:
+        args.append("--with-souffle-relations")
+    if souffle_relations_filter is not None:
+        args += [
+            "--souffle-relations-filter",
+            ",".join(souffle_relations_filter),
+        ]
+    if skip_function_analysis:
+        args.append("--skip-function-analysis")
+    if self_diagnose:
+        args.append("--self-diagnose")
+    if ignore_errors:
+        args.append("--ignore-errors")
+    if no_cfi_directives:
+        args.append("--no-cfi-directives")
+    if debug_dir is not None:
+        args += ["--debug-dir", os.fspath(debug_dir)]
+    args.extend(extra_args)
+    return args
+
+
+def _forward_stderr(stream: IO[bytes], output: List[bytes]) -> None:
+    """
+    Copy the stderr of ddisasm to the stderr of this process as it is
+    written, and keep it in `output`.
+    """
+    for line in iter(stream.readline, b""):
+        output.append(line)
+        sys.stderr.write(line.decode(errors="replace"))
+        sys.stderr.flush()
+
+
+def disassemble(
+    path: PathLike,
+    *,
+    threads: int = 1,
+    hints: Optional[PathLike] = None,
+    with_souffle_relations: bool = False,
+    souffle_relations_filter: Optional[Sequence[str]] = None,
+    skip_function_analysis: bool = False,
+    self_diagnose: bool = False,
+    ignore_errors: bool = False,
+    no_cfi_directives: bool = False,
+    debug_dir: Optional[PathLike] = None,
+    extra_args: Sequence[str] = (),
+    timeout: Optional[float] = None,
+) -> gtirb.IR:
+    """
+    Disassemble the binary at `path` and return the resulting GTIRB IR.
+
+    The GTIRB is streamed from ddisasm's stdout (`--ir -`) and decoded in
+    memory, so no intermediate file is written. Progress output from ddisasm
+    is forwarded to this process's stderr, and kept as the `stderr` of the
+    CalledProcessError raised if ddisasm fails.
+
+    `souffle_relations_filter` is a list of "pass.relation" glob patterns
+    that limits the relations packaged into AuxData to the matching ones,
+    implying `with_souffle_relations`.
+
+    Raises subprocess.CalledProcessError if ddisasm exits with an error and
+    subprocess.TimeoutExpired if `timeout` elapses first.
+    """
+    args = _ddisasm_args(
+        path,
+        threads=threads,
+        hints=hints,
+        with_souffle_relations=with_souffle_relations,
+        souffle_relations_filter=souffle_relations_filter,
+        skip_function_analysis=skip_function_analysis,
+        self_diagnose=self_diagnose,
+        ignore_errors=ignore_errors,
+        no_cfi_directives=no_cfi_directives,
+        debug_dir=debug_dir,
+        extra_args=extra_args,
+    )
+    args += ["--ir", "-"]
+
+    with ddisasm_path() as tool_path:
+        cmd = [str(tool_path)] + args
+        with subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        ) as proc:
+            stderr: List[bytes] = []
+            forwarder = threading.Thread(
+                target=_forward_stderr, args=(proc.stderr, stderr)
+            )
+            forwarder.start()
+            timed_out = threading.Event()
+
+            def expire():
+                timed_out.set()
+                proc.kill()
+
+            timer = threading.Timer(timeout, expire) if timeout else None
+            if timer is not None:
+                timer.start()
+            try:
+                ir = gtirb.IR.load_protobuf_file(proc.stdout)
+            except Exception:
+                # A failed run leaves stdout empty or truncated; report the
+                # exit status instead of the decoding error.
+                if proc.wait() == 0:
+                    raise
+            finally:
+                if timer is not None:
+                    timer.cancel()
+            returncode = proc.wait()
+            forwarder.join()
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout, stderr=b"".join(stderr))
+    if returncode != 0:
+        raise subprocess.CalledProcessError(
+            returncode, cmd, stderr=b"".join(stderr)
+        )
+    return ir
+
+
+class BatchResult(NamedTuple):
+    """
+    The outcome of disassembling one input with disassemble_many().
+
+    Exactly one of `ir` and `error` is set.
+    """
+
+    path: PathLike
+    ir: Optional[gtirb.IR]
+    error: Optional[Exception]
+
+
+def _input_size(path: PathLike) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def disassemble_many(
+    paths: Iterable[PathLike],
+    *,
+    workers: Optional[int] = None,
+    threads_per_job: int = 1,
+    **options: Any,
+) -> Iterator[BatchResult]:
+    """
+    Disassemble many binaries concurrently, yielding a BatchResult for each
+    input as soon as it completes.
+
+    The inputs are disassembled by a thread pool of `workers` threads, each
+    running one ddisasm process at a time with `threads_per_job` Souffle
+    threads (`-j`). By default the machine's cores are divided evenly
+    between the jobs. Inputs are started largest first so that a single
+    large binary does not end up running alone at the end of the batch.
+    The remaining keyword arguments are passed to disassemble().
+
+    A failing input does not stop the batch; any exception raised while
+    disassembling it is reported in the `error` field of its result.
+    """
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // max(1, threads_per_job))
+
+    ordered = sorted(paths, key=_input_size, reverse=True)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                disassemble, path, threads=threads_per_job, **options
+            ): path
+            for path in ordered
+        }
+        try:
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    ir = future.result()
+                except Exception as e:
+                    yield BatchResult(path, None, e)
+                else:
+                    yield BatchResult(path, ir, None)
+        finally:
+            # Do not start queued jobs if the caller stops iterating early.
+            for future in futures:
+                future.cancel()
@@ -1,10 +1,21 @@
-from ddisasm import ddisasm_path
+from ddisasm import _is_extracted, ddisasm_path
+import os
+import platform
 import subprocess
 import sys
 
 
 def _main():
     with ddisasm_path() as tool_path:
+        # Replace the interpreter with ddisasm rather than keeping it resident
+        # for the whole run. This is not possible if the executable is a
+        # temporary copy that has to be cleaned up at exit, and os.execv does
+        # not preserve the process (or its exit status) on Windows.
+        if platform.system() != "Windows" and not _is_extracted(tool_path):
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.execv(tool_path, sys.argv)
+
         ret = subprocess.run(
             sys.argv, check=False, close_fds=False, executable=tool_path
         )
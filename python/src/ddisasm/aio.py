@@ -0,0 +1,80 @@
+"""
+asyncio front-end for running ddisasm without blocking the event loop.
+"""
+import asyncio
+import io
+import subprocess
+from typing import Any, Optional
+
+import gtirb
+
+from . import PathLike, _ddisasm_args, ddisasm_path
+
+__all__ = ["disassemble"]
+
+
+async def disassemble(
+    path: PathLike,
+    *,
+    timeout: Optional[float] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    **options: Any,
+) -> gtirb.IR:
+    """
+    Disassemble the binary at `path` and return the resulting GTIRB IR.
+
+    This accepts the same options as ddisasm.disassemble(). If `semaphore`
+    is given, it is held for the duration of the ddisasm run, which bounds
+    the number of concurrent ddisasm processes sharing that semaphore.
+
+    Cancelling the returned coroutine kills the ddisasm process. Raises
+    subprocess.TimeoutExpired if `timeout` elapses (the process is killed)
+    and subprocess.CalledProcessError if ddisasm exits with an error.
+    """
+    if semaphore is None:
+        return await _disassemble(path, timeout, options)
+    async with semaphore:
+        return await _disassemble(path, timeout, options)
+
+
+async def _disassemble(
+    path: PathLike, timeout: Optional[float], options: Any
+) -> gtirb.IR:
+    args = _ddisasm_args(path, **options) + ["--ir", "-"]
+
+    with ddisasm_path() as tool_path:
+        cmd = [str(tool_path)] + args
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            await _kill(proc)
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        except BaseException:
+            # Cancelled (or otherwise interrupted): do not leave the child
+            # running behind us.
+            await _kill(proc)
+            raise
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+    # Decoding a large IR is CPU-bound; keep it off the event loop.
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, gtirb.IR.load_protobuf_file, io.BytesIO(stdout)
+    )
+
+
+async def _kill(proc: asyncio.subprocess.Process) -> None:
+    """
+    Kill a ddisasm process that has not exited yet and reap it.
+    """
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await asyncio.shield(proc.wait())
@@ -0,0 +1,185 @@
+"""
+Content-addressed on-disk cache of disassembly results.
+
+The cache directory has the same layout as the one used by ddisasm's
+`--cache-dir` option, so results stored by either are reused by both.
+"""
+import functools
+import hashlib
+import os
+import subprocess
+from typing import Any, Optional
+
+import gtirb
+
+from . import PathLike, ddisasm_path, disassemble
+
+__all__ = ["DisassemblyCache"]
+
+# Must match CacheFormatTag in src/ResultCache.cpp.
+_CACHE_FORMAT_TAG = "ddisasm-cache-1"
+
+# Options that affect the analysis results, keyed by their disassemble()
+# argument name, with the ddisasm flag name that goes into the cache key.
+_KEY_OPTIONS = {
+    "ignore_errors": "ignore-errors",
+    "no_cfi_directives": "no-cfi-directives",
+    "self_diagnose": "self-diagnose",
+    "skip_function_analysis": "skip-function-analysis",
+    "with_souffle_relations": "with-souffle-relations",
+}
+
+
+def _sha256_file(path: PathLike) -> str:
+    """
+    Compute the SHA-256 digest of a file, or "-" if it cannot be read, as
+    sha256File in src/ResultCache.cpp does.
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(functools.partial(f.read, 1 << 16), b""):
+                digest.update(chunk)
+    except OSError:
+        return "-"
+    return digest.hexdigest()
+
+
+def _rename_modules(ir: gtirb.IR, path: PathLike) -> None:
+    """
+    Give the modules of a cached result the names and binary paths that
+    ddisasm assigns when it reads `path`, as GtirbBuilder::renameModules in
+    src/gtirb-builder/GtirbBuilder.cpp does.
+
+    Entries are keyed on the content of the input, so a hit may have been
+    stored for a copy of it under another name.
+    """
+    try:
+        with open(path, "rb") as f:
+            magic = f.read(8)
+    except OSError:
+        return
+    if magic.startswith(b"\x7fELF") or magic.startswith(b"MZ"):
+        for module in ir.modules:
+            module.name = os.path.basename(path)
+            module.binary_path = os.fspath(path)
+    elif magic == b"!<arch>\n":
+        # Archive members are named after the member itself.
+        for module in ir.modules:
+            module.binary_path = os.fspath(path)
+
+
+@functools.lru_cache(maxsize=None)
+def _ddisasm_version() -> str:
+    """
+    Get the full version string of the packaged ddisasm executable.
+    """
+    with ddisasm_path() as tool_path:
+        proc = subprocess.run(
+            [str(tool_path), "--version"],
+            stdout=subprocess.PIPE,
+            check=True,
+            universal_newlines=True,
+        )
+    return proc.stdout.strip()
+
+
+class DisassemblyCache:
+    """
+    A cache of disassembly results keyed on the content of the input binary
+    and hints file, the options that affect the analysis, and the ddisasm
+    version.
+
+    Hits are served directly from disk without starting ddisasm. Misses run
+    ddisasm with `--cache-dir`, which stores the new entry and evicts the
+    least recently used entries once the directory grows past
+    `max_size_mib`.
+    """
+
+    def __init__(self, directory: PathLike, max_size_mib: int = 4096):
+        self.directory = os.fspath(directory)
+        self.max_size_mib = max_size_mib
+
+    @staticmethod
+    def cacheable(**options: Any) -> bool:
+        """
+        Determine if a disassembly with the given options can be cached.
+
+        Runs with a debug directory or with arbitrary extra arguments have
+        effects beyond the GTIRB and always run ddisasm.
+        """
+        return not options.get("debug_dir") and not options.get("extra_args")
+
+    def key(self, path: PathLike, **options: Any) -> str:
+        """
+        Compute the cache key for disassembling `path` with `options`.
+        """
+        hints = options.get("hints")
+        hints_digest = "-" if hints is None else _sha256_file(hints)
+
+        flags = [
+            flag for name, flag in _KEY_OPTIONS.items() if options.get(name)
+        ]
+        relations_filter = options.get("souffle_relations_filter")
+        if relations_filter is not None:
+            # See the key options in src/Main.cpp.
+            if "with-souffle-relations" not in flags:
+                flags.append("with-souffle-relations")
+            flags.append(
+                "souffle-relations-filter=" + ",".join(relations_filter)
+            )
+        flags.sort()
+        lines = [
+            _CACHE_FORMAT_TAG,
+            _ddisasm_version(),
+            _sha256_file(path),
+            hints_digest,
+        ] + flags
+        description = "".join(line + "\n" for line in lines)
+        return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".gtirb")
+
+    def get(self, path: PathLike, **options: Any) -> Optional[gtirb.IR]:
+        """
+        Get the cached result of disassembling `path`, or None on a miss.
+        """
+        if not self.cacheable(**options):
+            return None
+
+        entry = self._entry_path(self.key(path, **options))
+        if not os.path.exists(entry):
+            return None
+        try:
+            ir = gtirb.IR.load_protobuf(entry)
+        except Exception:
+            # Treat an unreadable (e.g. concurrently evicted) entry as a miss.
+            return None
+
+        # Mark the entry as recently used.
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        _rename_modules(ir, path)
+        return ir
+
+    def disassemble(self, path: PathLike, **options: Any) -> gtirb.IR:
+        """
+        Disassemble `path`, reusing a cached result if there is one.
+
+        Accepts the same options as ddisasm.disassemble().
+        """
+        ir = self.get(path, **options)
+        if ir is not None:
+            return ir
+
+        if self.cacheable(**options):
+            options["extra_args"] = [
+                "--cache-dir",
+                self.directory,
+                "--cache-size",
+                str(self.max_size_mib),
+            ]
+        return disassemble(path, **options)
@@ -0,0 +1,123 @@
+"""
+Client for a ddisasm server started with `ddisasm --serve SOCKET`.
+
+The server keeps its initialized state warm between jobs, which saves the
+process startup and registration cost of every ddisasm invocation. This is
+most noticeable when disassembling many small binaries.
+"""
+import array
+import os
+import socket
+import struct
+import subprocess
+from typing import Any, Sequence
+
+import gtirb
+
+from . import PathLike, _ddisasm_args
+
+__all__ = ["Client"]
+
+
+class Client:
+    """
+    Submits jobs to a ddisasm server listening on a Unix socket.
+
+    Jobs run concurrently on the server, so a single Client can be shared by
+    several threads.
+    """
+
+    def __init__(self, socket_path: PathLike):
+        self.socket_path = os.fspath(socket_path)
+
+    def run(
+        self,
+        args: Sequence[str],
+        stdout: int = 1,
+        stderr: int = 2,
+    ) -> int:
+        """
+        Run ddisasm on the server with the command-line arguments `args` and
+        return its exit status.
+
+        `stdout` and `stderr` are file descriptors that receive the job's
+        output; they default to this process's own. Relative paths in `args`
+        are resolved against the current working directory.
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            self._submit(sock, args, stdout, stderr)
+            return self._receive_status(sock)
+
+    def disassemble(self, path: PathLike, **options: Any) -> gtirb.IR:
+        """
+        Disassemble the binary at `path` on the server and return the
+        resulting GTIRB IR.
+
+        Accepts the same options as ddisasm.disassemble(), except `timeout`.
+        Raises subprocess.CalledProcessError if the job fails.
+        """
+        args = _ddisasm_args(path, **options) + ["--ir", "-"]
+        read_fd, write_fd = os.pipe()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                self._submit(sock, args, write_fd, 2)
+            except BaseException:
+                os.close(read_fd)
+                raise
+            finally:
+                # The server holds its own copy; the pipe reaches EOF once
+                # the job exits.
+                os.close(write_fd)
+
+            # Drain the GTIRB before waiting for the exit status, otherwise a
+            # job with a large output would block on the full pipe.
+            error = None
+            with os.fdopen(read_fd, "rb") as output:
+                try:
+                    ir = gtirb.IR.load_protobuf_file(output)
+                except Exception as e:
+                    error = e
+                    output.read()
+            status = self._receive_status(sock)
+
+        if status != 0:
+            raise subprocess.CalledProcessError(status, ["ddisasm", *args])
+        if error is not None:
+            raise error
+        return ir
+
+    def _submit(
+        self,
+        sock: socket.socket,
+        args: Sequence[str],
+        stdout: int,
+        stderr: int,
+    ) -> None:
+        """
+        Send a job to the server, see serveJobs() in src/Server.h.
+        """
+        payload = b"".join(
+            os.fsencode(arg) + b"\0" for arg in [os.getcwd(), *args]
+        )
+        sock.connect(self.socket_path)
+        sock.sendmsg(
+            [struct.pack("=I", len(payload))],
+            [
+                (
+                    socket.SOL_SOCKET,
+                    socket.SCM_RIGHTS,
+                    array.array("i", [stdout, stderr]),
+                )
+            ],
+        )
+        sock.sendall(payload)
+
+    @staticmethod
+    def _receive_status(sock: socket.socket) -> int:
+        data = b""
+        while len(data) < 4:
+            chunk = sock.recv(4 - len(data))
+            if not chunk:
+                raise ConnectionError("ddisasm server closed the connection")
+            data += chunk
+        return struct.unpack("=i", data)[0]
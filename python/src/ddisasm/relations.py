@@ -0,0 +1,322 @@
+"""
+Columnar access to the Souffle relations that ddisasm stores in the
+`souffleFacts` and `souffleOutputs` AuxData with `--with-souffle-relations`.
+
+Each relation is parsed once per module into one array per attribute.
+Numeric attributes are stored in NumPy arrays if NumPy is installed, and in
+`array.array`s otherwise; symbol and record attributes are stored in lists.
+
+Relations can be stored as CSV text or, with
+`--souffle-relations-encoding=columnar`, in the columnar encoding described in
+src/gtirb-decoder/ColumnarRelation.h.
+"""
+import array
+import base64
+import struct
+import sys
+import weakref
+import zlib
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    MutableMapping,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import gtirb
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore
+
+__all__ = ["Relation", "get_relation", "relation_names"]
+
+# Attribute types of the record types, see DatalogIO::serializeRecord.
+RECORD_TYPES = {
+    "r:stack_var": ["s:register", "i:number"],
+}
+
+# array.array typecodes and NumPy dtypes of the numeric attribute types.
+_TYPECODES = {"i": "q", "u": "Q", "f": "d"}
+
+# Prefix of the AuxData type string of relations in the columnar encoding.
+COLUMNAR_PREFIX = "columnar/1/"
+
+Column = Union[Sequence[Any], "numpy.ndarray"]
+
+
+def _split_record(text: str) -> List[str]:
+    """
+    Split the fields of a serialized record "[a, b, ...]", keeping nested
+    records intact.
+    """
+    fields = []
+    depth = 0
+    start = 1
+    for i, c in enumerate(text):
+        if c == "[":
+            depth += 1
+        elif c == "]":
+            depth -= 1
+        elif c == "," and depth == 1 and text.startswith(" ", i + 1):
+            fields.append(text[start:i])
+            start = i + 2
+    fields.append(text[start:-1])
+    return fields
+
+
+def _infer_field(text: str) -> Any:
+    if text.startswith("["):
+        return tuple(_infer_field(field) for field in _split_record(text))
+    try:
+        return int(text, 0)
+    except ValueError:
+        return text
+
+
+def _parser(attr_type: str) -> Callable[[str], Any]:
+    """
+    Get the function that parses a serialized attribute of type `attr_type`,
+    e.g. "i:number" or "u:address".
+    """
+    kind = attr_type[0]
+    if kind == "i" or (kind == "u" and attr_type != "u:address"):
+        return int
+    if kind == "u":
+        # Addresses are written in hexadecimal with a 0x prefix.
+        return lambda text: int(text, 16)
+    if kind == "f":
+        return float
+    if kind == "s":
+        return str
+    if kind == "r":
+        field_types = RECORD_TYPES.get(attr_type)
+        if field_types is None:
+            return _infer_field
+        field_parsers = [_parser(t) for t in field_types]
+        return lambda text: tuple(
+            parse(field)
+            for parse, field in zip(field_parsers, _split_record(text))
+        )
+    raise ValueError("Cannot parse type: " + attr_type)
+
+
+def _read_array(typecode: str, payload: bytes, offset: int, count: int):
+    """
+    Read `count` little-endian values of an array.array typecode at `offset`
+    of `payload`.
+    """
+    values = array.array(typecode)
+    values.frombytes(payload[offset : offset + count * values.itemsize])
+    if len(values) != count:
+        raise ValueError("Truncated columnar relation")
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _decode_columnar(
+    compression: str, data: str, types: List[str]
+) -> Tuple[int, List[Column]]:
+    """
+    Decode the number of tuples and the columns of a relation in the
+    columnar encoding.
+    """
+    frame = base64.b64decode(data)
+    if compression == "zlib":
+        payload = zlib.decompress(frame[8:])
+        if len(payload) != struct.unpack_from("<Q", frame)[0]:
+            raise ValueError("Truncated columnar relation")
+    elif compression == "none":
+        payload = frame
+    else:
+        raise ValueError("Unsupported compression: " + compression)
+
+    (length,) = struct.unpack_from("<Q", payload)
+    offset = 8
+    columns = []
+    for attr_type in types:
+        typecode = _TYPECODES.get(attr_type[0])
+        if typecode is not None:
+            column = _read_array(typecode, payload, offset, length)
+            offset += length * column.itemsize
+            if numpy is not None:
+                column = numpy.frombuffer(column, dtype=column.typecode)
+            columns.append(column)
+            continue
+
+        # Parse each distinct value once.
+        (count,) = struct.unpack_from("<I", payload, offset)
+        offset += 4
+        parse = _parser(attr_type)
+        values = []
+        for _ in range(count):
+            (size,) = struct.unpack_from("<I", payload, offset)
+            offset += 4
+            values.append(parse(payload[offset : offset + size].decode()))
+            offset += size
+        indices = _read_array("I", payload, offset, length)
+        offset += length * indices.itemsize
+        columns.append([values[index] for index in indices])
+    return length, columns
+
+
+class Relation:
+    """
+    A Souffle relation, stored column by column.
+    """
+
+    def __init__(self, name: str, type_spec: str, data: str):
+        self.name = name
+        compression = None
+        if type_spec.startswith(COLUMNAR_PREFIX):
+            compression, type_spec = type_spec[len(COLUMNAR_PREFIX) :].split(
+                ";", 1
+            )
+        self.attributes = []
+        self.types = []
+        for attribute in type_spec.strip("<>").split(","):
+            attr_name, attr_type = attribute.split(":", 1)
+            self.attributes.append(attr_name)
+            self.types.append(attr_type)
+
+        if compression is not None:
+            self._length, self.columns = _decode_columnar(
+                compression, data, self.types
+            )
+        else:
+            # Split on newlines only: symbols may contain other line
+            # separators, and a single empty symbol is an empty line.
+            lines = data.split("\n")
+            if lines[-1] == "":
+                lines.pop()
+            rows = [line.split("\t") for line in lines]
+            for i, row in enumerate(rows):
+                if len(row) != len(self.types):
+                    raise ValueError(
+                        "{}: tuple {} has {} attributes instead of {}".format(
+                            name, i, len(row), len(self.types)
+                        )
+                    )
+            self._length = len(rows)
+            raw_columns = list(zip(*rows)) or [()] * len(self.types)
+            self.columns = [
+                self._make_column(attr_type, raw_column)
+                for attr_type, raw_column in zip(self.types, raw_columns)
+            ]
+        self._indexes = {}
+
+    @staticmethod
+    def _make_column(attr_type: str, raw_column: Sequence[str]) -> Column:
+        values = map(_parser(attr_type), raw_column)
+        typecode = _TYPECODES.get(attr_type[0])
+        if typecode is None:
+            return list(values)
+        column = array.array(typecode, values)
+        if numpy is not None:
+            return numpy.frombuffer(column, dtype=column.typecode)
+        return column
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Tuple[Any, ...]]:
+        """
+        Iterate over the tuples of the relation.
+        """
+        return zip(
+            *(self._values(position) for position in range(len(self.columns)))
+        )
+
+    def column(self, attribute: Union[int, str]) -> Column:
+        """
+        Get the values of an attribute, given by name or position.
+        """
+        return self.columns[self._position(attribute)]
+
+    def lookup(
+        self, attribute: Union[int, str], value: Any
+    ) -> List[Tuple[Any, ...]]:
+        """
+        Get the tuples whose `attribute` is `value`.
+
+        The first lookup on an attribute builds a hash index of it, so that
+        subsequent lookups take time proportional to the number of matches.
+        """
+        position = self._position(attribute)
+        index = self._indexes.get(position)
+        if index is None:
+            index = {}
+            for row, key in enumerate(self._values(position)):
+                index.setdefault(key, []).append(row)
+            self._indexes[position] = index
+        return [self.row(row) for row in index.get(value, ())]
+
+    def row(self, row: int) -> Tuple[Any, ...]:
+        """
+        Get the tuple at position `row`.
+        """
+        return tuple(self._value(column[row]) for column in self.columns)
+
+    def _position(self, attribute: Union[int, str]) -> int:
+        if isinstance(attribute, str):
+            return self.attributes.index(attribute)
+        return attribute
+
+    def _values(self, position: int) -> Sequence[Any]:
+        column = self.columns[position]
+        if numpy is not None and isinstance(column, numpy.ndarray):
+            return column.tolist()
+        return column
+
+    @staticmethod
+    def _value(value: Any) -> Any:
+        # Hand out plain Python numbers rather than NumPy scalars.
+        return value.item() if hasattr(value, "item") else value
+
+    def __repr__(self) -> str:
+        return "Relation({!r}, {} tuples)".format(self.name, len(self))
+
+
+# The relations parsed so far, per module and AuxData table. Entries keep the
+# serialized data they were parsed from, so that a replaced table is parsed
+# again.
+_cache: MutableMapping[Any, Dict] = weakref.WeakKeyDictionary()
+
+
+def relation_names(
+    module: gtirb.Module, table: str = "souffleOutputs"
+) -> List[str]:
+    """
+    Get the names ("pass.relation") of the relations in an AuxData table of
+    `module`.
+    """
+    if table not in module.aux_data:
+        return []
+    return sorted(module.aux_data[table].data)
+
+
+def get_relation(
+    module: gtirb.Module, name: str, table: str = "souffleOutputs"
+) -> Relation:
+    """
+    Get the relation `name` (e.g. "disassembly.def_used") from the AuxData
+    table `table` of `module`, parsing it on first use.
+
+    Raises KeyError if there is no such relation.
+    """
+    type_spec, data = module.aux_data[table].data[name]
+    module_cache = _cache.setdefault(module, {})
+    cached = module_cache.get((table, name))
+    if cached is not None and cached[0] is data:
+        return cached[1]
+
+    relation = Relation(name, type_spec, data)
+    module_cache[(table, name)] = (data, relation)
+    return relation
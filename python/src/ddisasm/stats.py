@@ -0,0 +1,133 @@
+"""
+Live access to the pass statistics written by ddisasm's `--stats-json`.
+
+Each event is a dictionary decoded from one JSON line. "phase" events are
+written at the end of each phase (load, compute, transform) of a pass and
+"pass" events at the end of each pass; both carry the module and pass names,
+`wall_time` and `cpu_time` in seconds, and `peak_rss_delta` in bytes, except
+that `cpu_time` and `peak_rss_delta` are left out with `--module-workers`
+greater than 1. "pass" events of Datalog passes also carry the tuple count of
+every input and output relation under `relations`.
+"""
+import json
+import os
+import subprocess
+import tempfile
+import time
+from typing import IO, Any, Dict, Generator, Iterator, List, Optional
+
+from . import PathLike, _ddisasm_args, ddisasm_path
+
+__all__ = ["read_events", "run"]
+
+Event = Dict[str, Any]
+
+
+def read_events(stream: IO[str]) -> Iterator[Event]:
+    """
+    Decode the events of a `--stats-json` file or stream, yielding each one
+    as soon as its line is complete.
+    """
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def run(
+    path: PathLike, *, ir: Optional[PathLike] = None, **options: Any
+) -> Iterator[Event]:
+    """
+    Disassemble the binary at `path`, yielding statistics events while
+    ddisasm is running.
+
+    The GTIRB is written to `ir` if given. The remaining keyword arguments
+    are the options of ddisasm.disassemble(), except `timeout`.
+
+    Raises subprocess.CalledProcessError once the events are exhausted if
+    ddisasm exited with an error; the events of the failing pass are yielded
+    first. Stopping the iteration early kills ddisasm.
+    """
+    args = _ddisasm_args(path, **options)
+    if ir is not None:
+        args += ["--ir", os.fspath(ir)]
+
+    with ddisasm_path() as tool_path:
+        cmd = [str(tool_path)] + args
+        if _has_dev_fd():
+            events = _run_with_pipe(cmd)
+        else:
+            events = _run_with_file(cmd)
+        returncode = yield from events
+
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+def _has_dev_fd() -> bool:
+    """
+    Determine if ddisasm can write its statistics to an inherited pipe
+    through /dev/fd, which is not available on Windows.
+    """
+    return os.path.isdir("/dev/fd")
+
+
+def _run_with_pipe(cmd: List[str]) -> Generator[Event, None, int]:
+    """
+    Run ddisasm writing its statistics to a pipe, yielding the events and
+    returning the exit status.
+    """
+    read_fd, write_fd = os.pipe()
+    cmd = cmd + ["--stats-json", "/dev/fd/{}".format(write_fd)]
+    try:
+        proc = subprocess.Popen(cmd, pass_fds=(write_fd,))
+    except BaseException:
+        os.close(read_fd)
+        raise
+    finally:
+        # The child holds its own copy; the pipe reaches EOF once it exits.
+        os.close(write_fd)
+
+    with proc, os.fdopen(read_fd, "r") as stream:
+        try:
+            yield from read_events(stream)
+        except BaseException:
+            proc.kill()
+            raise
+        return proc.wait()
+
+
+def _run_with_file(cmd: List[str]) -> Generator[Event, None, int]:
+    """
+    Run ddisasm writing its statistics to a temporary file, yielding the
+    events as they are appended and returning the exit status.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_path = os.path.join(tmp, "stats.json")
+        open(stats_path, "w").close()
+        cmd = cmd + ["--stats-json", stats_path]
+        with subprocess.Popen(cmd) as proc, open(stats_path, "r") as stream:
+            try:
+                yield from read_events(_follow(stream, proc))
+            except BaseException:
+                proc.kill()
+                raise
+            return proc.wait()
+
+
+def _follow(stream: IO[str], proc: subprocess.Popen) -> Iterator[str]:
+    """
+    Yield the complete lines appended to `stream` until `proc` exits.
+    """
+    partial = ""
+    while True:
+        partial += stream.readline()
+        if partial.endswith("\n"):
+            yield partial
+            partial = ""
+        elif proc.poll() is None:
+            time.sleep(0.1)
+        else:
+            # Nothing more is written once the process has exited.
+            yield from (partial + stream.read()).split("\n")
+            return
@@ -22,6 +22,7 @@
 //===----------------------------------------------------------------------===//
 #include "AnalysisPipeline.h"
 
+#include "Functors.h"
 #include "passes/DatalogAnalysisPass.h"
 
 void AnalysisPipeline::configureDebugDir(const std::string &DebugDirRoot, bool MultiModule)
@@ -43,36 +44,59 @@ void AnalysisPipeline::setDatalogThreadCount(unsigned int Count)
     }
 }
 
-void AnalysisPipeline::setDatalogProfileDir(const std::string &ProfileDir)
+void AnalysisPipeline::setDatalogProfileDir(const std::string &ProfileDir, bool ProfileFunctors)
 {
     for(auto &Pass : Passes)
     {
         if(DatalogAnalysisPass *DatalogPass = dynamic_cast<DatalogAnalysisPass *>(Pass.get()))
         {
-            DatalogPass->setProfileDir(ProfileDir);
+            DatalogPass->setProfileDir(ProfileDir, ProfileFunctors);
         }
     }
 }
 
-void AnalysisPipeline::enableSouffleOutputs()
+void AnalysisPipeline::enableSouffleOutputs(bool Columnar, const std::vector<std::string> &Patterns)
 {
     for(auto &Pass : Passes)
     {
         if(DatalogAnalysisPass *DatalogPass = dynamic_cast<DatalogAnalysisPass *>(Pass.get()))
         {
-            DatalogPass->enableSouffleOutputs();
+            DatalogPass->enableSouffleOutputs(true, Columnar, Patterns);
+        }
+    }
+}
+
+void AnalysisPipeline::setDebugRelationPatterns(const std::vector<std::string> &Patterns)
+{
+    for(auto &Pass : Passes)
+    {
+        if(DatalogAnalysisPass *DatalogPass = dynamic_cast<DatalogAnalysisPass *>(Pass.get()))
+        {
+            DatalogPass->setDebugRelationPatterns(Patterns);
+        }
+    }
+}
+
+void AnalysisPipeline::enableDebugDirCompression()
+{
+    for(auto &Pass : Passes)
+    {
+        if(DatalogAnalysisPass *DatalogPass = dynamic_cast<DatalogAnalysisPass *>(Pass.get()))
+        {
+            DatalogPass->enableDebugDirCompression();
         }
     }
 }
 
 void AnalysisPipeline::configureSouffleInterpreter(const std::string &InterpreterDir,
-                                                   const std::string &LibraryDir)
+                                                   const std::string &LibraryDir,
+                                                   const std::string &CacheDir)
 {
     for(auto &Pass : Passes)
     {
         if(DatalogAnalysisPass *DatalogPass = dynamic_cast<DatalogAnalysisPass *>(Pass.get()))
         {
-            DatalogPass->configureSouffleInterpreter(InterpreterDir, LibraryDir);
+            DatalogPass->configureSouffleInterpreter(InterpreterDir, LibraryDir, CacheDir);
         }
     }
 }
@@ -135,6 +159,11 @@ void AnalysisPipeline::run(gtirb::Context &Context, gtirb::Module &Module)
         notifyPassPhase(AnalysisPassPhase::LOAD, Pass->hasLoad());
         if(Pass->hasLoad())
         {
+            std::shared_lock<std::shared_mutex> Lock;
+            if(ContextMutex)
+            {
+                Lock = std::shared_lock<std::shared_mutex>(*ContextMutex);
+            }
             auto Result = Pass->load(Context, Module, PreviousPass);
             notifyPassResult(AnalysisPassPhase::LOAD, Result);
         }
@@ -157,7 +186,13 @@ void AnalysisPipeline::run(gtirb::Context &Context, gtirb::Module &Module)
         notifyPassPhase(AnalysisPassPhase::TRANSFORM, Pass->hasTransform());
         if(Pass->hasTransform())
         {
+            std::unique_lock<std::shared_mutex> Lock;
+            if(ContextMutex)
+            {
+                Lock = std::unique_lock<std::shared_mutex>(*ContextMutex);
+            }
             auto Result = Pass->transform(Context, Module);
+            FunctorContextManager::invalidateSnapshot(Module);
             notifyPassResult(AnalysisPassPhase::TRANSFORM, Result);
         }
 
@@ -22,6 +22,8 @@
 //===----------------------------------------------------------------------===//
 #ifndef _ANALYSIS_PIPELINE_H_
 #define _ANALYSIS_PIPELINE_H_
+#include <shared_mutex>
+
 #include "Hints.h"
 #include "passes/AnalysisPass.h"
 
@@ -62,12 +64,27 @@ public:
 
     void configureDebugDir(const std::string& DebugDirRoot, bool MultiModule);
     void setDatalogThreadCount(unsigned int Count);
-    void setDatalogProfileDir(const std::string& ProfileDir);
-    void enableSouffleOutputs();
+    void setDatalogProfileDir(const std::string& ProfileDir, bool ProfileFunctors = false);
+    void enableSouffleOutputs(bool Columnar = false,
+                              const std::vector<std::string>& Patterns = {"*"});
+    void setDebugRelationPatterns(const std::vector<std::string>& Patterns);
+    void enableDebugDirCompression();
     void configureSouffleInterpreter(const std::string& InterpreterDir,
-                                     const std::string& LibraryDir);
+                                     const std::string& LibraryDir,
+                                     const std::string& CacheDir = "");
     void loadHints(const std::string& Path);
 
+    /**
+    Synchronize with the other pipelines that run on modules of the same gtirb::Context and
+    share Mutex. The load phases, which only read the context, can run concurrently, while the
+    transform phases, which add nodes to it, run one at a time. The analyze phases run
+    concurrently with both.
+    */
+    void shareContext(std::shared_mutex& Mutex)
+    {
+        ContextMutex = &Mutex;
+    }
+
     void run(gtirb::Context& Context, gtirb::Module& Module);
 
 private:
@@ -80,5 +97,6 @@ private:
     std::list<std::shared_ptr<AnalysisPipelineListener>> Listeners;
     std::list<std::unique_ptr<AnalysisPass>> Passes;
     HintsLoader DatalogHints;
+    std::shared_mutex* ContextMutex = nullptr;
 };
 #endif /* _ANALYSIS_PIPELINE_H_ */
@@ -22,13 +22,25 @@
 //===----------------------------------------------------------------------===//
 #include "CliDriver.h"
 
+#include <map>
+#include <mutex>
+
+#if defined(__unix__) || defined(__APPLE__)
+#include <sys/resource.h>
+#endif
+
+#include "passes/DatalogAnalysisPass.h"
+
 // Define CLI output field widths
 constexpr size_t IndentWidth = 4;
 constexpr size_t TimeWidth = 8;
 constexpr size_t PassNameWidth = 18;
 constexpr size_t PassStepWidth = 12;
 
-void printElapsedTime(std::chrono::duration<double> Elapsed)
+// Serializes the output of the listeners of concurrent pipelines.
+static std::mutex OutputMutex;
+
+void printElapsedTime(std::chrono::duration<double> Elapsed, std::ostream &Out)
 {
     auto Hours = std::chrono::duration_cast<std::chrono::hours>(Elapsed).count();
     auto Minutes = std::chrono::duration_cast<std::chrono::minutes>(Elapsed).count();
@@ -55,7 +67,7 @@ void printElapsedTime(std::chrono::duration<double> Elapsed)
     }
 
     // set width to TimeWidth-2; it includes the size of the brackets
-    std::cerr << "[" << std::right << std::setw(TimeWidth - 2) << FmttedDuration.str() << "]";
+    Out << "[" << std::right << std::setw(TimeWidth - 2) << FmttedDuration.str() << "]";
 }
 
 void printElapsedTimeSince(std::chrono::time_point<std::chrono::high_resolution_clock> Start)
@@ -64,19 +76,30 @@ void printElapsedTimeSince(std::chrono::time_point<std::chrono::high_resolution_
     printElapsedTime(End - Start);
 }
 
+void DDisasmPipelineListener::flush()
+{
+    if(Buffered)
+    {
+        std::lock_guard<std::mutex> Lock(OutputMutex);
+        std::cerr << Buffer.str() << std::flush;
+        Buffer.str("");
+    }
+}
+
 void DDisasmPipelineListener::notifyPassBegin(const AnalysisPass &Pass)
 {
-    std::cerr << std::setw(IndentWidth) << "" << std::left << std::setw(PassNameWidth)
-              << Pass.getName() << std::flush;
+    getOutput() << std::setw(IndentWidth) << "" << std::left << std::setw(PassNameWidth)
+                << Pass.getName() << std::flush;
 }
 
 void DDisasmPipelineListener::notifyPassEnd([[maybe_unused]] const AnalysisPass &Pass)
 {
-    std::cerr << "\n";
+    getOutput() << "\n";
 }
 
 void DDisasmPipelineListener::notifyPassPhase(AnalysisPassPhase Phase, bool HasPhase)
 {
+    std::ostream &Out = getOutput();
     std::string Name;
     switch(Phase)
     {
@@ -92,33 +115,38 @@ void DDisasmPipelineListener::notifyPassPhase(AnalysisPassPhase Phase, bool HasP
     }
     if(HasPhase)
     {
-        std::cerr << std::right << std::setw(PassStepWidth) << (Name + " ");
+        Out << std::right << std::setw(PassStepWidth) << (Name + " ");
     }
     else
     {
-        std::cerr << std::setw(PassStepWidth + TimeWidth) << "";
+        Out << std::setw(PassStepWidth + TimeWidth) << "";
     }
-    std::cerr << std::flush;
+    Out << std::flush;
 }
 
 void DDisasmPipelineListener::notifyPassResult(AnalysisPassPhase Phase,
                                                const AnalysisPassResult &Result)
 {
-    printElapsedTime(Result.RunTime);
+    std::ostream &Out = getOutput();
+    printElapsedTime(Result.RunTime, Out);
     if(!Result.Warnings.empty() || !Result.Errors.empty())
     {
-        std::cerr << "\n";
+        Out << "\n";
     }
     for(const std::string &Warning : Result.Warnings)
     {
-        std::cerr << "WARNING: " << Warning << "\n";
+        Out << "WARNING: " << Warning << "\n";
     }
     for(const std::string &Error : Result.Errors)
     {
-        std::cerr << "ERROR: " << Error << "\n" << std::flush;
+        Out << "ERROR: " << Error << "\n" << std::flush;
     }
     if(!Result.Errors.empty())
     {
+        if(Buffered)
+        {
+            throw PassFailedError("pass failed");
+        }
         std::exit(EXIT_FAILURE);
     }
     if(!Result.Warnings.empty())
@@ -138,8 +166,171 @@ void DDisasmPipelineListener::notifyPassResult(AnalysisPassPhase Phase,
         }
 
         // Re-indent after emitting warnings
-        std::cerr << std::setw(IndentWidth + PassNameWidth
-                               + PaddingMult * (PassStepWidth + TimeWidth))
-                  << "";
+        Out << std::setw(IndentWidth + PassNameWidth + PaddingMult * (PassStepWidth + TimeWidth))
+            << "";
+    }
+}
+
+static const char *getPhaseName(AnalysisPassPhase Phase)
+{
+    switch(Phase)
+    {
+        case AnalysisPassPhase::LOAD:
+            return "load";
+        case AnalysisPassPhase::ANALYZE:
+            return "compute";
+        case AnalysisPassPhase::TRANSFORM:
+            return "transform";
+    }
+    return "";
+}
+
+static void writeJsonString(std::ostream &Out, const std::string &Text)
+{
+    Out << '"';
+    for(char C : Text)
+    {
+        switch(C)
+        {
+            case '"':
+                Out << "\\\"";
+                break;
+            case '\\':
+                Out << "\\\\";
+                break;
+            case '\n':
+                Out << "\\n";
+                break;
+            case '\t':
+                Out << "\\t";
+                break;
+            default:
+                if(static_cast<unsigned char>(C) < 0x20)
+                {
+                    Out << "\\u" << std::hex << std::setw(4) << std::setfill('0')
+                        << static_cast<int>(C) << std::dec << std::setfill(' ');
+                }
+                else
+                {
+                    Out << C;
+                }
+        }
+    }
+    Out << '"';
+}
+
+static void writeJsonSizes(std::ostream &Out, const std::map<std::string, size_t> &Sizes)
+{
+    Out << "{";
+    bool First = true;
+    for(auto &[Name, Size] : Sizes)
+    {
+        if(!First)
+        {
+            Out << ",";
+        }
+        First = false;
+        writeJsonString(Out, Name);
+        Out << ":" << Size;
+    }
+    Out << "}";
+}
+
+StatsJsonPipelineListener::Usage StatsJsonPipelineListener::Usage::now()
+{
+    Usage U;
+    U.Wall = std::chrono::steady_clock::now();
+#if defined(__unix__) || defined(__APPLE__)
+    struct rusage RUsage;
+    if(getrusage(RUSAGE_SELF, &RUsage) == 0)
+    {
+        U.Cpu = RUsage.ru_utime.tv_sec + RUsage.ru_utime.tv_usec / 1e6 + RUsage.ru_stime.tv_sec
+                + RUsage.ru_stime.tv_usec / 1e6;
+#if defined(__APPLE__)
+        U.PeakRss = RUsage.ru_maxrss;
+#else
+        // Linux reports ru_maxrss in kilobytes.
+        U.PeakRss = static_cast<uint64_t>(RUsage.ru_maxrss) * 1024;
+#endif
+    }
+#endif
+    return U;
+}
+
+void StatsJsonPipelineListener::writeEventPrefix(const std::string &Event,
+                                                 const AnalysisPass &Pass)
+{
+    Line << "{\"event\":";
+    writeJsonString(Line, Event);
+    Line << ",\"module\":";
+    writeJsonString(Line, ModuleName);
+    Line << ",\"pass\":";
+    writeJsonString(Line, Pass.getNameSlug());
+}
+
+void StatsJsonPipelineListener::writeUsageSince(const Usage &Start)
+{
+    Usage End = Usage::now();
+    std::chrono::duration<double> Wall = End.Wall - Start.Wall;
+    Line << ",\"wall_time\":" << Wall.count();
+    if(ProcessUsage)
+    {
+        Line << ",\"cpu_time\":" << (End.Cpu - Start.Cpu)
+             << ",\"peak_rss_delta\":" << (End.PeakRss - Start.PeakRss);
+    }
+}
+
+void StatsJsonPipelineListener::writeEvent()
+{
+    std::lock_guard<std::mutex> Lock(OutputMutex);
+    Out << Line.str() << std::flush;
+    Line.str("");
+}
+
+void StatsJsonPipelineListener::notifyPassBegin(const AnalysisPass &Pass)
+{
+    CurrentPass = &Pass;
+    PassStart = Usage::now();
+}
+
+void StatsJsonPipelineListener::notifyPassEnd(const AnalysisPass &Pass)
+{
+    writeEventPrefix("pass", Pass);
+    writeUsageSince(PassStart);
+
+    if(auto *DatalogPass = dynamic_cast<const DatalogAnalysisPass *>(&Pass))
+    {
+        std::map<std::string, size_t> Inputs, Outputs;
+        DatalogPass->getRelationSizes(Inputs, Outputs);
+        Line << ",\"relations\":{\"input\":";
+        writeJsonSizes(Line, Inputs);
+        Line << ",\"output\":";
+        writeJsonSizes(Line, Outputs);
+        Line << "}";
+    }
+    Line << "}\n";
+    writeEvent();
+    CurrentPass = nullptr;
+}
+
+void StatsJsonPipelineListener::notifyPassPhase([[maybe_unused]] AnalysisPassPhase Phase,
+                                                [[maybe_unused]] bool HasPhase)
+{
+    PhaseStart = Usage::now();
+}
+
+void StatsJsonPipelineListener::notifyPassResult(AnalysisPassPhase Phase,
+                                                 const AnalysisPassResult &Result)
+{
+    if(!CurrentPass)
+    {
+        return;
     }
+    writeEventPrefix("phase", *CurrentPass);
+    Line << ",\"phase\":";
+    writeJsonString(Line, getPhaseName(Phase));
+    writeUsageSince(PhaseStart);
+    Line << ",\"warnings\":" << Result.Warnings.size() << ",\"errors\":" << Result.Errors.size()
+         << "}\n";
+    writeEvent();
 }
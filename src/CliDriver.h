@@ -24,26 +24,128 @@
 #define _CLI_DRIVER_H_
 
 #include <chrono>
+#include <cstdint>
 #include <iomanip>
+#include <iostream>
+#include <ostream>
+#include <sstream>
+#include <stdexcept>
+#include <string>
 
 #include "AnalysisPipeline.h"
 #include "passes/AnalysisPass.h"
 
-void printElapsedTime(std::chrono::duration<double> Elapsed);
+void printElapsedTime(std::chrono::duration<double> Elapsed, std::ostream& Out = std::cerr);
 void printElapsedTimeSince(std::chrono::time_point<std::chrono::high_resolution_clock> Start);
 bool printPassResults(const AnalysisPassResult& Result);
 
+/**
+Thrown by a buffered DDisasmPipelineListener when a pass reports errors.
+*/
+class PassFailedError : public std::runtime_error
+{
+public:
+    using std::runtime_error::runtime_error;
+};
+
 class DDisasmPipelineListener : public AnalysisPipelineListener
 {
 public:
+    /**
+    With Buffered, the progress is kept until flush() instead of being written to std::cerr as
+    it is made, so that the progress of modules analyzed concurrently is not interleaved.
+
+    When a pass reports errors, the listener exits, or with Buffered, throws PassFailedError so
+    that the thread running the pipeline can stop and let the main thread exit.
+    */
+    explicit DDisasmPipelineListener(bool Buffered = false) : Buffered(Buffered)
+    {
+    }
     virtual ~DDisasmPipelineListener()
     {
     }
 
+    std::ostream& getOutput()
+    {
+        return Buffered ? Buffer : std::cerr;
+    }
+
+    /**
+    Write the buffered progress to std::cerr at once.
+    */
+    void flush();
+
+    virtual void notifyPassBegin(const AnalysisPass& Pass);
+    virtual void notifyPassEnd(const AnalysisPass& Pass);
+    virtual void notifyPassPhase(AnalysisPassPhase Phase, bool HasPhase);
+    virtual void notifyPassResult(AnalysisPassPhase Phase, const AnalysisPassResult& Result);
+
+private:
+    bool Buffered;
+    std::ostringstream Buffer;
+};
+
+/**
+Pipeline listener that writes machine-readable statistics as NDJSON.
+
+One JSON object is written (and flushed) per line: a "phase" event at the end
+of each phase of a pass and a "pass" event at the end of each pass. Events
+include wall-clock time and CPU time in seconds and the growth of the peak
+resident set size in bytes; "pass" events of Datalog passes also include the
+tuple count of each input and output relation.
+
+Several listeners can share the same stream: each event is written at once.
+
+The CPU time and the peak resident set size are measured for the whole process, so they are
+left out of the events if ProcessUsage is false, e.g. when several pipelines run concurrently.
+Measuring the CPU time of the current thread instead would miss the threads that run its
+Souffle programs.
+*/
+class StatsJsonPipelineListener : public AnalysisPipelineListener
+{
+public:
+    explicit StatsJsonPipelineListener(std::ostream& Out, bool ProcessUsage = true)
+        : Out(Out), ProcessUsage(ProcessUsage)
+    {
+    }
+    virtual ~StatsJsonPipelineListener()
+    {
+    }
+
+    /**
+    Set the name of the module that subsequent events refer to.
+    */
+    void setModule(const std::string& Name)
+    {
+        ModuleName = Name;
+    }
+
     virtual void notifyPassBegin(const AnalysisPass& Pass);
     virtual void notifyPassEnd(const AnalysisPass& Pass);
     virtual void notifyPassPhase(AnalysisPassPhase Phase, bool HasPhase);
     virtual void notifyPassResult(AnalysisPassPhase Phase, const AnalysisPassResult& Result);
+
+private:
+    struct Usage
+    {
+        std::chrono::time_point<std::chrono::steady_clock> Wall;
+        double Cpu = 0;
+        uint64_t PeakRss = 0;
+
+        static Usage now();
+    };
+
+    void writeEventPrefix(const std::string& Event, const AnalysisPass& Pass);
+    void writeUsageSince(const Usage& Start);
+    void writeEvent();
+
+    std::ostream& Out;
+    bool ProcessUsage;
+    std::ostringstream Line;
+    std::string ModuleName;
+    const AnalysisPass* CurrentPass = nullptr;
+    Usage PassStart;
+    Usage PhaseStart;
 };
 
 #endif /* _CLI_DRIVER_H_ */
@@ -22,9 +22,14 @@
 //===----------------------------------------------------------------------===//
 #include "Functors.h"
 
+#include <algorithm>
 #include <cassert>
+#include <cstdlib>
+#include <cstring>
 #include <fstream>
 #include <iostream>
+#include <map>
+#include <thread>
 
 #include "Endian.h"
 
@@ -49,61 +54,313 @@ namespace
         return Signed;
     }
 
+    using Functor = FunctorContextManager::Functor;
+    using ProfileScope = FunctorContextManager::ProfileScope;
+
+    // Names of the profiled functors, in the order of FunctorContextManager::Functor.
+    const char* const FunctorNames[] = {
+        "functor_data_valid",
+        "functor_data_unsigned",
+        "functor_data_u8",
+        "functor_data_u16",
+        "functor_data_u32",
+        "functor_data_u64",
+        "functor_data_signed",
+        "functor_data_s8",
+        "functor_data_s16",
+        "functor_data_s32",
+        "functor_data_s64",
+        "functor_aligned",
+        "functor_choose_max",
+        "functor_thumb32_branch_offset",
+        "to_string_hex",
+    };
+    static_assert(sizeof(FunctorNames) / sizeof(FunctorNames[0])
+                      == static_cast<size_t>(Functor::Count),
+                  "missing functor name");
+
+    // Add to a counter that is only ever updated by the current thread.
+    inline void addToCounter(std::atomic<uint64_t>& Counter, uint64_t Value)
+    {
+        Counter.store(Counter.load(std::memory_order_relaxed) + Value,
+                      std::memory_order_relaxed);
+    }
+
 } // namespace
 
 FunctorContextManager FunctorContext;
 
-const gtirb::ByteInterval* FunctorContextManager::getByteInterval(uint64_t EA, size_t Size)
+namespace
 {
-    for(const auto& Section : Module->findSectionsOn(gtirb::Addr(EA)))
+    // Context bound to the current thread by a ThreadBinding, if any, and the number of
+    // bindings alive in the process.
+    thread_local FunctorContextManager* BoundContext = nullptr;
+    std::atomic<size_t> BindingCount = 0;
+
+    // Number of contexts that are profiling, so that the functors skip looking up their context
+    // when none is.
+    std::atomic<size_t> ProfilingCount = 0;
+
+    void bindThreads(FunctorContextManager* Context, unsigned int Threads)
     {
-        bool Executable = Section.isFlagSet(gtirb::SectionFlag::Executable);
-        bool Initialized = Section.isFlagSet(gtirb::SectionFlag::Initialized);
-        bool Loaded = Section.isFlagSet(gtirb::SectionFlag::Loaded);
-        if(Loaded && (Executable || Initialized))
+        BoundContext = Context;
+#ifdef _OPENMP
+        // libgomp keeps a pool of threads for each thread that starts a parallel region, and
+        // reuses it for the later parallel regions of that thread, so this binds the threads
+        // that the Souffle programs run on this thread use.
+#pragma omp parallel num_threads(Threads)
+        {
+            BoundContext = Context;
+        }
+#else
+        (void)Threads;
+#endif
+    }
+
+    // Determine if all the threads of a parallel region with Threads threads started on the
+    // current thread are bound to Context.
+    bool threadsBoundTo(FunctorContextManager* Context, unsigned int Threads)
+    {
+        std::atomic<bool> Bound = BoundContext == Context;
+#ifdef _OPENMP
+#pragma omp parallel num_threads(Threads)
+        {
+            if(BoundContext != Context)
+            {
+                Bound = false;
+            }
+        }
+#else
+        (void)Threads;
+#endif
+        return Bound;
+    }
+} // namespace
+
+FunctorContextManager& FunctorContextManager::current()
+{
+    if(BoundContext)
+    {
+        return *BoundContext;
+    }
+    if(BindingCount.load(std::memory_order_relaxed) > 0)
+    {
+        // With several contexts in use, reading the bytes of the wrong module would silently
+        // change the results.
+        std::cerr << "Error: functor called on a thread without a functor context\n";
+        std::abort();
+    }
+    return FunctorContext;
+}
+
+FunctorContextManager::ThreadBinding::ThreadBinding(FunctorContextManager& Context,
+                                                    unsigned int Threads)
+    : Threads(Threads)
+{
+    BindingCount.fetch_add(1, std::memory_order_relaxed);
+    bindThreads(&Context, Threads);
+}
+
+FunctorContextManager::ThreadBinding::~ThreadBinding()
+{
+    bindThreads(nullptr, Threads);
+    BindingCount.fetch_sub(1, std::memory_order_relaxed);
+}
+
+bool FunctorContextManager::ThreadBinding::isSupported(unsigned int Threads)
+{
+    // Bind the threads of a new thread, without counting the binding, and check that the
+    // threads of its next parallel region are bound.
+    bool Supported = false;
+    std::thread Probe([&]() {
+        FunctorContextManager* Context = &FunctorContext;
+        bindThreads(Context, Threads);
+        Supported = threadsBoundTo(Context, Threads);
+        bindThreads(nullptr, Threads);
+    });
+    Probe.join();
+    return Supported;
+}
+
+const FunctorContextManager::ReadableRange* FunctorContextManager::findRange(uint64_t EA,
+                                                                             size_t Size)
+{
+    // Find the last range that begins at or before EA, then walk back over the ranges that
+    // may still contain EA. Ranges rarely overlap, so this usually checks a single range.
+    auto It = std::upper_bound(Ranges.begin(), Ranges.end(), EA,
+                               [](uint64_t Addr, const ReadableRange& Range) {
+                                   return Addr < Range.Begin;
+                               });
+    const ReadableRange* Found = nullptr;
+    for(size_t I = It - Ranges.begin(); I > 0 && MaxEnds[I - 1] > EA; I--)
+    {
+        const ReadableRange& Range = Ranges[I - 1];
+        if(EA + Size <= Range.End)
+        {
+            // Prefer the lowest address, as when searching the sections in order.
+            Found = &Range;
+        }
+    }
+
+    if(isProfiling())
+    {
+        addToCounter(threadProfileCounters()[Found ? LookupHitCounter : LookupMissCounter], 1);
+    }
+    return Found;
+}
+
+bool FunctorContextManager::isReadable(uint64_t EA, size_t Size)
+{
+    return findRange(EA, Size) != nullptr;
+}
+
+FunctorContextManager::ProfileScope::ProfileScope(Functor F) : Index(static_cast<size_t>(F))
+{
+    if(ProfilingCount.load(std::memory_order_relaxed) == 0)
+    {
+        return;
+    }
+    FunctorContextManager& Context = FunctorContextManager::current();
+    if(!Context.isProfiling())
+    {
+        return;
+    }
+    std::atomic<uint64_t>* ThreadCounters = Context.threadProfileCounters();
+    uint64_t Calls = ThreadCounters[Index].load(std::memory_order_relaxed);
+    ThreadCounters[Index].store(Calls + 1, std::memory_order_relaxed);
+    if(Calls % ProfileSamplePeriod == 0)
+    {
+        Counters = ThreadCounters;
+        Start = std::chrono::steady_clock::now();
+    }
+}
+
+FunctorContextManager::ProfileScope::~ProfileScope()
+{
+    if(Counters == nullptr)
+    {
+        return;
+    }
+    auto Elapsed = std::chrono::duration_cast<std::chrono::nanoseconds>(
+        std::chrono::steady_clock::now() - Start);
+    const size_t Count = static_cast<size_t>(Functor::Count);
+    addToCounter(Counters[Count + Index], 1);
+    addToCounter(Counters[2 * Count + Index], Elapsed.count());
+}
+
+std::atomic<uint64_t>* FunctorContextManager::threadProfileCounters()
+{
+    thread_local FunctorContextManager* Owner = nullptr;
+    thread_local std::atomic<uint64_t>* Counters = nullptr;
+    if(Owner != this)
+    {
+        std::lock_guard<std::mutex> Lock(ProfileMutex);
+        ProfileCounters.push_back(std::make_unique<std::atomic<uint64_t>[]>(ProfileCounterCount));
+        Owner = this;
+        Counters = ProfileCounters.back().get();
+    }
+    return Counters;
+}
+
+void FunctorContextManager::enableProfile(bool Enable)
+{
+    if(Enable)
+    {
+        std::lock_guard<std::mutex> Lock(ProfileMutex);
+        for(auto& Counters : ProfileCounters)
         {
-            for(const auto& ByteInterval : Section.findByteIntervalsOn(gtirb::Addr(EA)))
+            for(size_t I = 0; I < ProfileCounterCount; I++)
             {
-                uint64_t Addr = static_cast<uint64_t>(*ByteInterval.getAddress());
-                uint64_t IntervalSize = ByteInterval.getInitializedSize();
-                if(EA + Size > Addr + IntervalSize)
-                {
-                    continue;
-                }
-                return &ByteInterval;
+                Counters[I].store(0, std::memory_order_relaxed);
             }
         }
     }
-    return nullptr;
+    if(Profiling.exchange(Enable, std::memory_order_relaxed) != Enable)
+    {
+        if(Enable)
+        {
+            ProfilingCount.fetch_add(1, std::memory_order_relaxed);
+        }
+        else
+        {
+            ProfilingCount.fetch_sub(1, std::memory_order_relaxed);
+        }
+    }
+}
+
+std::vector<uint64_t> FunctorContextManager::profileTotals()
+{
+    std::vector<uint64_t> Totals(ProfileCounterCount, 0);
+    std::lock_guard<std::mutex> Lock(ProfileMutex);
+    for(auto& Counters : ProfileCounters)
+    {
+        for(size_t I = 0; I < ProfileCounterCount; I++)
+        {
+            Totals[I] += Counters[I].load(std::memory_order_relaxed);
+        }
+    }
+    return Totals;
+}
+
+uint64_t FunctorContextManager::getLookupHits()
+{
+    return profileTotals()[LookupHitCounter];
+}
+
+uint64_t FunctorContextManager::getLookupMisses()
+{
+    return profileTotals()[LookupMissCounter];
+}
+
+void FunctorContextManager::writeProfile(std::ostream& Stream)
+{
+    const size_t Count = static_cast<size_t>(Functor::Count);
+    std::vector<uint64_t> Totals = profileTotals();
+
+    Stream << "{\n  \"sample_period\": " << ProfileSamplePeriod << ",\n  \"functors\": {";
+    for(size_t I = 0; I < Count; I++)
+    {
+        uint64_t Calls = Totals[I];
+        uint64_t Sampled = Totals[Count + I];
+        uint64_t SampledTime = Totals[2 * Count + I];
+        // Extrapolate the time of all the calls from the sampled ones.
+        uint64_t EstimatedTime =
+            Sampled ? static_cast<uint64_t>(static_cast<double>(SampledTime) * Calls / Sampled)
+                    : 0;
+        Stream << (I ? ",\n" : "\n") << "    \"" << FunctorNames[I] << "\": {\"calls\": " << Calls
+               << ", \"sampled_calls\": " << Sampled << ", \"sampled_time_ns\": " << SampledTime
+               << ", \"estimated_time_ns\": " << EstimatedTime << "}";
+    }
+    Stream << "\n  },\n  \"lookups\": {\"hits\": " << Totals[LookupHitCounter]
+           << ", \"misses\": " << Totals[LookupMissCounter] << "}\n}\n";
 }
 
 uint64_t functor_data_valid(uint64_t EA, size_t Size)
 {
+    ProfileScope Scope(Functor::DataValid);
     if(!(Size == 1 || Size == 2 || Size == 4 || Size == 8))
     {
         return 0;
     }
-    const gtirb::ByteInterval* ByteInterval = FunctorContext.getByteInterval(EA, Size);
-    return ByteInterval != nullptr ? 1 : 0;
+    return FunctorContextManager::current().isReadable(EA, Size) ? 1 : 0;
 }
 
 void FunctorContextManager::readData(uint64_t EA, uint8_t* Buffer, size_t Count)
 {
-    const gtirb::ByteInterval* ByteInterval = FunctorContext.getByteInterval(EA, Count);
-    if(ByteInterval == nullptr)
+    const ReadableRange* Range = findRange(EA, Count);
+    if(Range == nullptr)
     {
         memset(Buffer, 0, Count);
         return;
     }
-    uint64_t Addr = static_cast<uint64_t>(*ByteInterval->getAddress());
-    auto Data = ByteInterval->rawBytes<const uint8_t>();
 
     // memcpy: safely handles unaligned requests.
-    memcpy(Buffer, Data + EA - Addr, Count);
+    memcpy(Buffer, Range->Data + EA - Range->Begin, Count);
 }
 
 uint64_t functor_data_unsigned(uint64_t EA, size_t Size)
 {
+    ProfileScope Scope(Functor::DataUnsigned);
     switch(Size)
     {
         case 1:
@@ -122,34 +379,43 @@ uint64_t functor_data_unsigned(uint64_t EA, size_t Size)
 
 uint64_t functor_data_u8(uint64_t EA)
 {
+    ProfileScope Scope(Functor::DataU8);
     uint8_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
     return Value;
 }
 
 uint64_t functor_data_u16(uint64_t EA)
 {
+    ProfileScope Scope(Functor::DataU16);
     uint16_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
-    return FunctorContext.IsBigEndian ? be16toh(Value) : le16toh(Value);
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    return Context.IsBigEndian ? be16toh(Value) : le16toh(Value);
 }
 
 uint64_t functor_data_u32(uint64_t EA)
 {
+    ProfileScope Scope(Functor::DataU32);
     uint32_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
-    return FunctorContext.IsBigEndian ? be32toh(Value) : le32toh(Value);
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    return Context.IsBigEndian ? be32toh(Value) : le32toh(Value);
 }
 
 uint64_t functor_data_u64(uint64_t EA)
 {
+    ProfileScope Scope(Functor::DataU64);
     uint64_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
-    return FunctorContext.IsBigEndian ? be64toh(Value) : le64toh(Value);
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    return Context.IsBigEndian ? be64toh(Value) : le64toh(Value);
 }
 
 int64_t functor_data_signed(uint64_t EA, size_t Size)
 {
+    ProfileScope Scope(Functor::DataSigned);
     switch(Size)
     {
         case 1:
@@ -168,39 +434,49 @@ int64_t functor_data_signed(uint64_t EA, size_t Size)
 
 int64_t functor_data_s8(uint64_t EA)
 {
+    ProfileScope Scope(Functor::DataS8);
     uint8_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
     return static_cast<int8_t>(Value);
 }
 
 int64_t functor_data_s16(uint64_t EA)
 {
+    ProfileScope Scope(Functor::DataS16);
     uint16_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
-    return static_cast<int16_t>(FunctorContext.IsBigEndian ? be16toh(Value) : le16toh(Value));
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    return static_cast<int16_t>(Context.IsBigEndian ? be16toh(Value) : le16toh(Value));
 }
 
 int64_t functor_data_s32(uint64_t EA)
 {
+    ProfileScope Scope(Functor::DataS32);
     uint32_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
-    return static_cast<int32_t>(FunctorContext.IsBigEndian ? be32toh(Value) : le32toh(Value));
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    return static_cast<int32_t>(Context.IsBigEndian ? be32toh(Value) : le32toh(Value));
 }
 
 int64_t functor_data_s64(uint64_t EA)
 {
+    ProfileScope Scope(Functor::DataS64);
     uint64_t Value;
-    FunctorContext.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
-    return static_cast<int64_t>(FunctorContext.IsBigEndian ? be64toh(Value) : le64toh(Value));
+    FunctorContextManager& Context = FunctorContextManager::current();
+    Context.readData(EA, reinterpret_cast<uint8_t*>(&Value), sizeof(Value));
+    return static_cast<int64_t>(Context.IsBigEndian ? be64toh(Value) : le64toh(Value));
 }
 
 uint64_t functor_aligned(uint64_t EA, size_t Size)
 {
+    ProfileScope Scope(Functor::Aligned);
     return EA + ((Size - (EA % Size)) % Size);
 }
 
 uint64_t functor_choose_max(uint64_t Val1, uint64_t Val2, uint64_t Id1, uint64_t Id2)
 {
+    ProfileScope Scope(Functor::ChooseMax);
     if(Val1 <= Val2)
     {
         return Id2;
@@ -215,6 +491,7 @@ uint64_t functor_choose_max(uint64_t Val1, uint64_t Val2, uint64_t Id1, uint64_t
 // REL relocation addends. Backward compatible with THUMB-1 encoding.
 int64_t functor_thumb32_branch_offset(uint32_t Instruction)
 {
+    ProfileScope Scope(Functor::Thumb32BranchOffset);
     uint16_t Hi = (uint16_t)(Instruction & 0xFFFFU);
     uint16_t Lo = (uint16_t)((Instruction >> 16) & 0xFFFFU);
 
@@ -233,17 +510,15 @@ souffle::RamDomain to_string_hex(souffle::SymbolTable* symbolTable,
                                  [[maybe_unused]] souffle::RecordTable* recordTable,
                                  souffle::RamDomain Value)
 {
+    ProfileScope Scope(Functor::ToStringHex);
     std::stringstream S;
     S << std::hex << Value;
     return symbolTable->encode(S.str());
 }
 
-void FunctorContextManager::useModule(const gtirb::Module* M)
+void FunctorContextManager::setByteOrder(gtirb::ByteOrder ByteOrder)
 {
-    Module = M;
-
-    // Check module's byte order
-    switch(Module->getByteOrder())
+    switch(ByteOrder)
     {
         case gtirb::ByteOrder::Big:
             IsBigEndian = true;
@@ -258,50 +533,249 @@ void FunctorContextManager::useModule(const gtirb::Module* M)
     }
 }
 
+std::vector<FunctorContextManager::ReadableRange> FunctorContextManager::getReadableRanges(
+    const gtirb::Module& Module)
+{
+    // The readable bytes, in the order in which they used to be searched.
+    std::vector<ReadableRange> Readable;
+    for(const auto& Section : Module.sections())
+    {
+        bool Executable = Section.isFlagSet(gtirb::SectionFlag::Executable);
+        bool Initialized = Section.isFlagSet(gtirb::SectionFlag::Initialized);
+        bool Loaded = Section.isFlagSet(gtirb::SectionFlag::Loaded);
+        if(!Loaded || !(Executable || Initialized))
+        {
+            continue;
+        }
+        for(const auto& ByteInterval : Section.byte_intervals())
+        {
+            std::optional<gtirb::Addr> Addr = ByteInterval.getAddress();
+            if(!Addr || ByteInterval.getInitializedSize() == 0)
+            {
+                continue;
+            }
+            uint64_t Begin = static_cast<uint64_t>(*Addr);
+            Readable.push_back({Begin, Begin + ByteInterval.getInitializedSize(),
+                                ByteInterval.rawBytes<const uint8_t>()});
+        }
+    }
+    return Readable;
+}
+
+void FunctorContextManager::indexRanges()
+{
+    std::stable_sort(Ranges.begin(), Ranges.end(),
+                     [](const ReadableRange& A, const ReadableRange& B) {
+                         return A.Begin < B.Begin;
+                     });
+
+    MaxEnds.clear();
+    uint64_t MaxEnd = 0;
+    for(const ReadableRange& Range : Ranges)
+    {
+        MaxEnd = std::max(MaxEnd, Range.End);
+        MaxEnds.push_back(MaxEnd);
+    }
+}
+
+void FunctorContextManager::useModule(const gtirb::Module* M)
+{
+    Module = M;
+    setByteOrder(Module->getByteOrder());
+    Ranges = getReadableRanges(*Module);
+    indexRanges();
+}
+
+namespace
+{
+    const char SnapshotMagic[8] = {'D', 'D', 'F', 'S', 'N', 'A', 'P', '1'};
+
+    template <typename T>
+    void appendValue(std::string& Buffer, T Value)
+    {
+        Buffer.append(reinterpret_cast<const char*>(&Value), sizeof(Value));
+    }
+
+    // Module of the snapshot written to each path that is still up to date.
+    std::mutex SnapshotMutex;
+    std::map<std::string, gtirb::UUID> SnapshotModules;
+} // namespace
+
+bool FunctorContextManager::updateSnapshot(const gtirb::Module& Module, const std::string& Path)
+{
+    std::lock_guard<std::mutex> Lock(SnapshotMutex);
+    auto It = SnapshotModules.find(Path);
+    if(It != SnapshotModules.end() && It->second == Module.getUUID())
+    {
+        return false;
+    }
+    SnapshotModules.erase(Path);
+
+    std::vector<ReadableRange> Readable = getReadableRanges(Module);
+
+    std::string Contents(SnapshotMagic, sizeof(SnapshotMagic));
+    appendValue<uint64_t>(Contents, static_cast<uint64_t>(Module.getByteOrder()));
+    appendValue<uint64_t>(Contents, Readable.size());
+    uint64_t Offset = sizeof(SnapshotMagic) + 2 * sizeof(uint64_t)
+                      + Readable.size() * 3 * sizeof(uint64_t);
+    for(const ReadableRange& Range : Readable)
+    {
+        appendValue<uint64_t>(Contents, Range.Begin);
+        appendValue<uint64_t>(Contents, Range.End - Range.Begin);
+        appendValue<uint64_t>(Contents, Offset);
+        Offset += Range.End - Range.Begin;
+    }
+    for(const ReadableRange& Range : Readable)
+    {
+        Contents.append(reinterpret_cast<const char*>(Range.Data), Range.End - Range.Begin);
+    }
+
+    std::ofstream Stream(Path, std::ios::out | std::ios::binary);
+    Stream.write(Contents.data(), Contents.size());
+    Stream.close();
+    if(!Stream)
+    {
+        throw std::runtime_error("Could not write " + Path);
+    }
+    SnapshotModules[Path] = Module.getUUID();
+    return true;
+}
+
+void FunctorContextManager::invalidateSnapshot(const gtirb::Module& Module)
+{
+    std::lock_guard<std::mutex> Lock(SnapshotMutex);
+    for(auto It = SnapshotModules.begin(); It != SnapshotModules.end();)
+    {
+        if(It->second == Module.getUUID())
+        {
+            It = SnapshotModules.erase(It);
+        }
+        else
+        {
+            It++;
+        }
+    }
+}
+
 #ifndef __EMBEDDED_SOUFFLE__
 /*
-Load the GTIRB file from the debug directory
+Load the snapshot of the readable bytes named by DDISASM_FUNCTOR_SNAPSHOT, or else the snapshot
+that ddisasm writes next to the debug directory named by DDISASM_DEBUG_DIR
 
 Used only for the interpreter.
 */
-void FunctorContextManager::loadGtirb(void)
+void FunctorContextManager::loadSnapshotConfig(void)
 {
-    const char* DebugDir = std::getenv("DDISASM_DEBUG_DIR");
-    if(!DebugDir)
+    std::string SnapshotPath;
+    if(const char* Path = std::getenv("DDISASM_FUNCTOR_SNAPSHOT"))
+    {
+        SnapshotPath = Path;
+    }
+    else if(const char* DebugDir = std::getenv("DDISASM_DEBUG_DIR"))
+    {
+        // The snapshot is shared by the passes of a module, so it is in the parent directory of
+        // their debug directories, e.g. dbg/functors.snapshot for dbg/disassembly.
+        std::string Directory(DebugDir);
+        while(Directory.size() > 1 && Directory.back() == '/')
+        {
+            Directory.pop_back();
+        }
+        size_t Separator = Directory.find_last_of('/');
+        SnapshotPath = (Separator == std::string::npos ? std::string(".")
+                                                       : Directory.substr(0, Separator))
+                       + "/functors.snapshot";
+    }
+    else
     {
-        std::cerr << "ERROR: DDISASM_DEBUG_DIR not set\n";
+        std::cerr << "ERROR: Neither DDISASM_FUNCTOR_SNAPSHOT nor DDISASM_DEBUG_DIR is set\n";
         return;
     }
-    std::string GtirbPath(DebugDir);
-    GtirbPath.append("/binary.gtirb");
 
-    GtirbContext = std::make_unique<gtirb::Context>();
+    if(!loadSnapshot(SnapshotPath))
+    {
+        std::cerr << "ERROR: Failed to load snapshot: " << SnapshotPath << "\n";
+    }
+}
 
-    std::ifstream Stream(GtirbPath, std::ios::in | std::ios::binary);
-    gtirb::ErrorOr<gtirb::IR*> Result = gtirb::IR::load(*GtirbContext, Stream);
-    if(!Result)
+/*
+Map a snapshot written by updateSnapshot and index its ranges. The bytes themselves are only
+read from the file when the functors access them.
+*/
+bool FunctorContextManager::loadSnapshot(const std::string& Path)
+{
+    try
     {
-        std::cerr << "ERROR: Failed to load GTIRB: " << GtirbPath << "\n";
-        return;
+        SnapshotFile = std::make_unique<boost::interprocess::file_mapping>(
+            Path.c_str(), boost::interprocess::read_only);
+        SnapshotRegion = std::make_unique<boost::interprocess::mapped_region>(
+            *SnapshotFile, boost::interprocess::read_only);
+    }
+    catch(const boost::interprocess::interprocess_exception&)
+    {
+        return false;
     }
 
-    gtirb::IR* IR = *Result;
+    const char* Data = static_cast<const char*>(SnapshotRegion->get_address());
+    size_t Size = SnapshotRegion->get_size();
+    auto ReadValue = [&](size_t Offset) {
+        uint64_t Value;
+        std::memcpy(&Value, Data + Offset, sizeof(Value));
+        return Value;
+    };
 
-    // Locate the correct module
-    const char* ModuleName = std::getenv("DDISASM_GTIRB_MODULE_NAME");
-    if(!ModuleName)
+    size_t HeaderSize = sizeof(SnapshotMagic) + 2 * sizeof(uint64_t);
+    if(Size < HeaderSize || std::memcmp(Data, SnapshotMagic, sizeof(SnapshotMagic)) != 0)
     {
-        std::cerr << "ERROR: DDISASM_GTIRB_MODULE_NAME not set\n";
-        return;
+        return false;
+    }
+    uint64_t ByteOrder = ReadValue(sizeof(SnapshotMagic));
+    uint64_t RangeCount = ReadValue(sizeof(SnapshotMagic) + sizeof(uint64_t));
+    if(RangeCount > (Size - HeaderSize) / (3 * sizeof(uint64_t)))
+    {
+        return false;
     }
 
-    auto Modules = IR->findModules(ModuleName);
-    if(Modules.empty())
+    Ranges.clear();
+    for(uint64_t I = 0; I < RangeCount; I++)
     {
-        std::cerr << "ERROR: No module with name: " << ModuleName << "\n";
-        return;
+        size_t Entry = HeaderSize + I * 3 * sizeof(uint64_t);
+        uint64_t Begin = ReadValue(Entry);
+        uint64_t RangeSize = ReadValue(Entry + sizeof(uint64_t));
+        uint64_t Offset = ReadValue(Entry + 2 * sizeof(uint64_t));
+        if(Offset > Size || RangeSize > Size - Offset)
+        {
+            Ranges.clear();
+            return false;
+        }
+        Ranges.push_back(
+            {Begin, Begin + RangeSize, reinterpret_cast<const uint8_t*>(Data + Offset)});
+    }
+    setByteOrder(static_cast<gtirb::ByteOrder>(ByteOrder));
+    indexRanges();
+    return true;
+}
+
+/*
+Start profiling the functors if DDISASM_FUNCTOR_PROFILE names the file that the profile is
+written to.
+
+Used only for the interpreter.
+*/
+void FunctorContextManager::loadProfileConfig(void)
+{
+    if(const char* Path = std::getenv("DDISASM_FUNCTOR_PROFILE"))
+    {
+        ProfilePath = Path;
+        enableProfile();
     }
+}
 
-    FunctorContext.useModule(&(*Modules.begin()));
+FunctorContextManager::~FunctorContextManager()
+{
+    if(!ProfilePath.empty())
+    {
+        std::ofstream Stream(ProfilePath);
+        writeProfile(Stream);
+    }
 }
 #endif /* __EMBEDDED_SOUFFLE__ */
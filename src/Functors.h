@@ -22,10 +22,21 @@
 //===----------------------------------------------------------------------===//
 #ifndef SRC_FUNCTORS_H_
 #define SRC_FUNCTORS_H_
+#include <atomic>
+#include <chrono>
 #include <gtirb/gtirb.hpp>
+#include <memory>
+#include <mutex>
+#include <ostream>
+#include <vector>
 
 #include "souffle/SouffleInterface.h"
 
+#ifndef __EMBEDDED_SOUFFLE__
+#include <boost/interprocess/file_mapping.hpp>
+#include <boost/interprocess/mapped_region.hpp>
+#endif
+
 #ifndef __has_declspec_attribute
 #define __has_declspec_attribute(x) 0
 #endif
@@ -82,23 +93,182 @@ public:
     }
 #else
     {
-        // Load GTIRB from the debug directory when the Context is initialized
-        // if running in the interpreter.
-        loadGtirb();
+        // Load the snapshot of the readable bytes when the Context is initialized if running in
+        // the interpreter.
+        loadSnapshotConfig();
+        loadProfileConfig();
     }
+    ~FunctorContextManager();
 #endif /* __EMBEDDED_SOUFFLE__ */
 
-    const gtirb::ByteInterval* getByteInterval(uint64_t EA, size_t Size);
+    bool isReadable(uint64_t EA, size_t Size);
     void readData(uint64_t EA, uint8_t* Buffer, size_t Count);
     void useModule(const gtirb::Module* M);
     bool IsBigEndian = false;
 
+    /**
+    Get the context of the functors called on the current thread: the one bound to it by a
+    ThreadBinding, or FunctorContext if there is none.
+    */
+    static FunctorContextManager& current();
+
+    /**
+    Binds a context to the current thread, and to the OpenMP threads of the parallel regions it
+    starts with up to Threads threads, while it is alive. This lets the modules of an archive
+    be analyzed concurrently, each on its own thread with its own context.
+
+    The OpenMP threads are bound in a parallel region when the binding is created, so this
+    requires an OpenMP runtime that runs the later parallel regions of a thread on the same
+    threads, as libgomp does; see isSupported().
+
+    While any binding is alive, calling a functor on a thread without a context is an error.
+    */
+    class ThreadBinding
+    {
+    public:
+        ThreadBinding(FunctorContextManager& Context, unsigned int Threads);
+        ~ThreadBinding();
+        ThreadBinding(const ThreadBinding&) = delete;
+        ThreadBinding& operator=(const ThreadBinding&) = delete;
+
+        /**
+        Determine if the bindings of a thread reach the OpenMP threads of its later parallel
+        regions with up to Threads threads.
+        */
+        static bool isSupported(unsigned int Threads);
+
+    private:
+        unsigned int Threads;
+    };
+
+    /**
+    Write a snapshot of the readable bytes of Module to Path for the functors of the
+    interpreter, unless this process already wrote a snapshot of Module to Path and
+    invalidateSnapshot has not been called for Module since. Return true if the snapshot was
+    written.
+
+    The snapshot is a header followed by the bytes of each readable range, in the byte order
+    of the host:
+        "DDFSNAP1", byte order (0: undefined, 1: big, 2: little), range count,
+        then for each range: begin address, size, offset of its bytes in the file.
+    */
+    static bool updateSnapshot(const gtirb::Module& Module, const std::string& Path);
+
+    /**
+    Note that the bytes of Module may have changed, e.g. by the transform phase of a pass, so
+    that its snapshots are written again.
+    */
+    static void invalidateSnapshot(const gtirb::Module& Module);
+
+    /**
+    Number of isReadable/readData lookups that found readable bytes, and that did not, while
+    profiling.
+    */
+    uint64_t getLookupHits();
+    uint64_t getLookupMisses();
+
+    /**
+    The functors that are counted while profiling.
+    */
+    enum class Functor : size_t
+    {
+        DataValid,
+        DataUnsigned,
+        DataU8,
+        DataU16,
+        DataU32,
+        DataU64,
+        DataSigned,
+        DataS8,
+        DataS16,
+        DataS32,
+        DataS64,
+        Aligned,
+        ChooseMax,
+        Thumb32BranchOffset,
+        ToStringHex,
+        Count
+    };
+
+    /**
+    One call in ProfileSamplePeriod of each functor is timed on each thread.
+    */
+    static constexpr uint64_t ProfileSamplePeriod = 64;
+
+    /**
+    Start or stop counting the functor calls. Starting resets all the counters, including the
+    lookup counters.
+    */
+    void enableProfile(bool Enable = true);
+    bool isProfiling() const
+    {
+        return Profiling.load(std::memory_order_relaxed);
+    }
+
+    /**
+    Write the call counts and the sampled times of the functors, and the lookup counters, as
+    JSON.
+    */
+    void writeProfile(std::ostream& Stream);
+
+    /**
+    Counts the call of a functor in which it is declared, and times it if it is sampled.
+    */
+    class ProfileScope
+    {
+    public:
+        explicit ProfileScope(Functor F);
+        ~ProfileScope();
+
+    private:
+        size_t Index;
+        std::atomic<uint64_t>* Counters = nullptr;
+        std::chrono::steady_clock::time_point Start;
+    };
+
 private:
+    /**
+    The initialized bytes of a byte interval in a loaded section that is executable or
+    initialized.
+    */
+    struct ReadableRange
+    {
+        uint64_t Begin;
+        uint64_t End;
+        const uint8_t* Data;
+    };
+
+    const ReadableRange* findRange(uint64_t EA, size_t Size);
+    static std::vector<ReadableRange> getReadableRanges(const gtirb::Module& Module);
+    void setByteOrder(gtirb::ByteOrder ByteOrder);
+    void indexRanges();
+
     const gtirb::Module* Module = nullptr;
 
+    // Readable ranges of Module sorted by address, and the largest End of each prefix of
+    // Ranges, which bounds the search for ranges that overlap.
+    std::vector<ReadableRange> Ranges;
+    std::vector<uint64_t> MaxEnds;
+
+    // Per-thread profile counters: the calls, the sampled calls and their total time in
+    // nanoseconds, in blocks of Functor::Count counters each, then the lookup hits and misses.
+    // Each thread only updates its own counters, so they need no read-modify-write operations.
+    static constexpr size_t LookupHitCounter = 3 * static_cast<size_t>(Functor::Count);
+    static constexpr size_t LookupMissCounter = LookupHitCounter + 1;
+    static constexpr size_t ProfileCounterCount = LookupMissCounter + 1;
+    std::atomic<uint64_t>* threadProfileCounters();
+    std::vector<uint64_t> profileTotals();
+    std::atomic<bool> Profiling = false;
+    std::mutex ProfileMutex;
+    std::vector<std::unique_ptr<std::atomic<uint64_t>[]>> ProfileCounters;
+
 #ifndef __EMBEDDED_SOUFFLE__
-    void loadGtirb(void);
-    std::unique_ptr<gtirb::Context> GtirbContext;
+    void loadSnapshotConfig(void);
+    bool loadSnapshot(const std::string& Path);
+    void loadProfileConfig(void);
+    std::unique_ptr<boost::interprocess::file_mapping> SnapshotFile;
+    std::unique_ptr<boost::interprocess::mapped_region> SnapshotRegion;
+    std::string ProfilePath;
 #endif
 };
 
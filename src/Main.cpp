@@ -22,9 +22,18 @@
 //===----------------------------------------------------------------------===//
 #include <fcntl.h>
 
+#include <algorithm>
+#include <atomic>
 #include <chrono>
+#include <fstream>
+#include <functional>
 #include <iomanip>
+#include <exception>
 #include <iostream>
+#include <mutex>
+#include <optional>
+#include <shared_mutex>
+#include <sstream>
 #include <string>
 #include <thread>
 #include <vector>
@@ -48,8 +57,11 @@
 #include "AnalysisPipeline.h"
 #include "AuxDataSchema.h"
 #include "CliDriver.h"
+#include "Functors.h"
 #include "Hints.h"
 #include "Registration.h"
+#include "ResultCache.h"
+#include "Server.h"
 #include "Version.h"
 #include "gtirb-builder/GtirbBuilder.h"
 #include "passes/DisassemblyPass.h"
@@ -123,12 +135,135 @@ static void checkOutputParamIsWritable(const po::variables_map &Vars, const std:
     }
 }
 
-int main(int argc, char **argv)
+/**
+Get the glob patterns of a list-valued option, splitting each value at commas.
+*/
+static std::vector<std::string> getPatterns(const po::variables_map &Vars,
+                                            const std::string &VarName)
 {
-    registerAuxDataTypes();
-    registerDatalogLoaders();
-    gtirb_pprint::registerPrettyPrinters();
+    std::vector<std::string> Patterns;
+    for(const std::string &Value : Vars[VarName].as<std::vector<std::string>>())
+    {
+        std::stringstream Stream(Value);
+        std::string Pattern;
+        while(std::getline(Stream, Pattern, ','))
+        {
+            Patterns.push_back(Pattern);
+        }
+    }
+    return Patterns;
+}
+
+/**
+Remove the provisional AuxData tables of a module once it has been analyzed.
+*/
+static void removeProvisionalAuxData(gtirb::Module &Module)
+{
+    Module.removeAuxData<gtirb::schema::Relocations>();
+    Module.removeAuxData<gtirb::schema::SectionIndex>();
+}
+
+static uint64_t getModuleSize(const gtirb::Module &Module)
+{
+    uint64_t Size = 0;
+    for(const auto &Section : Module.sections())
+    {
+        Size += Section.getSize().value_or(0);
+    }
+    return Size;
+}
+
+/**
+Analyze the modules of a GTIRB concurrently with Workers threads. Each worker has its own
+pipeline, set up by ConfigurePipeline, and its own functor context, and its pipeline runs the
+Souffle programs with Threads threads. The largest modules are started first, so that a large
+module does not end up running alone at the end.
+
+The progress of each module is written once it has been analyzed. If a pass fails, the workers
+stop taking modules, and false is returned once they are done.
+*/
+static bool runPipelines(gtirb::Context &Context, std::vector<gtirb::Module *> Modules,
+                         unsigned int Workers, unsigned int Threads,
+                         const std::function<void(AnalysisPipeline &)> &ConfigurePipeline,
+                         std::ostream *StatsStream)
+{
+    std::stable_sort(Modules.begin(), Modules.end(),
+                     [](const gtirb::Module *A, const gtirb::Module *B) {
+                         return getModuleSize(*A) > getModuleSize(*B);
+                     });
+
+    std::shared_mutex ContextMutex;
+    std::atomic<size_t> Next = 0;
+    std::atomic<bool> Failed = false;
+    std::mutex ExceptionMutex;
+    std::exception_ptr Exception;
+    auto Work = [&]() {
+        AnalysisPipeline Pipeline;
+        std::shared_ptr<StatsJsonPipelineListener> StatsListener;
+        if(StatsStream)
+        {
+            StatsListener = std::make_shared<StatsJsonPipelineListener>(*StatsStream, false);
+            Pipeline.addListener(StatsListener);
+        }
+        auto Listener = std::make_shared<DDisasmPipelineListener>(true);
+        Pipeline.addListener(Listener);
+        ConfigurePipeline(Pipeline);
+        Pipeline.shareContext(ContextMutex);
+
+        FunctorContextManager WorkerContext;
+        FunctorContextManager::ThreadBinding Binding(WorkerContext, Threads);
+        for(size_t I = Next++; I < Modules.size() && !Failed; I = Next++)
+        {
+            gtirb::Module &Module = *Modules[I];
+            Listener->getOutput() << "Processing module: " << Module.getName() << "\n";
+            if(StatsListener)
+            {
+                StatsListener->setModule(Module.getName());
+            }
+            try
+            {
+                Pipeline.run(Context, Module);
+            }
+            catch(const PassFailedError &)
+            {
+                Failed = true;
+            }
+            catch(...)
+            {
+                // Rethrown by the main thread.
+                std::lock_guard<std::mutex> Lock(ExceptionMutex);
+                if(!Exception)
+                {
+                    Exception = std::current_exception();
+                }
+                Failed = true;
+            }
+            Listener->flush();
+            if(!Failed)
+            {
+                removeProvisionalAuxData(Module);
+            }
+        }
+    };
+
+    std::vector<std::thread> WorkerThreads;
+    for(unsigned int I = 0; I < Workers; I++)
+    {
+        WorkerThreads.emplace_back(Work);
+    }
+    for(std::thread &Thread : WorkerThreads)
+    {
+        Thread.join();
+    }
+    if(Exception)
+    {
+        std::rethrow_exception(Exception);
+    }
+    return !Failed;
+}
 
+static int runDdisasm(int argc, char **argv)
+{
     po::options_description desc("Allowed options");
     desc.add_options()("help,h", "produce help message")("version", "display ddisasm version")(
         "ir", po::value<std::string>()->implicit_value("-"),
@@ -142,6 +277,12 @@ int main(int argc, char **argv)
         "arm, arm64, att, intel, masm, mips32"
         )(
         "debug-dir", po::value<std::string>(), "location to write CSV files for debugging")(
+        "debug-dir-filter", po::value<std::vector<std::string>>()->composing(),
+        "Only write the relations matching a comma-separated list of `pass.relation' glob "
+        "patterns to `--debug-dir'.")(
+        "debug-dir-compress",
+        "Compress the relations written to `--debug-dir' with gzip (appending `.gz' to the file "
+        "names).")(
         "hints", po::value<std::string>(), "location of user-provided hints file")(
         "input-file", po::value<std::string>(), "file to disasemble")(
         "ignore-errors", "Return success even if there are disassembly errors.")(
@@ -153,10 +294,19 @@ int main(int argc, char **argv)
         "skip-function-analysis,F",
         "Skip additional analyses to compute more precise function boundaries.")(
         "with-souffle-relations", "Package facts/output relations into an AuxData table.")(
+        "souffle-relations-filter", po::value<std::vector<std::string>>()->composing(),
+        "Only package the relations matching a comma-separated list of `pass.relation' glob "
+        "patterns (implies `--with-souffle-relations').")(
+        "souffle-relations-encoding", po::value<std::string>()->default_value("csv"),
+        "Encoding of the relations packaged by `--with-souffle-relations': csv or columnar "
+        "(compressed columns).")(
         "no-cfi-directives",
         "Do not produce cfi directives. Instead it produces symbolic expressions in .eh_frame "
         "(this functionality is experimental and does not produce reliable results).")(
         "threads,j", po::value<unsigned int>()->default_value(1), "Number of cores to use.")(
+        "module-workers", po::value<unsigned int>()->default_value(1),
+        "Number of modules of a static archive to disassemble concurrently, each with `--threads' "
+        "threads.")(
         "generate-import-libs", "Generated .DEF and .LIB files for imported libraries (PE).")(
         "generate-resources", "Generated .RES files for embedded resources (PE).")(
         "no-analysis,n",
@@ -166,7 +316,21 @@ int main(int argc, char **argv)
         "library-dir,L", po::value<std::string>(),
         "Directory from which extra libraries are loaded when running the interpreter")(
         "profile", po::value<std::string>()->default_value(""),
-        "Generate Souffle profiling information in the specified directory.");
+        "Generate Souffle profiling information in the specified directory.")(
+        "profile-functors",
+        "Also count the calls of the Datalog functors and time a sample of them (requires "
+        "`--profile').")(
+        "interpreter-cache-dir", po::value<std::string>(),
+        "Reuse the programs compiled by souffle for `--interpreter' with `--profile' from the "
+        "specified directory.")(
+        "cache-dir", po::value<std::string>(),
+        "Reuse disassembly results cached in the specified directory.")(
+        "cache-size", po::value<uint64_t>()->default_value(4096),
+        "Maximum total size of the cache directory in MiB.")(
+        "serve", po::value<std::string>(),
+        "Serve disassembly jobs on the specified Unix socket instead of disassembling a file.")(
+        "stats-json", po::value<std::string>(),
+        "Write per-pass timing and relation statistics as JSON lines to the specified file.");
 
     po::positional_options_description pd;
     pd.add("input-file", -1);
@@ -197,6 +361,11 @@ int main(int argc, char **argv)
         return 1;
     }
 
+    if(vm.count("serve"))
+    {
+        return serveJobs(vm["serve"].as<std::string>(), runDdisasm);
+    }
+
     if(vm.count("input-file") < 1)
     {
         std::cerr << "Error: missing input file\nTry '" << argv[0]
@@ -211,7 +380,61 @@ int main(int argc, char **argv)
         return 1;
     }
 
+    if(vm.count("debug-dir-compress"))
+    {
+        if(vm.count("interpreter"))
+        {
+            // Souffle reads the facts from the debug directory.
+            std::cerr << "Error: `--debug-dir-compress' cannot be used with `--interpreter'\n";
+            return 1;
+        }
+        if(!DatalogIO::supportsCompression())
+        {
+            std::cerr << "Error: `--debug-dir-compress' requires ddisasm built with zlib\n";
+            return 1;
+        }
+    }
+
+    const std::string &RelationsEncoding = vm["souffle-relations-encoding"].as<std::string>();
+    if(RelationsEncoding != "csv" && RelationsEncoding != "columnar")
+    {
+        std::cerr << "Error: unknown `--souffle-relations-encoding': " << RelationsEncoding
+                  << "\n";
+        return 1;
+    }
+
     const std::string &ProfileDir = vm["profile"].as<std::string>();
+    if(ProfileDir.empty() && vm.count("profile-functors"))
+    {
+        std::cerr << "Error: missing `--profile' argument required by `--profile-functors'\n";
+        return 1;
+    }
+    if(vm["module-workers"].as<unsigned int>() == 0)
+    {
+        std::cerr << "Error: `--module-workers' must be at least 1\n";
+        return 1;
+    }
+    if(vm["module-workers"].as<unsigned int>() > 1 && !ProfileDir.empty())
+    {
+        // The profiles of the passes would be written by several modules at once.
+        std::cerr << "Error: `--module-workers' cannot be used with `--profile'\n";
+        return 1;
+    }
+#if defined(DDISASM_SOUFFLE_PROFILING)
+    if(vm["module-workers"].as<unsigned int>() > 1)
+    {
+        // Souffle records the profile events of all the programs in a single global profile.
+        std::cerr << "Error: `--module-workers' requires ddisasm built without Souffle "
+                     "profiling\n";
+        return 1;
+    }
+#endif
+    if(vm.count("interpreter-cache-dir") && (ProfileDir.empty() || !vm.count("interpreter")))
+    {
+        std::cerr << "Error: missing `--interpreter' or `--profile' argument required by "
+                     "`--interpreter-cache-dir'\n";
+        return 1;
+    }
 #if !defined(DDISASM_SOUFFLE_PROFILING)
     if(!ProfileDir.empty() && !vm.count("interpreter"))
     {
@@ -223,11 +446,77 @@ int main(int argc, char **argv)
     checkOutputParamIsWritable(vm, "ir");
     checkOutputParamIsWritable(vm, "json");
 
+    std::string Filename = vm["input-file"].as<std::string>();
+
+    // Look up the result in the cache. Runs that produce side outputs other
+    // than the GTIRB itself are never served from the cache.
+    std::optional<ResultCache> Cache;
+    std::string CacheKey;
+    std::optional<GtirbBuilder::GTIRB> CachedGTIRB;
+    if(vm.count("cache-dir"))
+    {
+        if(vm.count("debug-dir") || vm.count("interpreter") || !ProfileDir.empty()
+           || vm.count("no-analysis"))
+        {
+            std::cerr << "WARNING: `--cache-dir' is ignored with `--debug-dir', `--interpreter', "
+                         "`--profile' and `--no-analysis'\n";
+        }
+        else
+        {
+            std::vector<std::string> KeyOptions;
+            for(const char *Option : {"ignore-errors", "no-cfi-directives", "self-diagnose",
+                                      "skip-function-analysis"})
+            {
+                if(vm.count(Option))
+                {
+                    KeyOptions.push_back(Option);
+                }
+            }
+            // Default values are left out of the key to match the keys of
+            // ddisasm/cache.py.
+            if(vm.count("with-souffle-relations") || vm.count("souffle-relations-filter"))
+            {
+                KeyOptions.push_back("with-souffle-relations");
+                if(vm.count("souffle-relations-filter"))
+                {
+                    std::string Option = "souffle-relations-filter=";
+                    std::vector<std::string> Patterns = getPatterns(vm, "souffle-relations-filter");
+                    for(size_t I = 0; I < Patterns.size(); I++)
+                    {
+                        Option += (I > 0 ? "," : "") + Patterns[I];
+                    }
+                    KeyOptions.push_back(Option);
+                }
+                if(RelationsEncoding != "csv")
+                {
+                    KeyOptions.push_back("souffle-relations-encoding=" + RelationsEncoding);
+                }
+            }
+            Cache.emplace(vm["cache-dir"].as<std::string>(),
+                          vm["cache-size"].as<uint64_t>() * 1024 * 1024);
+            CacheKey = ResultCache::computeKey(
+                Filename, vm.count("hints") ? vm["hints"].as<std::string>() : std::string(),
+                KeyOptions, DDISASM_FULL_VERSION_STRING);
+
+            auto Context = std::make_shared<gtirb::Context>();
+            if(gtirb::IR *IR = Cache->load(CacheKey, *Context))
+            {
+                // The key only covers the content of the input, so the entry may
+                // have been stored for a copy of it under another name.
+                GtirbBuilder::renameModules(*IR, Filename);
+                CachedGTIRB = GtirbBuilder::GTIRB{Context, IR};
+            }
+        }
+    }
+
     // Parse and build a GTIRB module from a supported binary object file.
-    std::cerr << "Building the initial gtirb representation " << std::flush;
+    std::cerr << (CachedGTIRB ? "Loading the cached gtirb representation "
+                              : "Building the initial gtirb representation ")
+              << std::flush;
     auto StartBuildZeroIR = std::chrono::high_resolution_clock::now();
-    std::string Filename = vm["input-file"].as<std::string>();
-    auto GTIRB = GtirbBuilder::read(Filename);
+    gtirb::ErrorOr<GtirbBuilder::GTIRB> GTIRB =
+        CachedGTIRB ? gtirb::ErrorOr<GtirbBuilder::GTIRB>(*CachedGTIRB)
+                    : GtirbBuilder::read(Filename);
     if(!GTIRB)
     {
         std::cerr << "\nERROR: " << Filename << ": " << GTIRB.getError().message() << "\n";
@@ -276,57 +565,139 @@ int main(int argc, char **argv)
         return 0;
     }
 
-    AnalysisPipeline Pipeline;
-    Pipeline.addListener(std::make_shared<DDisasmPipelineListener>());
-    Pipeline.push<DisassemblyPass>(vm.count("self-diagnose") != 0, vm.count("ignore-errors") != 0,
-                                   vm.count("no-cfi-directives") != 0);
-
-    if(vm.count("skip-function-analysis") == 0)
+    std::ofstream StatsFile;
+    if(vm.count("stats-json"))
     {
-        Pipeline.push<SccPass>();
-        Pipeline.push<NoReturnPass>();
-        Pipeline.push<FunctionInferencePass>();
+        const std::string &StatsPath = vm["stats-json"].as<std::string>();
+        StatsFile.open(StatsPath, std::ios::out | std::ios::trunc);
+        if(!StatsFile)
+        {
+            std::cerr << "Error: cannot open statistics file: " << StatsPath << "\n";
+            return 1;
+        }
     }
-
-    Pipeline.setDatalogThreadCount(vm["threads"].as<unsigned int>());
     if(!ProfileDir.empty())
     {
         fs::create_directories(ProfileDir);
-        Pipeline.setDatalogProfileDir(ProfileDir);
     }
 
-    if(vm.count("debug-dir"))
-    {
-        Pipeline.configureDebugDir(vm["debug-dir"].as<std::string>(), ModuleCount > 1);
-    }
+    auto configurePipeline = [&](AnalysisPipeline &Pipeline) {
+        Pipeline.push<DisassemblyPass>(vm.count("self-diagnose") != 0,
+                                       vm.count("ignore-errors") != 0,
+                                       vm.count("no-cfi-directives") != 0);
 
-    if(vm.count("interpreter"))
-    {
-        Pipeline.configureSouffleInterpreter(
-            vm["interpreter"].as<std::string>(),
-            vm.count("library-dir") ? vm["library-dir"].as<std::string>() : std::string());
-    }
+        if(vm.count("skip-function-analysis") == 0)
+        {
+            Pipeline.push<SccPass>();
+            Pipeline.push<NoReturnPass>();
+            Pipeline.push<FunctionInferencePass>();
+        }
 
-    // TODO: currently, hints files have no support for static archives containing multiple modules;
-    // all hints are used when processing each module, which is most likely not desirable.
-    if(vm.count("hints"))
-    {
-        Pipeline.loadHints(vm["hints"].as<std::string>());
-    }
+        Pipeline.setDatalogThreadCount(vm["threads"].as<unsigned int>());
+        if(!ProfileDir.empty())
+        {
+            Pipeline.setDatalogProfileDir(ProfileDir, vm.count("profile-functors") > 0);
+        }
 
-    if(vm.count("with-souffle-relations"))
-    {
-        Pipeline.enableSouffleOutputs();
-    }
+        if(vm.count("debug-dir"))
+        {
+            Pipeline.configureDebugDir(vm["debug-dir"].as<std::string>(), ModuleCount > 1);
+        }
 
-    for(auto &Module : Modules)
+        if(vm.count("interpreter"))
+        {
+            Pipeline.configureSouffleInterpreter(
+                vm["interpreter"].as<std::string>(),
+                vm.count("library-dir") ? vm["library-dir"].as<std::string>() : std::string(),
+                vm.count("interpreter-cache-dir") ? vm["interpreter-cache-dir"].as<std::string>()
+                                                  : std::string());
+        }
+
+        // TODO: currently, hints files have no support for static archives containing multiple
+        // modules; all hints are used when processing each module, which is most likely not
+        // desirable.
+        if(vm.count("hints"))
+        {
+            Pipeline.loadHints(vm["hints"].as<std::string>());
+        }
+
+        if(vm.count("souffle-relations-filter"))
+        {
+            Pipeline.enableSouffleOutputs(RelationsEncoding == "columnar",
+                                          getPatterns(vm, "souffle-relations-filter"));
+        }
+        else if(vm.count("with-souffle-relations"))
+        {
+            Pipeline.enableSouffleOutputs(RelationsEncoding == "columnar");
+        }
+
+        if(vm.count("debug-dir-filter"))
+        {
+            Pipeline.setDebugRelationPatterns(getPatterns(vm, "debug-dir-filter"));
+        }
+
+        if(vm.count("debug-dir-compress"))
+        {
+            Pipeline.enableDebugDirCompression();
+        }
+    };
+
+    if(!CachedGTIRB)
     {
-        std::cerr << "Processing module: " << Module.getName() << "\n";
-        Pipeline.run(*GTIRB->Context, Module);
+        unsigned int Workers = std::min(vm["module-workers"].as<unsigned int>(), ModuleCount);
+        if(Workers > 1
+           && !FunctorContextManager::ThreadBinding::isSupported(vm["threads"].as<unsigned int>()))
+        {
+            std::cerr << "WARNING: the OpenMP runtime does not reuse the threads of parallel "
+                         "regions, which `--module-workers' requires (e.g. libgomp); analyzing "
+                         "one module at a time\n";
+            Workers = 1;
+        }
+        if(Workers > 1)
+        {
+            std::vector<gtirb::Module *> ModulePtrs;
+            for(auto &Module : Modules)
+            {
+                ModulePtrs.push_back(&Module);
+            }
+            if(!runPipelines(*GTIRB->Context, ModulePtrs, Workers,
+                             vm["threads"].as<unsigned int>(), configurePipeline,
+                             StatsFile.is_open() ? &StatsFile : nullptr))
+            {
+                return EXIT_FAILURE;
+            }
+        }
+        else
+        {
+            AnalysisPipeline Pipeline;
+
+            // Registered before DDisasmPipelineListener, which exits on pass errors, so that the
+            // statistics of a failing pass are still written.
+            std::shared_ptr<StatsJsonPipelineListener> StatsListener;
+            if(StatsFile.is_open())
+            {
+                StatsListener = std::make_shared<StatsJsonPipelineListener>(StatsFile);
+                Pipeline.addListener(StatsListener);
+            }
+            Pipeline.addListener(std::make_shared<DDisasmPipelineListener>());
+            configurePipeline(Pipeline);
+
+            for(auto &Module : Modules)
+            {
+                std::cerr << "Processing module: " << Module.getName() << "\n";
+                if(StatsListener)
+                {
+                    StatsListener->setModule(Module.getName());
+                }
+                Pipeline.run(*GTIRB->Context, Module);
+                removeProvisionalAuxData(Module);
+            }
+        }
 
-        // Remove provisional AuxData tables.
-        Module.removeAuxData<gtirb::schema::Relocations>();
-        Module.removeAuxData<gtirb::schema::SectionIndex>();
+        if(Cache)
+        {
+            Cache->store(CacheKey, *GTIRB->IR);
+        }
     }
 
     // Output GTIRB
@@ -458,3 +829,12 @@ int main(int argc, char **argv)
 
     return EXIT_SUCCESS;
 }
+
+int main(int argc, char **argv)
+{
+    registerAuxDataTypes();
+    registerDatalogLoaders();
+    gtirb_pprint::registerPrettyPrinters();
+
+    return runDdisasm(argc, argv);
+}
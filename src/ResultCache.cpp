@@ -0,0 +1,304 @@
+//===- ResultCache.cpp ------------------------------------------*- C++ -*-===//
+//
+//  Copyright (C) 2023 GrammaTech, Inc.
+//
+//  This code is licensed under the GNU Affero General Public License
+//  as published by the Free Software Foundation, either version 3 of
+//  the License, or (at your option) any later version. See the
+//  LICENSE.txt file in the project root for license terms or visit
+//  https://www.gnu.org/licenses/agpl.txt.
+//
+//  This program is distributed in the hope that it will be useful,
+//  but WITHOUT ANY WARRANTY; without even the implied warranty of
+//  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+//  GNU Affero General Public License for more details.
+//
+//  This project is sponsored by the Office of Naval Research, One Liberty
+//  Center, 875 N. Randolph Street, Arlington, VA 22203 under contract #
+//  N68335-17-C-0700.  The content of the information does not necessarily
+//  reflect the position or policy of the Government and no official
+//  endorsement should be inferred.
+//
+//===----------------------------------------------------------------------===//
+#include "ResultCache.h"
+
+#include <algorithm>
+#include <array>
+#include <boost/filesystem.hpp>
+#include <fstream>
+#include <iomanip>
+#include <iostream>
+#include <sstream>
+
+namespace fs = boost::filesystem;
+
+namespace
+{
+    // Bump when the layout of cache entries or the key derivation changes.
+    const char* CacheFormatTag = "ddisasm-cache-1";
+
+    const char* CacheEntryExtension = ".gtirb";
+
+    class Sha256
+    {
+    public:
+        void update(const uint8_t* Data, size_t Size)
+        {
+            Length += Size;
+            while(Size > 0)
+            {
+                size_t Count = std::min(Size, Block.size() - BlockSize);
+                std::copy(Data, Data + Count, Block.begin() + BlockSize);
+                BlockSize += Count;
+                Data += Count;
+                Size -= Count;
+                if(BlockSize == Block.size())
+                {
+                    transform();
+                    BlockSize = 0;
+                }
+            }
+        }
+
+        std::string hexdigest()
+        {
+            uint64_t BitLength = Length * 8;
+            uint8_t Pad = 0x80;
+            update(&Pad, 1);
+            Pad = 0;
+            while(BlockSize != 56)
+            {
+                update(&Pad, 1);
+            }
+            for(int I = 7; I >= 0; I--)
+            {
+                uint8_t Byte = static_cast<uint8_t>(BitLength >> (I * 8));
+                update(&Byte, 1);
+            }
+
+            std::stringstream Hex;
+            Hex << std::hex << std::setfill('0');
+            for(uint32_t Word : State)
+            {
+                Hex << std::setw(8) << Word;
+            }
+            return Hex.str();
+        }
+
+    private:
+        static uint32_t rotr(uint32_t X, int N)
+        {
+            return (X >> N) | (X << (32 - N));
+        }
+
+        void transform()
+        {
+            static const uint32_t K[64] = {
+                0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4,
+                0xab1c5ed5, 0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe,
+                0x9bdc06a7, 0xc19bf174, 0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f,
+                0x4a7484aa, 0x5cb0a9dc, 0x76f988da, 0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7,
+                0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967, 0x27b70a85, 0x2e1b2138, 0x4d2c6dfc,
+                0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85, 0xa2bfe8a1, 0xa81a664b,
+                0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070, 0x19a4c116,
+                0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+                0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7,
+                0xc67178f2};
+
+            uint32_t W[64];
+            for(int I = 0; I < 16; I++)
+            {
+                W[I] = (static_cast<uint32_t>(Block[I * 4]) << 24)
+                       | (static_cast<uint32_t>(Block[I * 4 + 1]) << 16)
+                       | (static_cast<uint32_t>(Block[I * 4 + 2]) << 8)
+                       | static_cast<uint32_t>(Block[I * 4 + 3]);
+            }
+            for(int I = 16; I < 64; I++)
+            {
+                uint32_t S0 = rotr(W[I - 15], 7) ^ rotr(W[I - 15], 18) ^ (W[I - 15] >> 3);
+                uint32_t S1 = rotr(W[I - 2], 17) ^ rotr(W[I - 2], 19) ^ (W[I - 2] >> 10);
+                W[I] = W[I - 16] + S0 + W[I - 7] + S1;
+            }
+
+            uint32_t A = State[0], B = State[1], C = State[2], D = State[3];
+            uint32_t E = State[4], F = State[5], G = State[6], H = State[7];
+            for(int I = 0; I < 64; I++)
+            {
+                uint32_t S1 = rotr(E, 6) ^ rotr(E, 11) ^ rotr(E, 25);
+                uint32_t Ch = (E & F) ^ (~E & G);
+                uint32_t T1 = H + S1 + Ch + K[I] + W[I];
+                uint32_t S0 = rotr(A, 2) ^ rotr(A, 13) ^ rotr(A, 22);
+                uint32_t Maj = (A & B) ^ (A & C) ^ (B & C);
+                uint32_t T2 = S0 + Maj;
+                H = G;
+                G = F;
+                F = E;
+                E = D + T1;
+                D = C;
+                C = B;
+                B = A;
+                A = T1 + T2;
+            }
+            State[0] += A;
+            State[1] += B;
+            State[2] += C;
+            State[3] += D;
+            State[4] += E;
+            State[5] += F;
+            State[6] += G;
+            State[7] += H;
+        }
+
+        std::array<uint32_t, 8> State = {0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a,
+                                         0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19};
+        std::array<uint8_t, 64> Block;
+        size_t BlockSize = 0;
+        uint64_t Length = 0;
+    };
+} // namespace
+
+std::string sha256Hex(std::istream &Stream)
+{
+    Sha256 Hash;
+    std::array<char, 1 << 16> Buffer;
+    while(Stream)
+    {
+        Stream.read(Buffer.data(), Buffer.size());
+        Hash.update(reinterpret_cast<const uint8_t *>(Buffer.data()),
+                    static_cast<size_t>(Stream.gcount()));
+    }
+    return Hash.hexdigest();
+}
+
+static std::string sha256File(const std::string &Path)
+{
+    std::ifstream Stream(Path, std::ios::in | std::ios::binary);
+    if(!Stream)
+    {
+        return "-";
+    }
+    return sha256Hex(Stream);
+}
+
+ResultCache::ResultCache(const std::string &Directory, uint64_t MaxSize)
+    : Directory(Directory), MaxSize(MaxSize)
+{
+    fs::create_directories(Directory);
+}
+
+std::string ResultCache::computeKey(const std::string &InputPath, const std::string &HintsPath,
+                                    std::vector<std::string> Options, const std::string &Version)
+{
+    std::sort(Options.begin(), Options.end());
+
+    // The key is the digest of a small text description of the request. The
+    // Python package derives the same description (see ddisasm/cache.py), so
+    // the two must be kept in sync.
+    std::stringstream Description;
+    Description << CacheFormatTag << "\n";
+    Description << Version << "\n";
+    Description << sha256File(InputPath) << "\n";
+    Description << (HintsPath.empty() ? "-" : sha256File(HintsPath)) << "\n";
+    for(const std::string &Option : Options)
+    {
+        Description << Option << "\n";
+    }
+    return sha256Hex(Description);
+}
+
+std::string ResultCache::entryPath(const std::string &Key) const
+{
+    return (fs::path(Directory) / (Key + CacheEntryExtension)).string();
+}
+
+gtirb::IR *ResultCache::load(const std::string &Key, gtirb::Context &Context)
+{
+    std::string Path = entryPath(Key);
+    std::ifstream Stream(Path, std::ios::in | std::ios::binary);
+    if(!Stream)
+    {
+        return nullptr;
+    }
+
+    gtirb::ErrorOr<gtirb::IR *> Result = gtirb::IR::load(Context, Stream);
+    if(!Result)
+    {
+        std::cerr << "WARNING: ignoring unreadable cache entry: " << Path << "\n";
+        return nullptr;
+    }
+
+    // Mark the entry as recently used.
+    boost::system::error_code Ec;
+    fs::last_write_time(Path, std::time(nullptr), Ec);
+    return *Result;
+}
+
+void ResultCache::store(const std::string &Key, const gtirb::IR &IR)
+{
+    // Write to a temporary file first so that concurrent ddisasm processes
+    // sharing the cache never observe a partially written entry.
+    std::string Path = entryPath(Key);
+    fs::path TempPath = fs::path(Directory) / fs::unique_path("%%%%-%%%%-%%%%.tmp");
+    {
+        std::ofstream Out(TempPath.string(), std::ios::out | std::ios::binary);
+        if(!Out)
+        {
+            std::cerr << "WARNING: could not write cache entry: " << Path << "\n";
+            return;
+        }
+        IR.save(Out);
+    }
+
+    boost::system::error_code Ec;
+    fs::rename(TempPath, Path, Ec);
+    if(Ec)
+    {
+        std::cerr << "WARNING: could not write cache entry: " << Path << "\n";
+        fs::remove(TempPath, Ec);
+        return;
+    }
+    evict();
+}
+
+void ResultCache::evict()
+{
+    struct Entry
+    {
+        fs::path Path;
+        std::time_t LastUsed;
+        uint64_t Size;
+    };
+
+    std::vector<Entry> Entries;
+    uint64_t TotalSize = 0;
+    boost::system::error_code Ec;
+    for(const fs::directory_entry &DirEntry : fs::directory_iterator(Directory, Ec))
+    {
+        const fs::path &Path = DirEntry.path();
+        if(Path.extension() != CacheEntryExtension || !fs::is_regular_file(Path, Ec))
+        {
+            continue;
+        }
+        uint64_t Size = fs::file_size(Path, Ec);
+        std::time_t LastUsed = fs::last_write_time(Path, Ec);
+        if(Ec)
+        {
+            // Removed concurrently by another process.
+            continue;
+        }
+        Entries.push_back({Path, LastUsed, Size});
+        TotalSize += Size;
+    }
+
+    std::sort(Entries.begin(), Entries.end(),
+              [](const Entry &A, const Entry &B) { return A.LastUsed < B.LastUsed; });
+    for(const Entry &E : Entries)
+    {
+        if(TotalSize <= MaxSize)
+        {
+            break;
+        }
+        fs::remove(E.Path, Ec);
+        TotalSize -= E.Size;
+    }
+}
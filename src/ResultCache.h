@@ -0,0 +1,79 @@
+//===- ResultCache.h --------------------------------------------*- C++ -*-===//
+//
+//  Copyright (C) 2023 GrammaTech, Inc.
+//
+//  This code is licensed under the GNU Affero General Public License
+//  as published by the Free Software Foundation, either version 3 of
+//  the License, or (at your option) any later version. See the
+//  LICENSE.txt file in the project root for license terms or visit
+//  https://www.gnu.org/licenses/agpl.txt.
+//
+//  This program is distributed in the hope that it will be useful,
+//  but WITHOUT ANY WARRANTY; without even the implied warranty of
+//  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+//  GNU Affero General Public License for more details.
+//
+//  This project is sponsored by the Office of Naval Research, One Liberty
+//  Center, 875 N. Randolph Street, Arlington, VA 22203 under contract #
+//  N68335-17-C-0700.  The content of the information does not necessarily
+//  reflect the position or policy of the Government and no official
+//  endorsement should be inferred.
+//
+//===----------------------------------------------------------------------===//
+#ifndef _RESULT_CACHE_H_
+#define _RESULT_CACHE_H_
+
+#include <cstdint>
+#include <gtirb/gtirb.hpp>
+#include <istream>
+#include <string>
+#include <vector>
+
+/**
+Compute the SHA-256 digest of a stream, as a lowercase hex string.
+*/
+std::string sha256Hex(std::istream& Stream);
+
+/**
+A content-addressed, on-disk cache of disassembly results.
+
+Entries are GTIRB files named by a key derived from the content of the input
+binary and the hints file, the options that affect the analysis, and the
+ddisasm version. Entries are evicted in least-recently-used order once the
+total size of the cache directory exceeds its limit.
+*/
+class ResultCache
+{
+public:
+    ResultCache(const std::string& Directory, uint64_t MaxSize);
+
+    /**
+    Compute the cache key for a disassembly request.
+
+    HintsPath may be empty. Options holds the names of the command-line flags
+    that affect the analysis; their order is irrelevant.
+    */
+    static std::string computeKey(const std::string& InputPath, const std::string& HintsPath,
+                                  std::vector<std::string> Options, const std::string& Version);
+
+    /**
+    Load a cached result into Context.
+
+    Returns nullptr if there is no entry for Key.
+    */
+    gtirb::IR* load(const std::string& Key, gtirb::Context& Context);
+
+    /**
+    Store a result and evict old entries to respect the size limit.
+    */
+    void store(const std::string& Key, const gtirb::IR& IR);
+
+private:
+    std::string entryPath(const std::string& Key) const;
+    void evict();
+
+    std::string Directory;
+    uint64_t MaxSize;
+};
+
+#endif /* _RESULT_CACHE_H_ */
@@ -0,0 +1,337 @@
+//===- Server.cpp -----------------------------------------------*- C++ -*-===//
+//
+//  Copyright (C) 2023 GrammaTech, Inc.
+//
+//  This code is licensed under the GNU Affero General Public License
+//  as published by the Free Software Foundation, either version 3 of
+//  the License, or (at your option) any later version. See the
+//  LICENSE.txt file in the project root for license terms or visit
+//  https://www.gnu.org/licenses/agpl.txt.
+//
+//  This program is distributed in the hope that it will be useful,
+//  but WITHOUT ANY WARRANTY; without even the implied warranty of
+//  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+//  GNU Affero General Public License for more details.
+//
+//  This project is sponsored by the Office of Naval Research, One Liberty
+//  Center, 875 N. Randolph Street, Arlington, VA 22203 under contract #
+//  N68335-17-C-0700.  The content of the information does not necessarily
+//  reflect the position or policy of the Government and no official
+//  endorsement should be inferred.
+//
+//===----------------------------------------------------------------------===//
+#include "Server.h"
+
+#include <iostream>
+
+#if defined(__unix__)
+#include <fcntl.h>
+#include <poll.h>
+#include <sys/socket.h>
+#include <sys/un.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+#include <cerrno>
+#include <csignal>
+#include <cstring>
+#include <map>
+#include <vector>
+
+namespace
+{
+    struct Job
+    {
+        std::vector<std::string> Args;
+        int OutFd = -1;
+        int ErrFd = -1;
+    };
+
+    bool readFully(int Fd, char* Buffer, size_t Size)
+    {
+        while(Size > 0)
+        {
+            ssize_t Count = read(Fd, Buffer, Size);
+            if(Count < 0 && errno == EINTR)
+            {
+                continue;
+            }
+            if(Count <= 0)
+            {
+                return false;
+            }
+            Buffer += Count;
+            Size -= Count;
+        }
+        return true;
+    }
+
+    bool writeFully(int Fd, const char* Buffer, size_t Size)
+    {
+        while(Size > 0)
+        {
+            ssize_t Count = write(Fd, Buffer, Size);
+            if(Count < 0 && errno == EINTR)
+            {
+                continue;
+            }
+            if(Count <= 0)
+            {
+                return false;
+            }
+            Buffer += Count;
+            Size -= Count;
+        }
+        return true;
+    }
+
+    void closeJobFds(Job& J)
+    {
+        if(J.OutFd >= 0)
+        {
+            close(J.OutFd);
+        }
+        if(J.ErrFd >= 0)
+        {
+            close(J.ErrFd);
+        }
+        J.OutFd = J.ErrFd = -1;
+    }
+
+    bool receiveJob(int Conn, Job& J)
+    {
+        uint32_t Length = 0;
+        char Control[CMSG_SPACE(2 * sizeof(int))];
+        iovec Iov = {&Length, sizeof(Length)};
+        msghdr Msg = {};
+        Msg.msg_iov = &Iov;
+        Msg.msg_iovlen = 1;
+        Msg.msg_control = Control;
+        Msg.msg_controllen = sizeof(Control);
+
+        ssize_t Received = recvmsg(Conn, &Msg, 0);
+        if(Received <= 0)
+        {
+            return false;
+        }
+
+        for(cmsghdr* Cmsg = CMSG_FIRSTHDR(&Msg); Cmsg != nullptr; Cmsg = CMSG_NXTHDR(&Msg, Cmsg))
+        {
+            if(Cmsg->cmsg_level == SOL_SOCKET && Cmsg->cmsg_type == SCM_RIGHTS)
+            {
+                int Fds[2] = {-1, -1};
+                size_t Count = (Cmsg->cmsg_len - CMSG_LEN(0)) / sizeof(int);
+                std::memcpy(Fds, CMSG_DATA(Cmsg), std::min<size_t>(Count, 2) * sizeof(int));
+                J.OutFd = Fds[0];
+                J.ErrFd = Fds[1];
+            }
+        }
+        if(J.OutFd < 0 || J.ErrFd < 0)
+        {
+            std::cerr << "WARNING: ignoring job without stdout/stderr descriptors\n";
+            return false;
+        }
+
+        if(static_cast<size_t>(Received) < sizeof(Length)
+           && !readFully(Conn, reinterpret_cast<char*>(&Length) + Received,
+                         sizeof(Length) - Received))
+        {
+            return false;
+        }
+
+        std::string Payload(Length, '\0');
+        if(!readFully(Conn, Payload.data(), Payload.size()))
+        {
+            return false;
+        }
+
+        size_t Start = 0;
+        while(Start < Payload.size())
+        {
+            size_t End = Payload.find('\0', Start);
+            if(End == std::string::npos)
+            {
+                End = Payload.size();
+            }
+            J.Args.push_back(Payload.substr(Start, End - Start));
+            Start = End + 1;
+        }
+        // The working directory is mandatory.
+        return !J.Args.empty();
+    }
+
+    void sendStatus(int Conn, int32_t Status)
+    {
+        writeFully(Conn, reinterpret_cast<const char*>(&Status), sizeof(Status));
+        close(Conn);
+    }
+
+    // Read and write ends of the pipe that SIGCHLD is forwarded to.
+    int ChildPipe[2] = {-1, -1};
+
+    void notifyChildExit(int)
+    {
+        int SavedErrno = errno;
+        char Byte = 0;
+        [[maybe_unused]] ssize_t Count = write(ChildPipe[1], &Byte, 1);
+        errno = SavedErrno;
+    }
+
+    bool setNonBlocking(int Fd)
+    {
+        int Flags = fcntl(Fd, F_GETFL);
+        return Flags >= 0 && fcntl(Fd, F_SETFL, Flags | O_NONBLOCK) == 0;
+    }
+
+    [[noreturn]] void runJob(Job& J, DdisasmMain Run)
+    {
+        dup2(J.OutFd, STDOUT_FILENO);
+        dup2(J.ErrFd, STDERR_FILENO);
+        closeJobFds(J);
+
+        if(chdir(J.Args[0].c_str()) != 0)
+        {
+            std::cerr << "Error: could not change directory to " << J.Args[0] << "\n";
+            std::exit(EXIT_FAILURE);
+        }
+
+        std::string ProgramName = "ddisasm";
+        std::vector<char*> Argv = {ProgramName.data()};
+        for(auto It = J.Args.begin() + 1; It != J.Args.end(); ++It)
+        {
+            Argv.push_back(It->data());
+        }
+        Argv.push_back(nullptr);
+
+        int Code = Run(static_cast<int>(Argv.size() - 1), Argv.data());
+        std::cout << std::flush;
+        std::cerr << std::flush;
+        std::exit(Code);
+    }
+} // namespace
+
+int serveJobs(const std::string &SocketPath, DdisasmMain Run)
+{
+    sockaddr_un Addr = {};
+    Addr.sun_family = AF_UNIX;
+    if(SocketPath.size() >= sizeof(Addr.sun_path))
+    {
+        std::cerr << "Error: socket path is too long: " << SocketPath << "\n";
+        return 1;
+    }
+    std::strncpy(Addr.sun_path, SocketPath.c_str(), sizeof(Addr.sun_path) - 1);
+
+    int Listener = socket(AF_UNIX, SOCK_STREAM, 0);
+    unlink(SocketPath.c_str());
+    if(Listener < 0 || bind(Listener, reinterpret_cast<sockaddr *>(&Addr), sizeof(Addr)) != 0
+       || listen(Listener, SOMAXCONN) != 0)
+    {
+        std::cerr << "Error: could not listen on " << SocketPath << ": " << std::strerror(errno)
+                  << "\n";
+        return 1;
+    }
+
+    // Exited jobs are reported through a self-pipe, so that the server sleeps
+    // in poll() until there is either a new connection or a job to reap.
+    if(pipe(ChildPipe) != 0 || !setNonBlocking(ChildPipe[0]) || !setNonBlocking(ChildPipe[1]))
+    {
+        std::cerr << "Error: could not create a pipe: " << std::strerror(errno) << "\n";
+        return 1;
+    }
+    struct sigaction Action = {};
+    Action.sa_handler = notifyChildExit;
+    Action.sa_flags = SA_RESTART | SA_NOCLDSTOP;
+    sigemptyset(&Action.sa_mask);
+    sigaction(SIGCHLD, &Action, nullptr);
+    // A client that hangs up before its job finishes must not kill the server.
+    signal(SIGPIPE, SIG_IGN);
+
+    std::cerr << "Serving disassembly jobs on " << SocketPath << "\n";
+
+    // Connections of running jobs, waiting for their exit status.
+    std::map<pid_t, int> Running;
+    while(true)
+    {
+        pollfd Polls[2] = {{Listener, POLLIN, 0}, {ChildPipe[0], POLLIN, 0}};
+        if(poll(Polls, 2, -1) < 0)
+        {
+            continue;
+        }
+
+        if(Polls[1].revents & POLLIN)
+        {
+            char Drain[64];
+            while(read(ChildPipe[0], Drain, sizeof(Drain)) > 0)
+            {
+            }
+
+            int Status;
+            pid_t Pid;
+            while((Pid = waitpid(-1, &Status, WNOHANG)) > 0)
+            {
+                auto It = Running.find(Pid);
+                if(It != Running.end())
+                {
+                    sendStatus(It->second, WIFEXITED(Status) ? WEXITSTATUS(Status)
+                                                             : 128 + WTERMSIG(Status));
+                    Running.erase(It);
+                }
+            }
+        }
+
+        if(!(Polls[0].revents & POLLIN))
+        {
+            continue;
+        }
+
+        int Conn = accept(Listener, nullptr, nullptr);
+        if(Conn < 0)
+        {
+            continue;
+        }
+
+        // The job is received by the forked child, so that a slow client
+        // cannot hold up the connections of others.
+        std::cout << std::flush;
+        std::cerr << std::flush;
+        pid_t Pid = fork();
+        if(Pid == 0)
+        {
+            signal(SIGCHLD, SIG_DFL);
+            signal(SIGPIPE, SIG_DFL);
+            close(ChildPipe[0]);
+            close(ChildPipe[1]);
+            close(Listener);
+            for(auto &[OtherPid, OtherConn] : Running)
+            {
+                close(OtherConn);
+            }
+
+            Job J;
+            if(!receiveJob(Conn, J))
+            {
+                std::exit(EXIT_FAILURE);
+            }
+            close(Conn);
+            runJob(J, Run);
+        }
+
+        if(Pid < 0)
+        {
+            std::cerr << "WARNING: could not start job: " << std::strerror(errno) << "\n";
+            sendStatus(Conn, EXIT_FAILURE);
+            continue;
+        }
+        Running[Pid] = Conn;
+    }
+}
+
+#else
+
+int serveJobs(const std::string &SocketPath, DdisasmMain Run)
+{
+    std::cerr << "Error: `--serve' is only supported on POSIX platforms\n";
+    return 1;
+}
+
+#endif /* defined(__unix__) */
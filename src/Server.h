@@ -0,0 +1,55 @@
+//===- Server.h -------------------------------------------------*- C++ -*-===//
+//
+//  Copyright (C) 2023 GrammaTech, Inc.
+//
+//  This code is licensed under the GNU Affero General Public License
+//  as published by the Free Software Foundation, either version 3 of
+//  the License, or (at your option) any later version. See the
+//  LICENSE.txt file in the project root for license terms or visit
+//  https://www.gnu.org/licenses/agpl.txt.
+//
+//  This program is distributed in the hope that it will be useful,
+//  but WITHOUT ANY WARRANTY; without even the implied warranty of
+//  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+//  GNU Affero General Public License for more details.
+//
+//  This project is sponsored by the Office of Naval Research, One Liberty
+//  Center, 875 N. Randolph Street, Arlington, VA 22203 under contract #
+//  N68335-17-C-0700.  The content of the information does not necessarily
+//  reflect the position or policy of the Government and no official
+//  endorsement should be inferred.
+//
+//===----------------------------------------------------------------------===//
+#ifndef _SERVER_H_
+#define _SERVER_H_
+
+#include <string>
+
+/**
+Function that runs a single ddisasm invocation given its command line.
+*/
+using DdisasmMain = int (*)(int argc, char** argv);
+
+/**
+Serve disassembly jobs on a Unix socket until the process is terminated.
+
+Each job is received and run by calling Run in a forked child of the server.
+Everything initialized before serveJobs() is called (AuxData type
+registrations, Datalog loaders, Souffle program factories, loaded shared
+libraries) is inherited by the child instead of being set up again for every
+job, a slow client does not hold up the others, and a job that fails cannot
+take the server down with it.
+
+A client sends one job per connection: a native-endian uint32_t payload length
+followed by the payload, a sequence of NUL-terminated strings. The first string
+is the working directory of the job and the remaining strings are the ddisasm
+command-line arguments. The client's stdout and stderr file descriptors are
+passed along with the length as SCM_RIGHTS ancillary data. Once the job
+finishes, the server replies with its exit status as a native-endian int32_t
+and closes the connection.
+
+Returns a non-zero exit code if the server cannot be started.
+*/
+int serveJobs(const std::string& SocketPath, DdisasmMain Run);
+
+#endif /* _SERVER_H_ */
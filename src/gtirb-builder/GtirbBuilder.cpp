@@ -134,6 +134,26 @@ gtirb::ErrorOr<GTIRB> GtirbBuilder::read(std::string Path)
     return GtirbBuilder::build_error::NotSupported;
 }
 
+void GtirbBuilder::renameModules(gtirb::IR& IR, const std::string& Path)
+{
+    if(LIEF::ELF::is_elf(Path) || LIEF::PE::is_pe(Path))
+    {
+        for(gtirb::Module& Module : IR.modules())
+        {
+            Module.setName(fs::path(Path).filename().string());
+            Module.setBinaryPath(Path);
+        }
+    }
+    else if(ArchiveReader::isAr(Path))
+    {
+        // Archive members are named after the member itself.
+        for(gtirb::Module& Module : IR.modules())
+        {
+            Module.setBinaryPath(Path);
+        }
+    }
+}
+
 GtirbBuilder::GtirbBuilder(std::string P, std::string Name, std::shared_ptr<gtirb::Context> Context,
                            gtirb::IR* IR, std::shared_ptr<LIEF::Binary> B)
     : Path(P), Context(Context), IR(IR), Binary(B)
@@ -48,6 +48,12 @@ public:
     static gtirb::ErrorOr<GTIRB> read(std::string Path);
     virtual void build();
 
+    /// \brief Give the modules of IR the names and binary paths that read()
+    /// assigns to the modules it builds from the binary at Path.
+    ///
+    /// GTIRB inputs are left unchanged, as their modules keep their own names.
+    static void renameModules(gtirb::IR& IR, const std::string& Path);
+
     /// \enum build_error
     /// \brief Specifies various failure modes when loading a binary.
     enum class build_error
@@ -0,0 +1,458 @@
+//===- ColumnarRelation.cpp -------------------------------------*- C++ -*-===//
+//
+//  Copyright (C) 2023 GrammaTech, Inc.
+//
+//  This code is licensed under the GNU Affero General Public License
+//  as published by the Free Software Foundation, either version 3 of
+//  the License, or (at your option) any later version. See the
+//  LICENSE.txt file in the project root for license terms or visit
+//  https://www.gnu.org/licenses/agpl.txt.
+//
+//  This program is distributed in the hope that it will be useful,
+//  but WITHOUT ANY WARRANTY; without even the implied warranty of
+//  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+//  GNU Affero General Public License for more details.
+//
+//  This project is sponsored by the Office of Naval Research, One Liberty
+//  Center, 875 N. Randolph Street, Arlington, VA 22203 under contract #
+//  N68335-17-C-0700.  The content of the information does not necessarily
+//  reflect the position or policy of the Government and no official
+//  endorsement should be inferred.
+//
+//===----------------------------------------------------------------------===//
+#include "ColumnarRelation.h"
+
+#include <algorithm>
+#include <cstring>
+#include <iostream>
+#include <sstream>
+
+#ifdef DDISASM_ZLIB
+#include <zlib.h>
+#endif
+
+namespace ColumnarRelation
+{
+    const std::string TypeTag = "columnar/1/";
+
+    static const char *const Base64Alphabet =
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/";
+
+    static std::string base64Encode(const std::string &Bytes)
+    {
+        std::string Text;
+        Text.reserve((Bytes.size() + 2) / 3 * 4);
+        size_t I = 0;
+        for(; I + 2 < Bytes.size(); I += 3)
+        {
+            uint32_t Group = static_cast<uint8_t>(Bytes[I]) << 16
+                             | static_cast<uint8_t>(Bytes[I + 1]) << 8
+                             | static_cast<uint8_t>(Bytes[I + 2]);
+            Text.push_back(Base64Alphabet[(Group >> 18) & 0x3f]);
+            Text.push_back(Base64Alphabet[(Group >> 12) & 0x3f]);
+            Text.push_back(Base64Alphabet[(Group >> 6) & 0x3f]);
+            Text.push_back(Base64Alphabet[Group & 0x3f]);
+        }
+        if(I < Bytes.size())
+        {
+            uint32_t Group = static_cast<uint8_t>(Bytes[I]) << 16;
+            if(I + 1 < Bytes.size())
+            {
+                Group |= static_cast<uint8_t>(Bytes[I + 1]) << 8;
+            }
+            Text.push_back(Base64Alphabet[(Group >> 18) & 0x3f]);
+            Text.push_back(Base64Alphabet[(Group >> 12) & 0x3f]);
+            Text.push_back(I + 1 < Bytes.size() ? Base64Alphabet[(Group >> 6) & 0x3f] : '=');
+            Text.push_back('=');
+        }
+        return Text;
+    }
+
+    static bool base64Decode(const std::string &Text, std::string &Bytes)
+    {
+        int8_t Values[256];
+        std::fill(std::begin(Values), std::end(Values), -1);
+        for(int I = 0; I < 64; I++)
+        {
+            Values[static_cast<uint8_t>(Base64Alphabet[I])] = I;
+        }
+
+        Bytes.clear();
+        Bytes.reserve(Text.size() / 4 * 3);
+        uint32_t Group = 0;
+        int Bits = 0;
+        for(char C : Text)
+        {
+            if(C == '=')
+            {
+                break;
+            }
+            int8_t Value = Values[static_cast<uint8_t>(C)];
+            if(Value < 0)
+            {
+                return false;
+            }
+            Group = (Group << 6) | Value;
+            Bits += 6;
+            if(Bits >= 8)
+            {
+                Bits -= 8;
+                Bytes.push_back(static_cast<char>((Group >> Bits) & 0xff));
+            }
+        }
+        return true;
+    }
+
+    static void appendUint32(std::string &Out, uint32_t Value)
+    {
+        for(int I = 0; I < 4; I++)
+        {
+            Out.push_back(static_cast<char>((Value >> (8 * I)) & 0xff));
+        }
+    }
+
+    static void appendUint64(std::string &Out, uint64_t Value)
+    {
+        for(int I = 0; I < 8; I++)
+        {
+            Out.push_back(static_cast<char>((Value >> (8 * I)) & 0xff));
+        }
+    }
+
+    /**
+    Sequential reader of the little-endian fields of a payload.
+    */
+    class PayloadReader
+    {
+    public:
+        explicit PayloadReader(const std::string &Payload) : Payload(Payload)
+        {
+        }
+
+        bool readUint32(uint32_t &Value)
+        {
+            uint64_t Wide;
+            if(!readInteger(Wide, 4))
+            {
+                return false;
+            }
+            Value = static_cast<uint32_t>(Wide);
+            return true;
+        }
+
+        bool readUint64(uint64_t &Value)
+        {
+            return readInteger(Value, 8);
+        }
+
+        bool readText(std::string &Text, size_t Size)
+        {
+            if(Payload.size() - Offset < Size)
+            {
+                return false;
+            }
+            Text.assign(Payload, Offset, Size);
+            Offset += Size;
+            return true;
+        }
+
+        size_t remaining() const
+        {
+            return Payload.size() - Offset;
+        }
+
+    private:
+        bool readInteger(uint64_t &Value, size_t Size)
+        {
+            if(Payload.size() - Offset < Size)
+            {
+                return false;
+            }
+            Value = 0;
+            for(size_t I = 0; I < Size; I++)
+            {
+                uint64_t Byte = static_cast<uint8_t>(Payload[Offset + I]);
+                Value |= Byte << (8 * I);
+            }
+            Offset += Size;
+            return true;
+        }
+
+        const std::string &Payload;
+        size_t Offset = 0;
+    };
+
+    static bool isNumericType(const std::string &AttrType)
+    {
+        return !AttrType.empty()
+               && (AttrType[0] == 'i' || AttrType[0] == 'u' || AttrType[0] == 'f');
+    }
+
+    bool isColumnar(const std::string &Type)
+    {
+        return Type.compare(0, TypeTag.size(), TypeTag) == 0;
+    }
+
+    Encoder::Encoder(const std::vector<std::string> &AttrTypes)
+    {
+        for(const std::string &AttrType : AttrTypes)
+        {
+            Column C;
+            C.Numeric = isNumericType(AttrType);
+            Columns.push_back(std::move(C));
+        }
+    }
+
+    Encoder::Column &Encoder::nextColumn()
+    {
+        Column &C = Columns[Next];
+        Next++;
+        if(Next == Columns.size())
+        {
+            Next = 0;
+            TupleCount++;
+        }
+        return C;
+    }
+
+    void Encoder::addNumber(uint64_t Bits)
+    {
+        nextColumn().Numbers.push_back(Bits);
+    }
+
+    void Encoder::addText(const std::string &Text)
+    {
+        Column &C = nextColumn();
+        auto [It, Inserted] = C.ValueIndices.try_emplace(Text, C.Values.size());
+        if(Inserted)
+        {
+            C.Values.push_back(Text);
+        }
+        C.Indices.push_back(It->second);
+    }
+
+    void Encoder::finish(const std::string &Signature, bool Compress, std::string &Type,
+                         std::string &Data)
+    {
+        std::string Payload;
+        appendUint64(Payload, TupleCount);
+        for(const Column &C : Columns)
+        {
+            if(C.Numeric)
+            {
+                for(uint64_t Number : C.Numbers)
+                {
+                    appendUint64(Payload, Number);
+                }
+                continue;
+            }
+            appendUint32(Payload, static_cast<uint32_t>(C.Values.size()));
+            for(const std::string &Value : C.Values)
+            {
+                appendUint32(Payload, static_cast<uint32_t>(Value.size()));
+                Payload += Value;
+            }
+            for(uint32_t Index : C.Indices)
+            {
+                appendUint32(Payload, Index);
+            }
+        }
+
+        std::string Compression = "none";
+#ifdef DDISASM_ZLIB
+        if(Compress)
+        {
+            uLongf CompressedSize = compressBound(Payload.size());
+            std::string Frame;
+            appendUint64(Frame, Payload.size());
+            Frame.resize(8 + CompressedSize);
+            if(compress2(reinterpret_cast<Bytef *>(&Frame[8]), &CompressedSize,
+                         reinterpret_cast<const Bytef *>(Payload.data()), Payload.size(),
+                         Z_DEFAULT_COMPRESSION)
+               == Z_OK)
+            {
+                Frame.resize(8 + CompressedSize);
+                Payload = std::move(Frame);
+                Compression = "zlib";
+            }
+        }
+#else
+        (void)Compress;
+#endif
+
+        Type = TypeTag + Compression + ";" + Signature;
+        Data = base64Encode(Payload);
+    }
+
+    static bool decompress(const std::string &Compression, std::string &Payload)
+    {
+        if(Compression == "none")
+        {
+            return true;
+        }
+#ifdef DDISASM_ZLIB
+        if(Compression == "zlib")
+        {
+            uint64_t Size;
+            // zlib cannot expand its input by more than a factor of 1032, which bounds the
+            // untrusted size before allocating it.
+            if(!PayloadReader(Payload).readUint64(Size) || Size / 1032 > Payload.size())
+            {
+                return false;
+            }
+            std::string Uncompressed(Size, '\0');
+            uLongf UncompressedSize = Size;
+            if(uncompress(reinterpret_cast<Bytef *>(&Uncompressed[0]), &UncompressedSize,
+                          reinterpret_cast<const Bytef *>(Payload.data() + 8),
+                          Payload.size() - 8)
+                   != Z_OK
+               || UncompressedSize != Size)
+            {
+                return false;
+            }
+            Payload = std::move(Uncompressed);
+            return true;
+        }
+#else
+        (void)Payload;
+#endif
+        std::cerr << "Error: unsupported relation compression: " << Compression << "\n";
+        return false;
+    }
+
+    static void formatNumber(std::ostream &Stream, const std::string &AttrType, uint64_t Bits)
+    {
+        // Same formatting as DatalogIO::serializeAttribute.
+        switch(AttrType[0])
+        {
+            case 'u':
+                if(AttrType == "u:address")
+                {
+                    Stream << std::hex << Bits << std::dec;
+                }
+                else
+                {
+                    Stream << Bits;
+                }
+                break;
+            case 'i':
+                Stream << static_cast<int64_t>(Bits);
+                break;
+            case 'f':
+            {
+                double Value;
+                static_assert(sizeof(Value) == sizeof(Bits));
+                std::memcpy(&Value, &Bits, sizeof(Value));
+                Stream << Value;
+                break;
+            }
+        }
+    }
+
+    bool decode(const std::string &Type, const std::string &Data, std::string &Signature,
+                std::string &Csv)
+    {
+        size_t Separator = Type.find(';', TypeTag.size());
+        if(!isColumnar(Type) || Separator == std::string::npos)
+        {
+            std::cerr << "Error: not a columnar relation type: " << Type << "\n";
+            return false;
+        }
+        std::string Compression = Type.substr(TypeTag.size(), Separator - TypeTag.size());
+        Signature = Type.substr(Separator + 1);
+
+        // The type of each attribute is what follows the attribute name.
+        std::vector<std::string> AttrTypes;
+        std::stringstream SignatureStream(Signature);
+        std::string Attribute;
+        while(std::getline(SignatureStream, Attribute, ','))
+        {
+            AttrTypes.push_back(Attribute.substr(Attribute.find(':') + 1));
+        }
+
+        std::string Payload;
+        if(!base64Decode(Data, Payload) || !decompress(Compression, Payload))
+        {
+            std::cerr << "Error: malformed columnar relation data\n";
+            return false;
+        }
+
+        PayloadReader Reader(Payload);
+        // Every tuple takes at least four bytes in each column, which bounds the untrusted
+        // tuple count before the columns are allocated.
+        uint64_t TupleCount;
+        if(!Reader.readUint64(TupleCount)
+           || (!AttrTypes.empty() && TupleCount > Reader.remaining() / 4))
+        {
+            std::cerr << "Error: malformed columnar relation data\n";
+            return false;
+        }
+
+        // Read the columns, keeping numeric values as bits and text values as indices into
+        // the distinct values of their column.
+        std::vector<std::vector<uint64_t>> Numbers(AttrTypes.size());
+        std::vector<std::vector<std::string>> Values(AttrTypes.size());
+        for(size_t I = 0; I < AttrTypes.size(); I++)
+        {
+            bool Ok = true;
+            if(isNumericType(AttrTypes[I]))
+            {
+                Ok = Reader.remaining() / 8 >= TupleCount;
+                Numbers[I].resize(Ok ? TupleCount : 0);
+                for(uint64_t &Number : Numbers[I])
+                {
+                    Ok = Ok && Reader.readUint64(Number);
+                }
+            }
+            else
+            {
+                uint32_t ValueCount;
+                // Each distinct value is prefixed by its four-byte size.
+                Ok = Reader.readUint32(ValueCount) && ValueCount <= Reader.remaining() / 4;
+                Values[I].resize(Ok ? ValueCount : 0);
+                for(std::string &Value : Values[I])
+                {
+                    uint32_t Size;
+                    Ok = Ok && Reader.readUint32(Size) && Reader.readText(Value, Size);
+                }
+                Ok = Ok && Reader.remaining() / 4 >= TupleCount;
+                Numbers[I].resize(Ok ? TupleCount : 0);
+                for(uint64_t &Index : Numbers[I])
+                {
+                    uint32_t Narrow = 0;
+                    Ok = Ok && Reader.readUint32(Narrow) && Narrow < ValueCount;
+                    Index = Narrow;
+                }
+            }
+            if(!Ok)
+            {
+                std::cerr << "Error: malformed columnar relation data\n";
+                return false;
+            }
+        }
+
+        std::ostringstream Stream;
+        Stream << std::showbase;
+        for(uint64_t Row = 0; Row < TupleCount; Row++)
+        {
+            for(size_t I = 0; I < AttrTypes.size(); I++)
+            {
+                if(I > 0)
+                {
+                    Stream << "\t";
+                }
+                if(isNumericType(AttrTypes[I]))
+                {
+                    formatNumber(Stream, AttrTypes[I], Numbers[I][Row]);
+                }
+                else
+                {
+                    Stream << Values[I][Numbers[I][Row]];
+                }
+            }
+            Stream << "\n";
+        }
+        Csv = Stream.str();
+        return true;
+    }
+} // namespace ColumnarRelation
@@ -0,0 +1,102 @@
+//===- ColumnarRelation.h ---------------------------------------*- C++ -*-===//
+//
+//  Copyright (C) 2023 GrammaTech, Inc.
+//
+//  This code is licensed under the GNU Affero General Public License
+//  as published by the Free Software Foundation, either version 3 of
+//  the License, or (at your option) any later version. See the
+//  LICENSE.txt file in the project root for license terms or visit
+//  https://www.gnu.org/licenses/agpl.txt.
+//
+//  This program is distributed in the hope that it will be useful,
+//  but WITHOUT ANY WARRANTY; without even the implied warranty of
+//  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+//  GNU Affero General Public License for more details.
+//
+//  This project is sponsored by the Office of Naval Research, One Liberty
+//  Center, 875 N. Randolph Street, Arlington, VA 22203 under contract #
+//  N68335-17-C-0700.  The content of the information does not necessarily
+//  reflect the position or policy of the Government and no official
+//  endorsement should be inferred.
+//
+//===----------------------------------------------------------------------===//
+#ifndef _COLUMNAR_RELATION_H_
+#define _COLUMNAR_RELATION_H_
+
+#include <cstdint>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+/**
+Compact encoding of Souffle relations stored in the souffleFacts and souffleOutputs AuxData.
+
+The AuxData type string of an encoded relation is TypeTag, followed by the compression of the
+data ("zlib" or "none"), a ';' and the type signature written by DatalogIO::serializeType.
+
+The data is the base64 encoding of a frame that, for "zlib", is the little-endian uint64 size of
+the uncompressed payload followed by its zlib stream; for "none" it is the payload itself. The
+payload holds the little-endian uint64 number of tuples followed by one column per attribute:
+- numeric attributes (i, u, f): one 64-bit little-endian value per tuple;
+- symbol and record attributes (s, r): a uint32 number of distinct values, each value as a
+  uint32 length and its text (records in the same text form as in CSV), then one uint32 index
+  into these values per tuple.
+*/
+namespace ColumnarRelation
+{
+    extern const std::string TypeTag;
+
+    /**
+    Determine if an AuxData type string is that of a relation in the columnar encoding.
+    */
+    bool isColumnar(const std::string& Type);
+
+    /**
+    Builds the columnar encoding of a relation from its attribute values, given one tuple at a
+    time in attribute order.
+    */
+    class Encoder
+    {
+    public:
+        explicit Encoder(const std::vector<std::string>& AttrTypes);
+
+        void addNumber(uint64_t Bits);
+        void addText(const std::string& Text);
+
+        /**
+        Complete the encoding, compressing the data with zlib if requested and available, and
+        return the AuxData type string and data.
+        */
+        void finish(const std::string& Signature, bool Compress, std::string& Type,
+                    std::string& Data);
+
+    private:
+        struct Column
+        {
+            bool Numeric;
+            std::vector<uint64_t> Numbers;
+            std::vector<std::string> Values;
+            std::vector<uint32_t> Indices;
+            // Index of each distinct value in Values.
+            std::unordered_map<std::string, uint32_t> ValueIndices;
+        };
+
+        Column& nextColumn();
+
+        std::vector<Column> Columns;
+        size_t Next = 0;
+        uint64_t TupleCount = 0;
+    };
+
+    /**
+    Decode a relation in the columnar encoding into its type signature and the same CSV text
+    that DatalogIO::writeRelation produces.
+
+    Returns false (after printing the reason) if the data is malformed or uses a compression
+    that is not available.
+    */
+    bool decode(const std::string& Type, const std::string& Data, std::string& Signature,
+                std::string& Csv);
+} // namespace ColumnarRelation
+
+#endif // _COLUMNAR_RELATION_H_
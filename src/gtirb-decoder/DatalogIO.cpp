@@ -24,18 +24,84 @@
 
 #include <souffle/RamTypes.h>
 
+#include <atomic>
+#include <cctype>
+#include <charconv>
+#include <cstdio>
+#include <exception>
 #include <fstream>
+#include <functional>
 #include <list>
 #include <map>
+#include <mutex>
+#include <string_view>
+#include <thread>
 
-#if defined(DDISASM_SOUFFLE_PROFILING)
-#include <souffle/profile/ProfileEvent.h>
+#include "ColumnarRelation.h"
+
+#ifdef DDISASM_ZLIB
+#include <zlib.h>
+#endif
 
 #include <boost/filesystem.hpp>
+#include <boost/interprocess/file_mapping.hpp>
+#include <boost/interprocess/mapped_region.hpp>
 
 namespace fs = boost::filesystem;
+
+#if defined(DDISASM_SOUFFLE_PROFILING)
+#include <souffle/profile/ProfileEvent.h>
 #endif
 
+static bool startsWithIgnoreCase(const std::string &Text, size_t Pos, const char *Prefix)
+{
+    for(; *Prefix; Prefix++, Pos++)
+    {
+        if(Pos >= Text.size() || std::tolower(static_cast<unsigned char>(Text[Pos])) != *Prefix)
+        {
+            return false;
+        }
+    }
+    return true;
+}
+
+/**
+Parse a field of a record, the type of which is unknown.
+*/
+static souffle::RamDomain insertRecordField(souffle::SouffleProgram &Program,
+                                            const std::string &Field)
+{
+    // We don't know what the form of the record type is. Try parsing it as an unsigned or
+    // signed integer, a float, a record, and finally insert it as a string. Whether the
+    // std::sto* functions succeed only depends on the first character after whitespace and
+    // a sign, which is checked first to avoid throwing exceptions.
+    size_t I = 0;
+    while(I < Field.size() && std::isspace(static_cast<unsigned char>(Field[I])))
+    {
+        I++;
+    }
+    if(I < Field.size() && (Field[I] == '+' || Field[I] == '-'))
+    {
+        I++;
+    }
+    if(I < Field.size() && std::isdigit(static_cast<unsigned char>(Field[I])))
+    {
+        // Both unsigned and signed integers are accepted by std::stoull.
+        return souffle::ramBitCast(static_cast<uint64_t>(std::stoull(Field, 0, 0)));
+    }
+    if((I + 1 < Field.size() && Field[I] == '.'
+        && std::isdigit(static_cast<unsigned char>(Field[I + 1])))
+       || startsWithIgnoreCase(Field, I, "inf") || startsWithIgnoreCase(Field, I, "nan"))
+    {
+        return souffle::ramBitCast(std::stod(Field));
+    }
+    if(!Field.empty() && Field.front() == '[' && Field.back() == ']')
+    {
+        return DatalogIO::insertRecord(Program, Field);
+    }
+    return Program.getSymbolTable().encode(Field);
+}
+
 /**
 Create a record from a string and return the record ID.
 */
@@ -47,11 +113,9 @@ souffle::RamDomain DatalogIO::insertRecord(souffle::SouffleProgram &Program,
         throw std::invalid_argument("Could not parse record");
     }
 
-    souffle::RecordTable &RecordTable = Program.getRecordTable();
-    souffle::SymbolTable &SymbolTable = Program.getSymbolTable();
-
-    // Create string without the enclosing record brackets
-    std::string RemainingFieldText = RecordText.substr(1, RecordText.size() - 2);
+    // String without the enclosing record brackets
+    std::string_view RemainingFieldText(RecordText);
+    RemainingFieldText = RemainingFieldText.substr(1, RemainingFieldText.size() - 2);
 
     // There is currently no way to query souffle for the structure of the
     // record type.
@@ -59,92 +123,26 @@ souffle::RamDomain DatalogIO::insertRecord(souffle::SouffleProgram &Program,
     // types. This code could be wrong, for example, if a string entry is a
     // valid integer or record.
     std::vector<souffle::RamDomain> RecordData;
-    std::string InferredRecordType;
-    std::string Field;
     bool End = false;
     while(!End)
     {
         size_t Pos = RemainingFieldText.find(", ");
-        if(Pos == std::string::npos)
+        if(Pos == std::string_view::npos)
         {
             Pos = RemainingFieldText.size();
             End = true;
         }
-        Field = RemainingFieldText.substr(0, Pos);
+        std::string Field(RemainingFieldText.substr(0, Pos));
 
         if(!End)
         {
             RemainingFieldText = RemainingFieldText.substr(Pos + 2);
         }
 
-        enum ParseMode
-        {
-            PARSE_UNSIGNED,
-            PARSE_SIGNED,
-            PARSE_FLOAT,
-            PARSE_RECORD,
-            PARSE_STRING,
-            PARSE_END /* Keep at end */
-        };
-
-        // We don't know what the form of the record type is. Just try parsing
-        // until something works...
-        for(unsigned int ParseAttempt = PARSE_UNSIGNED; ParseAttempt < PARSE_END; ParseAttempt++)
-        {
-            std::string InferredFieldType = "";
-            try
-            {
-                switch(ParseAttempt)
-                {
-                    case PARSE_UNSIGNED:
-                    {
-                        // Unsigned int
-                        uint64_t Number = std::stoull(Field, 0, 0);
-                        RecordData.push_back(souffle::ramBitCast(Number));
-                        InferredFieldType = "u";
-                        break;
-                    }
-                    case PARSE_SIGNED:
-                    {
-                        // Signed int
-                        int64_t Number = std::stoll(Field, 0, 0);
-                        RecordData.push_back(souffle::ramBitCast(Number));
-                        InferredFieldType = "i";
-                        break;
-                    }
-                    case PARSE_FLOAT:
-                    {
-                        // Float
-                        RecordData.push_back(souffle::ramBitCast(std::stod(Field)));
-                        InferredFieldType = "f";
-                        break;
-                    }
-                    case PARSE_RECORD:
-                    {
-                        // Record
-                        RecordData.push_back(insertRecord(Program, Field));
-                        InferredFieldType = "r";
-                        break;
-                    }
-                    case PARSE_STRING:
-                        // Nothing else worked - insert it as a string.
-                        RecordData.push_back(SymbolTable.encode(Field));
-                        InferredFieldType = "s";
-                        break;
-                }
-            }
-            catch(std::invalid_argument e)
-            {
-                // Didn't parse correctly - try parsing as a different type.
-                continue;
-            }
-
-            // Parsing succeeded.
-            break;
-        }
+        RecordData.push_back(insertRecordField(Program, Field));
     }
 
-    return RecordTable.pack(RecordData.data(), RecordData.size());
+    return Program.getRecordTable().pack(RecordData.data(), RecordData.size());
 }
 
 bool DatalogIO::insertTuple(const std::string &TupleText, souffle::SouffleProgram &Program,
@@ -250,8 +248,10 @@ void DatalogIO::serializeAttribute(std::ostream &Stream, souffle::SouffleProgram
     }
 }
 
-void DatalogIO::serializeRecord(std::ostream &Stream, souffle::SouffleProgram &Program,
-                                const std::string &AttrType, souffle::RamDomain RecordId)
+/**
+Get the attribute types of the fields of a record type.
+*/
+static const std::list<std::string> &getRecordFieldTypes(const std::string &AttrType)
 {
     // There is no way to look up record type information from the Datalog. We
     // have to keep a map of definitions here.
@@ -265,12 +265,18 @@ void DatalogIO::serializeRecord(std::ostream &Stream, souffle::SouffleProgram &P
         throw std::logic_error("Serialization for datalog record type " + AttrType
                                + " not defined");
     }
+    return It->second;
+}
 
-    const souffle::RamDomain *Record = Program.getRecordTable().unpack(RecordId, It->second.size());
+void DatalogIO::serializeRecord(std::ostream &Stream, souffle::SouffleProgram &Program,
+                                const std::string &AttrType, souffle::RamDomain RecordId)
+{
+    const std::list<std::string> &FieldTypes = getRecordFieldTypes(AttrType);
+    const souffle::RamDomain *Record = Program.getRecordTable().unpack(RecordId, FieldTypes.size());
 
     Stream << "[";
     unsigned int I = 0;
-    for(const std::string &RecordAttr : It->second)
+    for(const std::string &RecordAttr : FieldTypes)
     {
         if(I > 0)
         {
@@ -292,36 +298,351 @@ void DatalogIO::serializeType(std::ostream &Stream, souffle::Relation *Relation)
     }
 }
 
+namespace
+{
+    /**
+    Run Task(0), ..., Task(Count - 1) on up to Threads threads, including the calling one.
+    The first exception thrown by a task is rethrown once all the tasks are done.
+    */
+    void runParallel(size_t Count, unsigned int Threads, const std::function<void(size_t)> &Task)
+    {
+        // Each worker takes the next task until there are none left.
+        std::atomic<size_t> Next = 0;
+        std::exception_ptr Error;
+        std::mutex ErrorMutex;
+        auto Work = [&]() {
+            for(size_t I = Next++; I < Count; I = Next++)
+            {
+                try
+                {
+                    Task(I);
+                }
+                catch(...)
+                {
+                    std::lock_guard<std::mutex> Lock(ErrorMutex);
+                    if(!Error)
+                    {
+                        Error = std::current_exception();
+                    }
+                }
+            }
+        };
+
+        std::vector<std::thread> Workers;
+        size_t WorkerCount = std::min<size_t>(std::max(Threads, 1U), Count);
+        for(size_t I = 1; I < WorkerCount; I++)
+        {
+            Workers.emplace_back(Work);
+        }
+        Work();
+        for(std::thread &Worker : Workers)
+        {
+            Worker.join();
+        }
+        if(Error)
+        {
+            std::rethrow_exception(Error);
+        }
+    }
+
+    /**
+    Formats the tuples of a relation as lines of tab-separated attributes, into a buffer that is
+    reused for all the tuples. The text is the same as that of serializeAttribute on a stream
+    with std::showbase.
+    */
+    class RelationFormatter
+    {
+    public:
+        // Size of the formatted text after which the buffer should be flushed.
+        static constexpr size_t FlushSize = 1 << 16;
+
+        RelationFormatter(souffle::SouffleProgram &P, const souffle::Relation *Relation)
+            : Program(P), SymbolTable(P.getSymbolTable())
+        {
+            for(size_t I = 0; I < Relation->getArity(); I++)
+            {
+                AttrTypes.push_back(Relation->getAttrType(I));
+            }
+            Buffer.reserve(FlushSize * 2);
+        }
+
+        void append(const souffle::tuple &Tuple)
+        {
+            for(size_t I = 0; I < AttrTypes.size(); I++)
+            {
+                if(I > 0)
+                {
+                    Buffer.push_back('\t');
+                }
+                appendAttribute(AttrTypes[I], Tuple[I]);
+            }
+            Buffer.push_back('\n');
+        }
+
+        std::string Buffer;
+
+    private:
+        void appendAttribute(const std::string &AttrType, souffle::RamDomain Data)
+        {
+            switch(AttrType[0])
+            {
+                case 's':
+                    Buffer.append(SymbolTable.unsafeDecode(Data));
+                    break;
+                case 'u':
+                {
+                    auto Value = souffle::ramBitCast<souffle::RamUnsigned>(Data);
+                    if(AttrType == "u:address")
+                    {
+                        // std::showbase omits the prefix of zero.
+                        if(Value != 0)
+                        {
+                            Buffer.append("0x");
+                        }
+                        appendNumber(Value, 16);
+                    }
+                    else
+                    {
+                        appendNumber(Value, 10);
+                    }
+                    break;
+                }
+                case 'f':
+                {
+                    char Text[32];
+                    int Size = std::snprintf(Text, sizeof(Text), "%g",
+                                             souffle::ramBitCast<souffle::RamFloat>(Data));
+                    Buffer.append(Text, Size);
+                    break;
+                }
+                case 'i':
+                    appendNumber(souffle::ramBitCast<souffle::RamSigned>(Data), 10);
+                    break;
+                case 'r':
+                {
+                    const std::list<std::string> &FieldTypes = getRecordFieldTypes(AttrType);
+                    const souffle::RamDomain *Record =
+                        Program.getRecordTable().unpack(Data, FieldTypes.size());
+                    Buffer.push_back('[');
+                    size_t I = 0;
+                    for(const std::string &FieldType : FieldTypes)
+                    {
+                        if(I > 0)
+                        {
+                            Buffer.append(", ");
+                        }
+                        appendAttribute(FieldType, Record[I]);
+                        I++;
+                    }
+                    Buffer.push_back(']');
+                    break;
+                }
+                default:
+                    throw std::logic_error("Serialization for datalog type " + AttrType
+                                           + " not defined");
+            }
+        }
+
+        template <typename T>
+        void appendNumber(T Value, int Base)
+        {
+            char Text[32];
+            std::to_chars_result Result = std::to_chars(Text, Text + sizeof(Text), Value, Base);
+            Buffer.append(Text, Result.ptr);
+        }
+
+        souffle::SouffleProgram &Program;
+        souffle::SymbolTable &SymbolTable;
+        std::vector<std::string> AttrTypes;
+    };
+
+    /**
+    Write a relation to a file, compressed with gzip if Compress is set.
+    */
+    void writeRelationFile(const std::string &Path, souffle::SouffleProgram &Program,
+                           const souffle::Relation *Relation, bool Compress)
+    {
+        RelationFormatter Formatter(Program, Relation);
+#ifdef DDISASM_ZLIB
+        if(Compress)
+        {
+            // Favor speed over size: these are debugging dumps.
+            gzFile File = gzopen(Path.c_str(), "wb1");
+            if(File == nullptr)
+            {
+                throw std::runtime_error("Could not open " + Path);
+            }
+            auto Flush = [&]() {
+                if(!Formatter.Buffer.empty()
+                   && gzwrite(File, Formatter.Buffer.data(), Formatter.Buffer.size()) == 0)
+                {
+                    gzclose(File);
+                    throw std::runtime_error("Could not write " + Path);
+                }
+                Formatter.Buffer.clear();
+            };
+            for(const souffle::tuple &Tuple : *Relation)
+            {
+                Formatter.append(Tuple);
+                if(Formatter.Buffer.size() >= RelationFormatter::FlushSize)
+                {
+                    Flush();
+                }
+            }
+            Flush();
+            gzclose(File);
+            return;
+        }
+#else
+        if(Compress)
+        {
+            throw std::logic_error("Relation compression is not supported");
+        }
+#endif
+        std::ofstream File(Path, std::ios::out | std::ios::binary);
+        for(const souffle::tuple &Tuple : *Relation)
+        {
+            Formatter.append(Tuple);
+            if(Formatter.Buffer.size() >= RelationFormatter::FlushSize)
+            {
+                File.write(Formatter.Buffer.data(), Formatter.Buffer.size());
+                Formatter.Buffer.clear();
+            }
+        }
+        File.write(Formatter.Buffer.data(), Formatter.Buffer.size());
+    }
+} // namespace
+
 void DatalogIO::writeRelation(std::ostream &Stream, souffle::SouffleProgram &Program,
                               const souffle::Relation *Relation)
 {
-    Stream << std::showbase;
+    RelationFormatter Formatter(Program, Relation);
+    for(const souffle::tuple &Tuple : *Relation)
+    {
+        Formatter.append(Tuple);
+        if(Formatter.Buffer.size() >= RelationFormatter::FlushSize)
+        {
+            Stream.write(Formatter.Buffer.data(), Formatter.Buffer.size());
+            Formatter.Buffer.clear();
+        }
+    }
+    Stream.write(Formatter.Buffer.data(), Formatter.Buffer.size());
+}
 
+void DatalogIO::writeColumnarRelation(std::string &Type, std::string &Data,
+                                      souffle::SouffleProgram &Program,
+                                      souffle::Relation *Relation, bool Compress)
+{
+    souffle::SymbolTable &SymbolTable = Program.getSymbolTable();
+
+    std::vector<std::string> AttrTypes;
+    for(size_t I = 0; I < Relation->getArity(); I++)
+    {
+        AttrTypes.push_back(Relation->getAttrType(I));
+    }
+
+    ColumnarRelation::Encoder Encoder(AttrTypes);
+    std::stringstream Record;
     for(souffle::tuple Tuple : *Relation)
     {
         for(size_t I = 0; I < Tuple.size(); I++)
         {
-            if(I > 0)
+            switch(AttrTypes[I][0])
             {
-                Stream << "\t";
+                case 's':
+                    Encoder.addText(SymbolTable.unsafeDecode(Tuple[I]));
+                    break;
+                case 'r':
+                    Record.str("");
+                    serializeRecord(Record, Program, AttrTypes[I], Tuple[I]);
+                    Encoder.addText(Record.str());
+                    break;
+                default:
+                    Encoder.addNumber(souffle::ramBitCast<souffle::RamUnsigned>(Tuple[I]));
+                    break;
             }
-            serializeAttribute(Stream, Program, Relation->getAttrType(I), Tuple[I]);
         }
-        Stream << "\n";
     }
+
+    std::stringstream Signature;
+    serializeType(Signature, Relation);
+    Encoder.finish(Signature.str(), Compress, Type, Data);
+}
+
+bool DatalogIO::supportsCompression()
+{
+#ifdef DDISASM_ZLIB
+    return true;
+#else
+    return false;
+#endif
 }
 
 void DatalogIO::writeRelations(const std::string &Directory, const std::string &FileExtension,
                                souffle::SouffleProgram &Program,
-                               const std::vector<souffle::Relation *> &Relations)
+                               const std::vector<souffle::Relation *> &Relations,
+                               unsigned int Threads, bool Compress)
+{
+    std::string Suffix = Compress ? FileExtension + ".gz" : FileExtension;
+    runParallel(Relations.size(), Threads, [&](size_t I) {
+        writeRelationFile(Directory + Relations[I]->getName() + Suffix, Program, Relations[I],
+                          Compress);
+    });
+}
+
+static bool matchGlob(const std::string &Pattern, const std::string &Name)
 {
-    std::ios_base::openmode FileMask = std::ios::out;
+    size_t P = 0, N = 0;
+    // Position of the last '*' in the pattern and the name position it was tried at.
+    size_t StarP = std::string::npos, StarN = 0;
+    while(N < Name.size())
+    {
+        if(P < Pattern.size() && (Pattern[P] == '?' || Pattern[P] == Name[N]))
+        {
+            P++;
+            N++;
+        }
+        else if(P < Pattern.size() && Pattern[P] == '*')
+        {
+            StarP = P++;
+            StarN = N;
+        }
+        else if(StarP != std::string::npos)
+        {
+            // Let the last '*' match one more character.
+            P = StarP + 1;
+            N = ++StarN;
+        }
+        else
+        {
+            return false;
+        }
+    }
+    while(P < Pattern.size() && Pattern[P] == '*')
+    {
+        P++;
+    }
+    return P == Pattern.size();
+}
+
+std::vector<souffle::Relation *> DatalogIO::selectRelations(
+    const std::vector<souffle::Relation *> &Relations, const std::string &Namespace,
+    const std::vector<std::string> &Patterns)
+{
+    std::vector<souffle::Relation *> Selected;
     for(souffle::Relation *Relation : Relations)
     {
-        std::ofstream File(Directory + Relation->getName() + FileExtension, FileMask);
-        writeRelation(File, Program, Relation);
-        File.close();
+        std::string Name = Namespace + "." + Relation->getName();
+        for(const std::string &Pattern : Patterns)
+        {
+            if(matchGlob(Pattern, Name))
+            {
+                Selected.push_back(Relation);
+                break;
+            }
+        }
     }
+    return Selected;
 }
 
 void DatalogIO::writeFacts(const std::string &Directory, souffle::SouffleProgram &Program)
@@ -336,23 +657,259 @@ void DatalogIO::writeRelations(const std::string &Directory, souffle::SoufflePro
     writeRelations(Directory, FileExtension, Program, Program.getOutputRelations());
 }
 
-void DatalogIO::readRelations(souffle::SouffleProgram &Program, const std::string &Directory)
+namespace
+{
+    // Size of the pieces of a CSV file that are parsed in parallel.
+    constexpr size_t ChunkSize = 1 << 20;
+
+    /**
+    Parse an unsigned integer as std::stoull with base 0 does, or fail if it is not a plain
+    decimal or hexadecimal number.
+    */
+    bool parsePlainUnsigned(std::string_view Text, uint64_t &Value)
+    {
+        const char *Begin = Text.data();
+        const char *End = Text.data() + Text.size();
+        int Base = 10;
+        if(Text.size() > 2 && Text[0] == '0' && (Text[1] == 'x' || Text[1] == 'X'))
+        {
+            Begin += 2;
+            Base = 16;
+        }
+        else if(Text.size() > 1 && Text[0] == '0')
+        {
+            // Octal.
+            return false;
+        }
+        std::from_chars_result Result = std::from_chars(Begin, End, Value, Base);
+        return Result.ec == std::errc() && Result.ptr == End;
+    }
+
+    uint64_t parseUnsigned(std::string_view Text)
+    {
+        uint64_t Value;
+        return parsePlainUnsigned(Text, Value) ? Value : std::stoull(std::string(Text), 0, 0);
+    }
+
+    int64_t parseSigned(std::string_view Text)
+    {
+        bool Negative = !Text.empty() && Text[0] == '-';
+        uint64_t Magnitude;
+        if(parsePlainUnsigned(Negative ? Text.substr(1) : Text, Magnitude)
+           && Magnitude <= static_cast<uint64_t>(INT64_MAX) + Negative)
+        {
+            return Negative ? static_cast<int64_t>(0 - Magnitude) : static_cast<int64_t>(Magnitude);
+        }
+        return std::stoll(std::string(Text), 0, 0);
+    }
+
+    /**
+    The tuples of a piece of a CSV file, as parsed by insertTuple.
+
+    Numbers are parsed in parallel, while symbols and records are left for the thread that
+    inserts the tuples, as encoding them updates the symbol and record tables.
+    */
+    struct ParsedChunk
+    {
+        // Arity values per tuple; the values of symbol and record attributes are set on
+        // insertion.
+        std::vector<souffle::RamDomain> Values;
+        // The text of the symbol and record attributes of each tuple.
+        std::vector<std::string_view> Texts;
+        // Messages about the lines of the chunk, printed when the chunk is inserted.
+        std::string Messages;
+        size_t TupleCount = 0;
+    };
+
+    void parseChunk(std::string_view Text, const std::vector<std::string> &AttrTypes,
+                    ParsedChunk &Chunk)
+    {
+        size_t Arity = AttrTypes.size();
+        std::vector<std::string_view> Fields;
+        while(!Text.empty())
+        {
+            size_t LineEnd = Text.find('\n');
+            std::string_view Line = Text.substr(0, LineEnd);
+            Text = LineEnd == std::string_view::npos ? "" : Text.substr(LineEnd + 1);
+
+            // Split the line in the same way as std::getline, in which an empty last field is
+            // missing.
+            Fields.clear();
+            if(Arity == 1)
+            {
+                Fields.push_back(Line);
+            }
+            else
+            {
+                for(size_t Begin = 0;;)
+                {
+                    size_t Tab = Line.find('\t', Begin);
+                    if(Tab == std::string_view::npos)
+                    {
+                        if(Begin < Line.size())
+                        {
+                            Fields.push_back(Line.substr(Begin));
+                        }
+                        break;
+                    }
+                    Fields.push_back(Line.substr(Begin, Tab - Begin));
+                    Begin = Tab + 1;
+                }
+                if(Fields.size() < Arity)
+                {
+                    Chunk.Messages += "CSV file has less fields than expected\n";
+                    continue;
+                }
+            }
+
+            size_t ValueCount = Chunk.Values.size();
+            size_t TextCount = Chunk.Texts.size();
+            size_t I = 0;
+            try
+            {
+                for(; I < Arity; I++)
+                {
+                    souffle::RamDomain Value = 0;
+                    switch(AttrTypes[I][0])
+                    {
+                        case 's':
+                        case 'r':
+                            Chunk.Texts.push_back(Fields[I]);
+                            break;
+                        case 'i':
+                            Value = parseSigned(Fields[I]);
+                            break;
+                        case 'u':
+                            Value = souffle::ramBitCast(parseUnsigned(Fields[I]));
+                            break;
+                        case 'f':
+                            Value = souffle::ramBitCast(std::stod(std::string(Fields[I])));
+                            break;
+                        default:
+                            throw std::logic_error("Cannot parse field type " + AttrTypes[I]);
+                    }
+                    Chunk.Values.push_back(Value);
+                }
+            }
+            catch(const std::invalid_argument &)
+            {
+                Chunk.Messages += "Failed to parse " + std::to_string(I + 1) + "-th field: '"
+                                  + std::string(Fields[I]) + "'\n";
+                Chunk.Values.resize(ValueCount);
+                Chunk.Texts.resize(TextCount);
+                continue;
+            }
+            if(Fields.size() > Arity)
+            {
+                Chunk.Messages += "CSV file has more fields than expected, field '"
+                                  + std::string(Fields[Arity]) + "' is ignored\n";
+            }
+            Chunk.TupleCount++;
+        }
+    }
+
+    /**
+    Load a CSV file written by Souffle into Relation, like insertTuple on each of its lines.
+    */
+    void loadRelation(souffle::SouffleProgram &Program, souffle::Relation *Relation,
+                      std::string_view Text, unsigned int Threads)
+    {
+        std::vector<std::string> AttrTypes;
+        size_t TextAttrCount = 0;
+        for(size_t I = 0; I < Relation->getArity(); I++)
+        {
+            AttrTypes.push_back(Relation->getAttrType(I));
+            if(AttrTypes[I][0] == 's' || AttrTypes[I][0] == 'r')
+            {
+                TextAttrCount++;
+            }
+        }
+        size_t Arity = AttrTypes.size();
+
+        // Split the text into chunks of whole lines.
+        std::vector<std::string_view> Pieces;
+        while(!Text.empty())
+        {
+            size_t End = Text.size() <= ChunkSize ? std::string_view::npos
+                                                  : Text.find('\n', ChunkSize);
+            End = End == std::string_view::npos ? Text.size() : End + 1;
+            Pieces.push_back(Text.substr(0, End));
+            Text = Text.substr(End);
+        }
+
+        std::vector<ParsedChunk> Chunks(Pieces.size());
+        runParallel(Pieces.size(), Threads,
+                    [&](size_t I) { parseChunk(Pieces[I], AttrTypes, Chunks[I]); });
+
+        // Insert the tuples, reusing a single souffle::tuple.
+        souffle::SymbolTable &SymbolTable = Program.getSymbolTable();
+        souffle::tuple Tuple(Relation);
+        for(ParsedChunk &Chunk : Chunks)
+        {
+            std::cerr << Chunk.Messages;
+            for(size_t Row = 0; Row < Chunk.TupleCount; Row++)
+            {
+                const std::string_view *Texts = Chunk.Texts.data() + Row * TextAttrCount;
+                bool Valid = true;
+                for(size_t I = 0; I < Arity && Valid; I++)
+                {
+                    switch(AttrTypes[I][0])
+                    {
+                        case 's':
+                            Tuple[I] = SymbolTable.encode(std::string(*Texts++));
+                            break;
+                        case 'r':
+                        {
+                            std::string Record(*Texts++);
+                            try
+                            {
+                                Tuple[I] = DatalogIO::insertRecord(Program, Record);
+                            }
+                            catch(const std::invalid_argument &)
+                            {
+                                std::cerr << "Failed to parse " << I + 1 << "-th field: '"
+                                          << Record << "'" << std::endl;
+                                Valid = false;
+                            }
+                            break;
+                        }
+                        default:
+                            Tuple[I] = Chunk.Values[Row * Arity + I];
+                            break;
+                    }
+                }
+                if(Valid)
+                {
+                    Relation->insert(Tuple);
+                }
+            }
+        }
+    }
+} // namespace
+
+void DatalogIO::readRelations(souffle::SouffleProgram &Program, const std::string &Directory,
+                              unsigned int Threads)
 {
     // Load output relations into synthesized SouffleProgram.
     for(souffle::Relation *Relation : Program.getOutputRelations())
     {
         const std::string Path = Directory + "/" + Relation->getName() + ".csv";
-        std::ifstream CSV(Path);
-        if(!CSV)
+        if(!fs::exists(Path))
         {
             std::cerr << "Error: missing output relation `" << Path << "'\n";
             continue;
         }
-        std::string Line;
-        while(std::getline(CSV, Line))
+        // Empty files cannot be mapped.
+        if(fs::file_size(Path) == 0)
         {
-            DatalogIO::insertTuple(Line, Program, Relation);
+            continue;
         }
+        boost::interprocess::file_mapping File(Path.c_str(), boost::interprocess::read_only);
+        boost::interprocess::mapped_region Region(File, boost::interprocess::read_only);
+        loadRelation(Program, Relation,
+                     std::string_view(static_cast<const char *>(Region.get_address()),
+                                      Region.get_size()),
+                     Threads);
     }
 }
 
@@ -48,14 +48,45 @@ namespace DatalogIO
     void writeRelation(std::ostream& Stream, souffle::SouffleProgram& Program,
                        const souffle::Relation* Relation);
 
+    /**
+    Encode a relation in the columnar format of ColumnarRelation.h, setting
+    the AuxData type string and data of the encoded relation.
+    */
+    void writeColumnarRelation(std::string& Type, std::string& Data,
+                               souffle::SouffleProgram& Program, souffle::Relation* Relation,
+                               bool Compress);
+
+    /**
+    Write each relation to Directory/<name><FileExtension>, using up to Threads threads.
+    With Compress, the files are compressed with gzip and ".gz" is appended to their names.
+    */
     void writeRelations(const std::string& Directory, const std::string& FileExtension,
                         souffle::SouffleProgram& Program,
-                        const std::vector<souffle::Relation*>& Relations);
+                        const std::vector<souffle::Relation*>& Relations,
+                        unsigned int Threads = 1, bool Compress = false);
+
+    /**
+    Determine if writeRelations can compress relations, i.e., if ddisasm was built with zlib.
+    */
+    bool supportsCompression();
+
+    /**
+    Select the relations whose "Namespace.relation" name matches one of the glob patterns, where
+    '*' matches any sequence of characters and '?' any single character.
+    */
+    std::vector<souffle::Relation*> selectRelations(
+        const std::vector<souffle::Relation*>& Relations, const std::string& Namespace,
+        const std::vector<std::string>& Patterns);
 
     void writeFacts(const std::string& Direcory, souffle::SouffleProgram& Program);
     void writeRelations(const std::string& Directory, souffle::SouffleProgram& Program);
 
-    void readRelations(souffle::SouffleProgram& Program, const std::string& Directory);
+    /**
+    Load the output relations of Program from the CSV files written to Directory by Souffle,
+    parsing each file on up to Threads threads.
+    */
+    void readRelations(souffle::SouffleProgram& Program, const std::string& Directory,
+                       unsigned int Threads = 1);
 
     void setProfilePath(const std::string& ProfilePath);
     std::string clearProfileDB();
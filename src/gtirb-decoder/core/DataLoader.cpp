@@ -37,7 +37,7 @@ void DataLoader::operator()(const gtirb::Module& Module, souffle::SouffleProgram
 
 void DataLoader::load(const gtirb::Module& Module, DataFacts& Facts)
 {
-    FunctorContext.useModule(&Module);
+    FunctorContextManager::current().useModule(&Module);
 
     std::optional<gtirb::Addr> Min, Max;
     for(const auto& Section : Module.sections())
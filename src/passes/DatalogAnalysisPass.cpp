@@ -25,29 +25,57 @@
 #include <boost/filesystem.hpp>
 namespace fs = boost::filesystem;
 
+#include <fstream>
 #include <gtirb/gtirb.hpp>
 #include <gtirb_pprinter/AuxDataUtils.hpp>
 
 #include "../AuxDataSchema.h"
+#include "../Functors.h"
 #include "Interpreter.h"
 
 AnalysisPassResult DatalogAnalysisPass::analyze(const gtirb::Module& Module)
 {
     if(!DebugDirRoot.empty())
     {
-        DatalogIO::writeFacts(getDebugDir(Module) + "/", *Program);
+        // The interpreter reads all the facts from the debug directory.
+        std::vector<souffle::Relation*> Facts = Program->getInputRelations();
+        if(ExecutionMode == DatalogExecutionMode::SYNTHESIZED)
+        {
+            Facts = DatalogIO::selectRelations(Facts, getNameSlug(), DebugRelationPatterns);
+        }
+        DatalogIO::writeRelations(getDebugDir(Module) + "/", ".facts", *Program, Facts,
+                                  ThreadCount, CompressDebugDir);
     }
 
     if(ExecutionMode == DatalogExecutionMode::SYNTHESIZED)
     {
         DatalogIO::setProfilePath(ProfilePath);
+        if(!FunctorProfilePath.empty())
+        {
+            FunctorContextManager::current().enableProfile();
+        }
     }
 
     AnalysisPassResult Result = AnalysisPass::analyze(Module);
 
+    if(ExecutionMode == DatalogExecutionMode::SYNTHESIZED && !FunctorProfilePath.empty())
+    {
+        // The interpreter writes the functor profile itself when it exits.
+        FunctorContextManager::current().enableProfile(false);
+        std::ofstream Stream(FunctorProfilePath);
+        FunctorContextManager::current().writeProfile(Stream);
+    }
+
     if(!DebugDirRoot.empty())
     {
-        DatalogIO::writeRelations(getDebugDir(Module) + "/", *Program);
+        std::string DebugDir = getDebugDir(Module) + "/";
+        std::vector<souffle::Relation*> Relations = DatalogIO::selectRelations(
+            Program->getInternalRelations(), getNameSlug(), DebugRelationPatterns);
+        std::vector<souffle::Relation*> Outputs = DatalogIO::selectRelations(
+            Program->getOutputRelations(), getNameSlug(), DebugRelationPatterns);
+        Relations.insert(Relations.end(), Outputs.begin(), Outputs.end());
+        DatalogIO::writeRelations(DebugDir, ".csv", *Program, Relations, ThreadCount,
+                                  CompressDebugDir);
     }
 
     if(ExecutionMode == DatalogExecutionMode::SYNTHESIZED)
@@ -68,14 +96,21 @@ void DatalogAnalysisPass::analyzeImpl(AnalysisPassResult& Result, const gtirb::M
     if(ExecutionMode == DatalogExecutionMode::INTERPRETED)
     {
         // Disassemble with the interpreter engine.
-        runInterpreter(*Module.getIR(), Module, *Program, InterpreterPath, getDebugDir(Module),
-                       LibDir, ProfilePath, ThreadCount);
+        runInterpreter(Module, *Program, InterpreterPath, getDebugDir(Module), LibDir,
+                       ProfilePath, FunctorProfilePath, InterpreterCacheDir, ThreadCount);
     }
     else
     {
         // Disassemble with the compiled, synthesized program.
         Program->setNumThreads(ThreadCount);
-        bool pruneImdtRels = !WriteSouffleOutputs && DebugDirRoot.empty();
+        // Intermediate relations are only kept if some of them are written out.
+        const std::vector<souffle::Relation*>& Internal = Program->getInternalRelations();
+        bool pruneImdtRels =
+            (!WriteSouffleOutputs
+             || DatalogIO::selectRelations(Internal, getNameSlug(), SouffleOutputPatterns).empty())
+            && (DebugDirRoot.empty()
+                || DatalogIO::selectRelations(Internal, getNameSlug(), DebugRelationPatterns)
+                       .empty());
         try
         {
             Program->runAll("", "", false, pruneImdtRels);
@@ -90,7 +125,7 @@ void DatalogAnalysisPass::analyzeImpl(AnalysisPassResult& Result, const gtirb::M
 void addRelationsToMap(souffle::SouffleProgram& Program,
                        const std::vector<souffle::Relation*>& Relations,
                        std::map<std::string, std::tuple<std::string, std::string>>& Map,
-                       const std::string& Namespace)
+                       const std::string& Namespace, bool Columnar)
 {
     for(souffle::Relation* Relation : Relations)
     {
@@ -99,6 +134,16 @@ void addRelationsToMap(souffle::SouffleProgram& Program,
             continue;
         }
 
+        std::string Name = Namespace + "." + Relation->getName();
+        if(Columnar)
+        {
+            // Write compressed columns (see ColumnarRelation.h).
+            std::string Type, Data;
+            DatalogIO::writeColumnarRelation(Type, Data, Program, Relation, true);
+            Map[Name] = {std::move(Type), std::move(Data)};
+            continue;
+        }
+
         std::stringstream Type;
         DatalogIO::serializeType(Type, Relation);
 
@@ -106,20 +151,25 @@ void addRelationsToMap(souffle::SouffleProgram& Program,
         std::stringstream Csv;
         DatalogIO::writeRelation(Csv, Program, Relation);
 
-        // TODO: Compress CSV.
-        Map[Namespace + "." + Relation->getName()] = {Type.str(), Csv.str()};
+        Map[Name] = {Type.str(), Csv.str()};
     }
 }
 
 void writeRelationAuxdata(souffle::SouffleProgram& Program, gtirb::Module& Module,
-                          const std::string& Namespace)
+                          const std::string& Namespace, bool Columnar,
+                          const std::vector<std::string>& Patterns)
 {
     auto Facts = aux_data::util::getOrDefault<gtirb::schema::SouffleFacts>(Module);
     auto Outputs = aux_data::util::getOrDefault<gtirb::schema::SouffleOutputs>(Module);
 
-    addRelationsToMap(Program, Program.getInputRelations(), Facts, Namespace);
-    addRelationsToMap(Program, Program.getInternalRelations(), Outputs, Namespace);
-    addRelationsToMap(Program, Program.getOutputRelations(), Outputs, Namespace);
+    auto select = [&](const std::vector<souffle::Relation*>& Relations) {
+        return DatalogIO::selectRelations(Relations, Namespace, Patterns);
+    };
+    addRelationsToMap(Program, select(Program.getInputRelations()), Facts, Namespace, Columnar);
+    addRelationsToMap(Program, select(Program.getInternalRelations()), Outputs, Namespace,
+                      Columnar);
+    addRelationsToMap(Program, select(Program.getOutputRelations()), Outputs, Namespace,
+                      Columnar);
 
     Module.addAuxData<gtirb::schema::SouffleFacts>(std::move(Facts));
     Module.addAuxData<gtirb::schema::SouffleOutputs>(std::move(Outputs));
@@ -130,7 +180,25 @@ void DatalogAnalysisPass::transformImpl(AnalysisPassResult& Result, gtirb::Conte
 {
     if(WriteSouffleOutputs)
     {
-        writeRelationAuxdata(*Program, Module, getNameSlug());
+        writeRelationAuxdata(*Program, Module, getNameSlug(), ColumnarSouffleOutputs,
+                             SouffleOutputPatterns);
+    }
+}
+
+void DatalogAnalysisPass::getRelationSizes(std::map<std::string, size_t>& Inputs,
+                                           std::map<std::string, size_t>& Outputs) const
+{
+    if(!Program)
+    {
+        return;
+    }
+    for(souffle::Relation* Relation : Program->getInputRelations())
+    {
+        Inputs[Relation->getName()] = Relation->size();
+    }
+    for(souffle::Relation* Relation : Program->getOutputRelations())
+    {
+        Outputs[Relation->getName()] = Relation->size();
     }
 }
 
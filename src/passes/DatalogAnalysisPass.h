@@ -27,6 +27,7 @@
 #include <chrono>
 #include <gtirb/gtirb.hpp>
 #include <list>
+#include <map>
 #include <optional>
 #include <string>
 
@@ -45,23 +46,57 @@ public:
     virtual AnalysisPassResult analyze(const gtirb::Module& Module) override;
     virtual void clear() override;
 
-    void configureSouffleInterpreter(const std::string& Path, const std::string& LibDir_)
+    /**
+    Run the pass with the souffle interpreter on the sources in Path. With a profile directory,
+    the programs compiled for profiling are cached in CacheDir_, if given.
+    */
+    void configureSouffleInterpreter(const std::string& Path, const std::string& LibDir_,
+                                     const std::string& CacheDir_ = "")
     {
         ExecutionMode = DatalogExecutionMode::INTERPRETED;
         InterpreterPath = (fs::path(Path) / getSourceFilename()).string();
         LibDir = LibDir_;
+        InterpreterCacheDir = CacheDir_;
     }
-    void setProfileDir(const std::string& Path)
+    /**
+    Write the Souffle profile to Path. With ProfileFunctors, the call counts and sampled times
+    of the functors are also written next to it, to <slug>.functors.json.
+    */
+    void setProfileDir(const std::string& Path, bool ProfileFunctors = false)
     {
         ProfilePath = (fs::path(Path) / (getNameSlug() + ".prof")).string();
+        FunctorProfilePath =
+            ProfileFunctors ? (fs::path(Path) / (getNameSlug() + ".functors.json")).string() : "";
     }
     void setThreadCount(int J)
     {
         ThreadCount = J;
     }
-    void enableSouffleOutputs(bool Enable = true)
+    /**
+    Package the relations matching Patterns (see DatalogIO::selectRelations) into the
+    souffleFacts and souffleOutputs AuxData.
+    */
+    void enableSouffleOutputs(bool Enable = true, bool Columnar = false,
+                              const std::vector<std::string>& Patterns = {"*"})
     {
         WriteSouffleOutputs = Enable;
+        ColumnarSouffleOutputs = Columnar;
+        SouffleOutputPatterns = Patterns;
+    }
+    /**
+    Only write the relations matching Patterns to the debug directory. The interpreter still
+    gets all the facts.
+    */
+    void setDebugRelationPatterns(const std::vector<std::string>& Patterns)
+    {
+        DebugRelationPatterns = Patterns;
+    }
+    /**
+    Compress the relations written to the debug directory with gzip.
+    */
+    void enableDebugDirCompression(bool Enable = true)
+    {
+        CompressDebugDir = Enable;
     }
     void readHints(const std::string& Filename);
 
@@ -70,6 +105,15 @@ public:
         return *Program;
     };
 
+    /**
+    Get the number of tuples in each input and output relation of the loaded
+    program, keyed by relation name.
+
+    Both maps are left empty if no program is loaded.
+    */
+    void getRelationSizes(std::map<std::string, size_t>& Inputs,
+                          std::map<std::string, size_t>& Outputs) const;
+
     virtual bool hasLoad(void) override
     {
         return true;
@@ -87,12 +131,18 @@ protected:
 
     std::string InterpreterPath;
     std::string LibDir;
+    std::string InterpreterCacheDir;
     std::string ProfilePath;
+    std::string FunctorProfilePath;
     DatalogExecutionMode ExecutionMode = DatalogExecutionMode::SYNTHESIZED;
     int ThreadCount = 1;
 
     std::unique_ptr<souffle::SouffleProgram> Program;
     bool WriteSouffleOutputs = false;
+    bool ColumnarSouffleOutputs = false;
+    std::vector<std::string> SouffleOutputPatterns = {"*"};
+    std::vector<std::string> DebugRelationPatterns = {"*"};
+    bool CompressDebugDir = false;
 };
 
 #endif /* _DATALOG_ANALYSIS_PASS_H_ */
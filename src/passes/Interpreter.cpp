@@ -23,14 +23,24 @@
 #include <boost/dll.hpp>
 #include <boost/filesystem.hpp>
 #include <boost/process/args.hpp>
+#include <boost/process/child.hpp>
 #include <boost/process/env.hpp>
 #include <boost/process/environment.hpp>
+#include <boost/process/io.hpp>
+#include <boost/process/pipe.hpp>
 #include <boost/process/search_path.hpp>
 #include <boost/process/system.hpp>
+#include <algorithm>
+#include <fstream>
+#include <functional>
+#include <iomanip>
+#include <sstream>
 
 #include "Interpreter.h"
 #include <souffle/CompiledSouffle.h>
 
+#include "../Functors.h"
+
 std::string getInterpreterArch(const gtirb::Module &Module)
 {
     switch(Module.getISA())
@@ -51,20 +61,145 @@ std::string getInterpreterArch(const gtirb::Module &Module)
     return "";
 }
 
-void runInterpreter(const gtirb::IR &IR, const gtirb::Module &Module,
-                    souffle::SouffleProgram &Program, const std::string &DatalogFile,
-                    const std::string &Directory, const std::string &LibDirectory,
-                    const std::string &ProfilePath, uint8_t Threads)
+namespace fs = boost::filesystem;
+
+namespace
+{
+    /**
+    FNV-1a hash of Size bytes of Data.
+    */
+    uint64_t fnv1a(const char *Data, size_t Size)
+    {
+        uint64_t Hash = 0xcbf29ce484222325;
+        for(size_t I = 0; I < Size; I++)
+        {
+            Hash ^= static_cast<uint8_t>(Data[I]);
+            Hash *= 0x100000001b3;
+        }
+        return Hash;
+    }
+
+    /**
+    Get the output of `souffle --version'.
+    */
+    std::string getSouffleVersion(const fs::path &SouffleBinary)
+    {
+        boost::process::ipstream Stream;
+        boost::process::child Child(SouffleBinary, "--version",
+                                    boost::process::std_out > Stream);
+        std::ostringstream Version;
+        Version << Stream.rdbuf();
+        Child.wait();
+        return Version.str();
+    }
+
+    std::string readFile(const fs::path &Path)
+    {
+        std::ifstream Stream(Path.string(), std::ios::binary);
+        return std::string((std::istreambuf_iterator<char>(Stream)),
+                           std::istreambuf_iterator<char>());
+    }
+} // namespace
+
+std::string describeCompiledProgram(const std::string &SouffleVersion,
+                                    const std::string &DatalogFile, const std::string &Arch,
+                                    const std::string &LibDirectory, bool Parallel)
 {
-    // Dump the current GTIRB into the debug directory for use by Functors.
-    std::ofstream out(Directory + "/binary.gtirb", std::ios::out | std::ios::binary);
-    IR.save(out);
-    out.close();
+    fs::path SourceDir = fs::path(DatalogFile).parent_path();
+    std::vector<fs::path> Sources;
+    for(fs::recursive_directory_iterator It(SourceDir), End; It != End; ++It)
+    {
+        if(fs::is_regular_file(It->path()) && It->path().extension() == ".dl")
+        {
+            Sources.push_back(It->path());
+        }
+    }
+    std::sort(Sources.begin(), Sources.end());
+
+    std::ostringstream Description;
+    Description << "souffle: " << SouffleVersion << "\n";
+    Description << "program: " << fs::path(DatalogFile).filename().string() << "\n";
+    Description << "arch: " << Arch << "\n";
+    Description << "library-dir: " << LibDirectory << "\n";
+    Description << "parallel: " << Parallel << "\n";
+    // The whole text of the sources, rather than a digest, so that two programs never match.
+    for(const fs::path &Source : Sources)
+    {
+        std::string Content = readFile(Source);
+        Description << "source: " << fs::relative(Source, SourceDir).generic_string() << " "
+                    << Content.size() << "\n"
+                    << Content << "\n";
+    }
+    return Description.str();
+}
+
+fs::path getCompiledProgram(const std::string &CacheDirectory, const std::string &Description,
+                            const std::function<bool(const fs::path &)> &Compile)
+{
+    std::ostringstream Key;
+    Key << std::hex << std::setw(16) << std::setfill('0')
+        << fnv1a(Description.data(), Description.size());
+    fs::path Entry = fs::path(CacheDirectory) / Key.str();
+
+    auto matches = [&Description](const fs::path &Dir) {
+        return fs::exists(Dir / "program") && readFile(Dir / "key.txt") == Description;
+    };
+    if(matches(Entry))
+    {
+        return Entry / "program";
+    }
 
-    // Put the debug directory in an env variable for Functors.
+    // Compile into a temporary directory, and rename it once complete, so that concurrent
+    // runs sharing the cache never observe a partially written entry.
+    fs::create_directories(CacheDirectory);
+    fs::path TmpEntry = fs::path(CacheDirectory) / fs::unique_path("%%%%-%%%%-%%%%.tmp");
+    fs::create_directories(TmpEntry);
+    if(!Compile(TmpEntry))
+    {
+        fs::remove_all(TmpEntry);
+        return fs::path();
+    }
+    std::ofstream((TmpEntry / "key.txt").string(), std::ios::binary) << Description;
+
+    boost::system::error_code Error;
+    fs::rename(TmpEntry, Entry, Error);
+    if(Error && fs::exists(Entry) && !matches(Entry))
+    {
+        // The entry was stored for another program, e.g. after a hash collision.
+        std::cerr << "WARNING: replacing mismatched entry " << Entry.string()
+                  << " of the interpreter cache\n";
+        fs::remove_all(Entry, Error);
+        fs::rename(TmpEntry, Entry, Error);
+    }
+    if(Error)
+    {
+        // Another run stored the same program first.
+        fs::remove_all(TmpEntry);
+        return matches(Entry) ? Entry / "program" : fs::path();
+    }
+    return Entry / "program";
+}
+
+void runInterpreter(const gtirb::Module &Module, souffle::SouffleProgram &Program,
+                    const std::string &DatalogFile, const std::string &Directory,
+                    const std::string &LibDirectory, const std::string &ProfilePath,
+                    const std::string &FunctorProfilePath, const std::string &CacheDirectory,
+                    uint8_t Threads)
+{
+    // Snapshot the readable bytes of the module for use by Functors. The snapshot is shared by
+    // the passes of the module, and only written again after a pass transformed the module.
+    std::string SnapshotPath =
+        (boost::filesystem::path(Directory).parent_path() / "functors.snapshot").string();
+    FunctorContextManager::updateSnapshot(Module, SnapshotPath);
+
+    // Put the snapshot and the debug directory in env variables for Functors.
     boost::process::environment Env = boost::this_process::environment();
+    Env["DDISASM_FUNCTOR_SNAPSHOT"] = SnapshotPath;
     Env["DDISASM_DEBUG_DIR"] = Directory;
-    Env["DDISASM_GTIRB_MODULE_NAME"] = Module.getName();
+    if(!FunctorProfilePath.empty())
+    {
+        Env["DDISASM_FUNCTOR_PROFILE"] = FunctorProfilePath;
+    }
 
     // Search PATH for `souffle' binary.
     boost::filesystem::path SouffleBinary = boost::process::search_path("souffle");
@@ -129,8 +264,56 @@ void runInterpreter(const gtirb::IR &IR, const gtirb::Module &Module,
         Args.insert(Args.end(), {"--compile", "--profile", ProfilePath});
     }
 
-    // Execute the `souffle' interpreter.
-    int Code = boost::process::system(SouffleBinary, Args, Env);
+    // Reuse the program compiled for profiling from the cache.
+    fs::path CompiledProgram;
+    int CompileCode = 0;
+    if(!ProfilePath.empty() && !CacheDirectory.empty())
+    {
+        FinalLibDirectory = fs::absolute(FinalLibDirectory).string();
+        std::string Description =
+            describeCompiledProgram(getSouffleVersion(SouffleBinary), DatalogFile, Arch,
+                                    FinalLibDirectory, Threads > 1);
+        CompiledProgram = getCompiledProgram(CacheDirectory, Description, [&](const fs::path &Dir) {
+            std::vector<std::string> CompileArgs = {Arch,
+                                                    "--jobs",
+                                                    std::to_string(Threads),
+                                                    "--library-dir",
+                                                    FinalLibDirectory,
+                                                    "--profile",
+                                                    (Dir / "profile").string(),
+                                                    "--dl-program",
+                                                    (Dir / "program").string(),
+                                                    DatalogFile};
+            CompileCode = boost::process::system(SouffleBinary, CompileArgs);
+            return CompileCode == 0;
+        });
+        if(CompileCode)
+        {
+            std::cerr << "Error: `souffle' return non-zero exit code: " << CompileCode << "\n";
+            std::exit(EXIT_FAILURE);
+        }
+    }
+
+    int Code;
+    if(!CompiledProgram.empty())
+    {
+        // Execute the compiled program, which loads libfunctors.so dynamically.
+        std::string LibraryPath = FinalLibDirectory;
+        if(Env.count("LD_LIBRARY_PATH"))
+        {
+            LibraryPath += ":" + Env["LD_LIBRARY_PATH"].to_string();
+        }
+        Env["LD_LIBRARY_PATH"] = LibraryPath;
+        std::vector<std::string> ProgramArgs = {"-F", Directory, "-D", Directory,
+                                                "-j", std::to_string(Threads),
+                                                "-p", ProfilePath};
+        Code = boost::process::system(CompiledProgram, ProgramArgs, Env);
+    }
+    else
+    {
+        // Execute the `souffle' interpreter.
+        Code = boost::process::system(SouffleBinary, Args, Env);
+    }
     if(Code)
     {
         std::cerr << "Error: `souffle' return non-zero exit code: " << Code << "\n";
@@ -138,5 +321,5 @@ void runInterpreter(const gtirb::IR &IR, const gtirb::Module &Module,
     }
 
     // Load the output relations back into the synthesized program context.
-    DatalogIO::readRelations(Program, Directory);
+    DatalogIO::readRelations(Program, Directory, Threads);
 }
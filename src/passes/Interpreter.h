@@ -23,13 +23,45 @@
 //===----------------------------------------------------------------------===//
 #ifndef GTIRB_SRC_INTERPRETER_H_
 #define GTIRB_SRC_INTERPRETER_H_
+#include <boost/filesystem.hpp>
+#include <functional>
 #include <gtirb/gtirb.hpp>
 
 #include "../gtirb-decoder/DatalogIO.h"
 
-void runInterpreter(const gtirb::IR& IR, const gtirb::Module& Module,
-                    souffle::SouffleProgram& Program, const std::string& DatalogFile,
-                    const std::string& Directory, const std::string& LibDirectory,
-                    const std::string& ProfilePath, uint8_t Threads);
+/**
+Run the Datalog program DatalogFile with `souffle' on the facts in Directory, and load the
+results into Program.
+
+With ProfilePath, souffle compiles the program with profiling. If CacheDirectory is also given,
+the compiled program is cached there and reused as long as the Datalog sources, the souffle
+version and the compilation options do not change.
+*/
+void runInterpreter(const gtirb::Module& Module, souffle::SouffleProgram& Program,
+                    const std::string& DatalogFile, const std::string& Directory,
+                    const std::string& LibDirectory, const std::string& ProfilePath,
+                    const std::string& FunctorProfilePath, const std::string& CacheDirectory,
+                    uint8_t Threads);
+
+/**
+Describe everything the program compiled by souffle depends on: the souffle version, the
+compilation options and the text of the Datalog sources next to DatalogFile.
+*/
+std::string describeCompiledProgram(const std::string& SouffleVersion,
+                                    const std::string& DatalogFile, const std::string& Arch,
+                                    const std::string& LibDirectory, bool Parallel);
+
+/**
+Get the executable compiled by souffle with profiling from CacheDirectory, calling Compile to
+compile it into a new entry first if it is not cached yet. Compile writes the executable as
+`program' in the directory it is given, and returns false if it failed.
+
+Entries are directories named by a hash of Description, which is also stored in the entry as
+key.txt; the executable is only reused if key.txt matches, and an entry stored for another
+program is replaced. Returns an empty path if the program could not be compiled or stored.
+*/
+boost::filesystem::path getCompiledProgram(
+    const std::string& CacheDirectory, const std::string& Description,
+    const std::function<bool(const boost::filesystem::path&)>& Compile);
 
 #endif // GTIRB_SRC_INTERPRETER_H_
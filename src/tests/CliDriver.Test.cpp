@@ -0,0 +1,51 @@
+#include <gtest/gtest.h>
+
+#include <gtirb/gtirb.hpp>
+#include <regex>
+#include <sstream>
+#include <string>
+#include <vector>
+
+#include "../AnalysisPipeline.h"
+#include "../CliDriver.h"
+#include "../passes/SccPass.h"
+
+TEST(Unit_CliDriver, stats_json)
+{
+    gtirb::Context Ctx;
+    gtirb::IR* IR = gtirb::IR::Create(Ctx);
+    gtirb::Module* M = IR->addModule(Ctx, "test");
+    gtirb::Section* S = M->addSection(Ctx, "");
+    gtirb::ByteInterval* I = S->addByteInterval(Ctx, gtirb::Addr(0), 4);
+    I->addBlock<gtirb::CodeBlock>(Ctx, 0, 1);
+
+    std::stringstream Out;
+    auto Listener = std::make_shared<StatsJsonPipelineListener>(Out);
+    Listener->setModule("a \"quoted\" name");
+
+    AnalysisPipeline Pipeline;
+    Pipeline.addListener(Listener);
+    Pipeline.push<SccPass>();
+    Pipeline.run(Ctx, *M);
+
+    std::vector<std::string> Lines;
+    std::string Line;
+    while(std::getline(Out, Line))
+    {
+        Lines.push_back(Line);
+    }
+
+    // The SCC pass has no load phase, so there are two phase events and one pass event.
+    std::string Prefix = R"re(\{"event":"(phase|pass)","module":"a \\"quoted\\" name",)re"
+                         R"re("pass":"SCC-analysis",)re";
+    std::string Usage =
+        R"re("wall_time":[0-9.e-]+,"cpu_time":[0-9.e-]+,"peak_rss_delta":[0-9]+)re";
+    std::string Counts = R"re(,"warnings":0,"errors":0\})re";
+    ASSERT_EQ(Lines.size(), 3);
+    std::regex Compute(Prefix + R"re("phase":"compute",)re" + Usage + Counts);
+    EXPECT_TRUE(std::regex_match(Lines[0], Compute)) << Lines[0];
+    std::regex Transform(Prefix + R"re("phase":"transform",)re" + Usage + Counts);
+    EXPECT_TRUE(std::regex_match(Lines[1], Transform)) << Lines[1];
+    std::regex Pass(Prefix + Usage + R"re(\})re");
+    EXPECT_TRUE(std::regex_match(Lines[2], Pass)) << Lines[2];
+}
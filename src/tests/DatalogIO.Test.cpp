@@ -24,8 +24,18 @@
 #include <souffle/CompiledSouffle.h>
 #include <souffle/SouffleInterface.h>
 
+#include <boost/filesystem.hpp>
+#include <fstream>
+
+#ifdef DDISASM_ZLIB
+#include <zlib.h>
+#endif
+
+#include "../gtirb-decoder/ColumnarRelation.h"
 #include "../gtirb-decoder/DatalogIO.h"
 
+namespace fs = boost::filesystem;
+
 TEST(DatalogIOTest, TestInsertTuple)
 {
     auto Program = std::unique_ptr<souffle::SouffleProgram>(
@@ -72,3 +82,184 @@ TEST(DatalogIOTest, TestInsertTuple)
     // Confirm that the output matches the input.
     ASSERT_EQ(TupleText, OutputStream.str());
 }
+
+TEST(DatalogIOTest, TestColumnarRelation)
+{
+    auto Program = std::unique_ptr<souffle::SouffleProgram>(
+        souffle::ProgramFactory::newInstance("souffle_disasm_arm64"));
+
+    souffle::Relation *Relation = Program->getRelation("stack_def_use.def_used");
+
+    std::string TupleText("0x778\t[SP, 16]\t0x7ac\t[SP, 16]\t1\n"
+                          "0x7b0\t[X29, -8]\t0x7c4\t[SP, 16]\t2\n");
+    std::stringstream Ss(TupleText);
+    std::string Line;
+    while(std::getline(Ss, Line))
+    {
+        DatalogIO::insertTuple(Line, *Program, Relation);
+    }
+
+    std::stringstream Signature;
+    DatalogIO::serializeType(Signature, Relation);
+    std::stringstream Csv;
+    DatalogIO::writeRelation(Csv, *Program, Relation);
+
+    for(bool Compress : {false, true})
+    {
+        std::string Type, Data;
+        DatalogIO::writeColumnarRelation(Type, Data, *Program, Relation, Compress);
+        ASSERT_TRUE(ColumnarRelation::isColumnar(Type));
+
+        // Decoding yields the same CSV and signature as the uncompressed encoding.
+        std::string DecodedSignature, DecodedCsv;
+        ASSERT_TRUE(ColumnarRelation::decode(Type, Data, DecodedSignature, DecodedCsv));
+        ASSERT_EQ(DecodedSignature, Signature.str());
+        ASSERT_EQ(DecodedCsv, Csv.str());
+    }
+}
+
+TEST(DatalogIOTest, TestColumnarRelationTruncated)
+{
+    std::string Signature, Csv;
+    // A tuple count of 2^64-1 with no column data.
+    ASSERT_FALSE(ColumnarRelation::decode("columnar/1/none;a:u:address", "//////////8=",
+                                          Signature, Csv));
+    // One tuple whose text column claims 2^32-1 distinct values.
+    ASSERT_FALSE(ColumnarRelation::decode("columnar/1/none;a:s:symbol", "AQAAAAAAAAD/////",
+                                          Signature, Csv));
+}
+
+// Format a relation with serializeAttribute on a stream with std::showbase, which is how
+// relations used to be written.
+static std::string serializeRelation(souffle::SouffleProgram &Program,
+                                     const souffle::Relation *Relation)
+{
+    std::stringstream Stream;
+    Stream << std::showbase;
+    for(souffle::tuple Tuple : *Relation)
+    {
+        for(size_t I = 0; I < Tuple.size(); I++)
+        {
+            if(I > 0)
+            {
+                Stream << "\t";
+            }
+            DatalogIO::serializeAttribute(Stream, Program, Relation->getAttrType(I), Tuple[I]);
+        }
+        Stream << "\n";
+    }
+    return Stream.str();
+}
+
+TEST(DatalogIOTest, TestWriteRelations)
+{
+    auto Program = std::unique_ptr<souffle::SouffleProgram>(
+        souffle::ProgramFactory::newInstance("souffle_disasm_arm64"));
+
+    // Addresses, including 0, unsigned and signed numbers, and records.
+    souffle::Relation *DefUsed = Program->getRelation("stack_def_use.def_used");
+    DatalogIO::insertTuple("0x778\t[SP, 16]\t0x7ac\t[SP, 16]\t1", *Program, DefUsed);
+    DatalogIO::insertTuple("0x0\t[X29, -8]\t0xffffffffffffffff\t[SP, 0]\t2", *Program, DefUsed);
+    souffle::Relation *Immediate = Program->getRelation("op_immediate");
+    DatalogIO::insertTuple("0\t-9223372036854775808", *Program, Immediate);
+    DatalogIO::insertTuple("18446744073709551615\t9223372036854775807", *Program, Immediate);
+    // Floats with and without exponents.
+    souffle::Relation *FpImmediate = Program->getRelation("op_fp_immediate");
+    for(const char *Value : {"0", "-1.5", "0.1", "123456789", "1e-300", "-2.5e+100"})
+    {
+        DatalogIO::insertTuple(std::to_string(FpImmediate->size()) + "\t" + Value, *Program,
+                               FpImmediate);
+    }
+    souffle::Relation *Empty = Program->getInputRelations().front();
+    std::vector<souffle::Relation *> Relations = {DefUsed, Immediate, FpImmediate, Empty};
+
+    for(souffle::Relation *Relation : Relations)
+    {
+        std::stringstream Written;
+        DatalogIO::writeRelation(Written, *Program, Relation);
+        EXPECT_EQ(Written.str(), serializeRelation(*Program, Relation)) << Relation->getName();
+    }
+
+    // Each relation is written to its own file.
+    auto Directory = fs::temp_directory_path() / fs::unique_path();
+    fs::create_directories(Directory);
+    DatalogIO::writeRelations(Directory.string() + "/", ".csv", *Program, Relations, 2);
+    for(souffle::Relation *Relation : Relations)
+    {
+        std::ifstream File((Directory / (Relation->getName() + ".csv")).string());
+        std::stringstream Written;
+        Written << File.rdbuf();
+        EXPECT_EQ(Written.str(), serializeRelation(*Program, Relation)) << Relation->getName();
+    }
+    fs::remove_all(Directory);
+}
+
+#ifdef DDISASM_ZLIB
+TEST(DatalogIOTest, TestWriteCompressedRelations)
+{
+    ASSERT_TRUE(DatalogIO::supportsCompression());
+    auto Program = std::unique_ptr<souffle::SouffleProgram>(
+        souffle::ProgramFactory::newInstance("souffle_disasm_arm64"));
+
+    souffle::Relation *DefUsed = Program->getRelation("stack_def_use.def_used");
+    // Enough tuples to flush the formatter's buffer several times.
+    for(int I = 0; I < 10000; I++)
+    {
+        DatalogIO::insertTuple("0x" + std::to_string(I) + "\t[SP, " + std::to_string(-I)
+                                   + "]\t0x7ac\t[X29, 16]\t1",
+                               *Program, DefUsed);
+    }
+    souffle::Relation *Empty = Program->getInputRelations().front();
+
+    // As with --debug-dir-compress, each relation is written to <name>.csv.gz.
+    auto Directory = fs::temp_directory_path() / fs::unique_path();
+    fs::create_directories(Directory);
+    DatalogIO::writeRelations(Directory.string() + "/", ".csv", *Program, {DefUsed, Empty}, 2,
+                              true);
+    for(souffle::Relation *Relation : {DefUsed, Empty})
+    {
+        std::string Path = (Directory / (Relation->getName() + ".csv.gz")).string();
+        gzFile File = gzopen(Path.c_str(), "rb");
+        ASSERT_NE(File, nullptr) << Path;
+        std::string Written;
+        char Buffer[4096];
+        int Count;
+        while((Count = gzread(File, Buffer, sizeof(Buffer))) > 0)
+        {
+            Written.append(Buffer, Count);
+        }
+        gzclose(File);
+        EXPECT_EQ(Count, 0) << Path;
+        EXPECT_EQ(Written, serializeRelation(*Program, Relation)) << Relation->getName();
+    }
+    fs::remove_all(Directory);
+}
+#endif /* DDISASM_ZLIB */
+
+TEST(DatalogIOTest, TestReadRelations)
+{
+    auto Program = std::unique_ptr<souffle::SouffleProgram>(
+        souffle::ProgramFactory::newInstance("souffle_disasm_arm64"));
+
+    souffle::Relation *Relation = Program->getRelation("stack_def_use.def_used");
+    DatalogIO::insertTuple("0x778\t[SP, 16]\t0x7ac\t[SP, 16]\t1", *Program, Relation);
+    DatalogIO::insertTuple("0x7b0\t[X29, -8]\t0x7c4\t[SP, 16]\t2", *Program, Relation);
+
+    auto Directory = fs::temp_directory_path() / fs::unique_path();
+    fs::create_directories(Directory);
+    DatalogIO::writeRelations(Directory.string() + "/", ".csv", *Program,
+                              Program->getOutputRelations());
+
+    // Reading the relations back yields the same tuples.
+    auto Loaded = std::unique_ptr<souffle::SouffleProgram>(
+        souffle::ProgramFactory::newInstance("souffle_disasm_arm64"));
+    DatalogIO::readRelations(*Loaded, Directory.string(), 2);
+    for(souffle::Relation *Output : Program->getOutputRelations())
+    {
+        std::stringstream Expected, Read;
+        DatalogIO::writeRelation(Expected, *Program, Output);
+        DatalogIO::writeRelation(Read, *Loaded, Loaded->getRelation(Output->getName()));
+        EXPECT_EQ(Read.str(), Expected.str());
+    }
+    fs::remove_all(Directory);
+}
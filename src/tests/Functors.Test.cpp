@@ -1,10 +1,15 @@
 #include <gtest/gtest.h>
 
+#include <boost/filesystem.hpp>
 #include <fstream>
 #include <gtirb/gtirb.hpp>
+#include <sstream>
+#include <thread>
 
 #include "../Functors.h"
 
+namespace fs = boost::filesystem;
+
 TEST(Thumb32BranchOffsetTest, read_branch_offset)
 {
     // 00000030 <main>:
@@ -19,3 +24,160 @@ TEST(Thumb32BranchOffsetTest, read_branch_offset)
     //
     EXPECT_EQ(functor_thumb32_branch_offset(0xfffef7ff), -4);
 }
+
+TEST(FunctorDataTest, read_readable_ranges)
+{
+    gtirb::Context Ctx;
+    gtirb::Module* M = gtirb::Module::Create(Ctx, "test");
+    M->setByteOrder(gtirb::ByteOrder::Little);
+
+    // Only the first 6 bytes of .data are initialized.
+    std::vector<uint8_t> Data = {0x01, 0x02, 0x03, 0x04, 0x05, 0x06};
+    gtirb::Section* S = M->addSection(Ctx, ".data");
+    S->addByteInterval(Ctx, gtirb::Addr(0x1000), Data.begin(), Data.end(), 0x10, Data.size());
+    S->addFlag(gtirb::SectionFlag::Loaded);
+    S->addFlag(gtirb::SectionFlag::Initialized);
+
+    // Not loaded: never readable.
+    std::vector<uint8_t> Comment = {0xff, 0xff, 0xff, 0xff};
+    gtirb::Section* C = M->addSection(Ctx, ".comment");
+    C->addByteInterval(Ctx, gtirb::Addr(0x2000), Comment.begin(), Comment.end(), Comment.size(),
+                       Comment.size());
+    C->addFlag(gtirb::SectionFlag::Initialized);
+
+    FunctorContext.useModule(M);
+    // Lookups are only counted while profiling.
+    EXPECT_EQ(functor_data_valid(0x1000, 4), 1);
+    FunctorContext.enableProfile();
+
+    EXPECT_EQ(functor_data_valid(0x1000, 4), 1);
+    EXPECT_EQ(functor_data_u16(0x1001), 0x0302);
+    EXPECT_EQ(functor_data_u32(0x1002), 0x06050403);
+    EXPECT_EQ(functor_data_valid(0x1004, 4), 0);
+    EXPECT_EQ(functor_data_valid(0x0fff, 1), 0);
+    EXPECT_EQ(functor_data_valid(0x2000, 1), 0);
+    EXPECT_EQ(functor_data_u32(0x2000), 0);
+
+    FunctorContext.enableProfile(false);
+    EXPECT_EQ(functor_data_valid(0x0fff, 1), 0);
+
+    EXPECT_EQ(FunctorContext.getLookupHits(), 3);
+    EXPECT_EQ(FunctorContext.getLookupMisses(), 4);
+}
+
+TEST(FunctorProfileTest, count_calls)
+{
+    FunctorContext.enableProfile();
+    functor_aligned(0x1001, 4);
+    functor_aligned(0x1002, 4);
+    functor_choose_max(1, 2, 3, 4);
+    FunctorContext.enableProfile(false);
+    functor_aligned(0x1003, 4);
+
+    std::stringstream Stream;
+    FunctorContext.writeProfile(Stream);
+    std::string Profile = Stream.str();
+    EXPECT_NE(Profile.find("\"functor_aligned\": {\"calls\": 2, \"sampled_calls\": 1"),
+              std::string::npos);
+    EXPECT_NE(Profile.find("\"functor_choose_max\": {\"calls\": 1, \"sampled_calls\": 1"),
+              std::string::npos);
+    EXPECT_NE(Profile.find("\"functor_data_u8\": {\"calls\": 0, \"sampled_calls\": 0"),
+              std::string::npos);
+}
+
+TEST(FunctorDataTest, update_snapshot)
+{
+    gtirb::Context Ctx;
+    gtirb::Module* M = gtirb::Module::Create(Ctx, "test");
+    M->setByteOrder(gtirb::ByteOrder::Little);
+
+    std::vector<uint8_t> Data = {0x01, 0x02, 0x03, 0x04};
+    gtirb::Section* S = M->addSection(Ctx, ".data");
+    gtirb::ByteInterval* I = S->addByteInterval(Ctx, gtirb::Addr(0x1000), Data.begin(),
+                                                Data.end(), Data.size(), Data.size());
+    S->addFlag(gtirb::SectionFlag::Loaded);
+    S->addFlag(gtirb::SectionFlag::Initialized);
+
+    auto Path = fs::temp_directory_path() / fs::unique_path();
+    EXPECT_TRUE(FunctorContextManager::updateSnapshot(*M, Path.string()));
+
+    // The snapshot is only written again once the module is invalidated.
+    EXPECT_FALSE(FunctorContextManager::updateSnapshot(*M, Path.string()));
+    *I->bytes_begin<uint8_t>() = 0xff;
+    FunctorContextManager::invalidateSnapshot(*M);
+    EXPECT_TRUE(FunctorContextManager::updateSnapshot(*M, Path.string()));
+    EXPECT_FALSE(FunctorContextManager::updateSnapshot(*M, Path.string()));
+
+    // Or when a snapshot of another module was written to the same path.
+    gtirb::Module* Other = gtirb::Module::Create(Ctx, "other");
+    EXPECT_TRUE(FunctorContextManager::updateSnapshot(*Other, Path.string()));
+    EXPECT_TRUE(FunctorContextManager::updateSnapshot(*M, Path.string()));
+    EXPECT_FALSE(FunctorContextManager::updateSnapshot(*M, Path.string()));
+
+    gtirb::Section* T = M->addSection(Ctx, ".text");
+    T->addByteInterval(Ctx, gtirb::Addr(0x2000), Data.begin(), Data.end(), Data.size(),
+                       Data.size());
+    T->addFlag(gtirb::SectionFlag::Loaded);
+    T->addFlag(gtirb::SectionFlag::Executable);
+    FunctorContextManager::invalidateSnapshot(*M);
+    EXPECT_TRUE(FunctorContextManager::updateSnapshot(*M, Path.string()));
+    EXPECT_EQ(fs::file_size(Path), 8 + 2 * 8 + 2 * 3 * 8 + 2 * Data.size());
+    fs::remove(Path);
+}
+
+TEST(FunctorContextTest, bind_threads)
+{
+    // Two modules with the same address, as the members of an archive.
+    gtirb::Context Ctx;
+    std::vector<uint8_t> Values = {0x11, 0x22};
+    std::vector<gtirb::Module*> Modules;
+    for(uint8_t Value : Values)
+    {
+        gtirb::Module* M = gtirb::Module::Create(Ctx, "test");
+        M->setByteOrder(gtirb::ByteOrder::Little);
+        std::vector<uint8_t> Data(64, Value);
+        gtirb::Section* S = M->addSection(Ctx, ".data");
+        S->addByteInterval(Ctx, gtirb::Addr(0x1000), Data.begin(), Data.end(), Data.size(),
+                           Data.size());
+        S->addFlag(gtirb::SectionFlag::Loaded);
+        S->addFlag(gtirb::SectionFlag::Initialized);
+        Modules.push_back(M);
+    }
+
+    std::vector<uint64_t> Mismatches(Modules.size(), 0);
+    std::vector<std::thread> Threads;
+    for(size_t I = 0; I < Modules.size(); I++)
+    {
+        Threads.emplace_back([&, I]() {
+            FunctorContextManager Context;
+            FunctorContextManager::ThreadBinding Binding(Context, 2);
+            FunctorContextManager::current().useModule(Modules[I]);
+            uint64_t Expected = functor_data_u8(0x1000);
+            uint64_t Count = 0;
+            for(int Round = 0; Round < 100; Round++)
+            {
+#pragma omp parallel for num_threads(2) reduction(+ : Count)
+                for(int Offset = 0; Offset < 64; Offset++)
+                {
+                    Count += functor_data_u8(0x1000 + Offset) != Expected;
+                }
+            }
+            Mismatches[I] = Count;
+            EXPECT_EQ(Expected, Values[I]);
+        });
+    }
+    for(std::thread& Thread : Threads)
+    {
+        Thread.join();
+    }
+    EXPECT_EQ(Mismatches, std::vector<uint64_t>(Modules.size(), 0));
+
+    // Without bindings, the functors use the global context again.
+    EXPECT_EQ(&FunctorContextManager::current(), &FunctorContext);
+
+#if defined(_OPENMP) && defined(__GNUC__) && !defined(__clang__)
+    // The tests are linked with libgomp, which reuses the threads of parallel regions.
+    EXPECT_TRUE(FunctorContextManager::ThreadBinding::isSupported(2));
+    EXPECT_EQ(&FunctorContextManager::current(), &FunctorContext);
+#endif
+}
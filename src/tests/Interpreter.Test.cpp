@@ -0,0 +1,157 @@
+#include <gtest/gtest.h>
+
+#include <boost/filesystem.hpp>
+#include <fstream>
+#include <string>
+
+#include "../passes/Interpreter.h"
+
+namespace fs = boost::filesystem;
+
+class InterpreterCacheTest : public ::testing::Test
+{
+protected:
+    void SetUp() override
+    {
+        Directory = fs::temp_directory_path() / fs::unique_path();
+        SourceDir = Directory / "datalog";
+        CacheDir = Directory / "cache";
+        fs::create_directories(SourceDir / "arch");
+        writeFile(SourceDir / "main.dl", "#include \"arch/arch.dl\"\n");
+        writeFile(SourceDir / "arch" / "arch.dl", ".decl a(x:number)\n");
+        // Not a Datalog source.
+        writeFile(SourceDir / "notes.txt", "notes\n");
+    }
+
+    void TearDown() override
+    {
+        fs::remove_all(Directory);
+    }
+
+    static void writeFile(const fs::path& Path, const std::string& Text)
+    {
+        std::ofstream(Path.string(), std::ios::binary) << Text;
+    }
+
+    static std::string readFile(const fs::path& Path)
+    {
+        std::ifstream Stream(Path.string(), std::ios::binary);
+        return std::string(std::istreambuf_iterator<char>(Stream),
+                           std::istreambuf_iterator<char>());
+    }
+
+    std::string describe(const std::string& Arch = "-MARCH_AMD64")
+    {
+        return describeCompiledProgram("souffle 2.3\n", (SourceDir / "main.dl").string(), Arch,
+                                       "/lib", true);
+    }
+
+    // Get the compiled program, counting the compilations.
+    fs::path getProgram(const std::string& Description)
+    {
+        return getCompiledProgram(CacheDir.string(), Description, [this](const fs::path& Dir) {
+            Compilations++;
+            writeFile(Dir / "program", "compiled");
+            return true;
+        });
+    }
+
+    fs::path Directory;
+    fs::path SourceDir;
+    fs::path CacheDir;
+    int Compilations = 0;
+};
+
+TEST_F(InterpreterCacheTest, key)
+{
+    std::string Description = describe();
+    EXPECT_EQ(describe(), Description);
+
+    // Other files do not matter.
+    writeFile(SourceDir / "notes.txt", "more notes\n");
+    EXPECT_EQ(describe(), Description);
+
+    EXPECT_NE(describe("-MARCH_ARM64"), Description);
+
+    // Editing an included source, even without changing its size, changes the key.
+    writeFile(SourceDir / "arch" / "arch.dl", ".decl b(x:number)\n");
+    EXPECT_NE(describe(), Description);
+    writeFile(SourceDir / "arch" / "arch.dl", ".decl a(x:number)\n");
+    EXPECT_EQ(describe(), Description);
+    writeFile(SourceDir / "arch" / "new.dl", "");
+    EXPECT_NE(describe(), Description);
+}
+
+TEST_F(InterpreterCacheTest, reuse)
+{
+    fs::path Program = getProgram(describe());
+    ASSERT_FALSE(Program.empty());
+    EXPECT_EQ(Compilations, 1);
+    EXPECT_EQ(getProgram(describe()), Program);
+    EXPECT_EQ(Compilations, 1);
+
+    // Each program has its own entry.
+    writeFile(SourceDir / "arch" / "arch.dl", ".decl b(x:number)\n");
+    fs::path Other = getProgram(describe());
+    EXPECT_EQ(Compilations, 2);
+    EXPECT_NE(Other, Program);
+    EXPECT_FALSE(Other.empty());
+    EXPECT_EQ(getProgram(describe("-MARCH_ARM64")).parent_path().parent_path(), CacheDir);
+    EXPECT_EQ(Compilations, 3);
+
+    // Only the entries are left in the cache directory.
+    size_t Entries = std::distance(fs::directory_iterator(CacheDir), fs::directory_iterator());
+    EXPECT_EQ(Entries, 3);
+}
+
+TEST_F(InterpreterCacheTest, mismatched_entry)
+{
+    std::string Description = describe();
+    fs::path Program = getProgram(Description);
+    ASSERT_FALSE(Program.empty());
+
+    // An entry with the same name that was stored for another program, e.g. after a hash
+    // collision, is not used but replaced.
+    writeFile(Program.parent_path() / "key.txt", "another program");
+    EXPECT_EQ(getProgram(Description), Program);
+    EXPECT_EQ(Compilations, 2);
+    EXPECT_EQ(getProgram(Description), Program);
+    EXPECT_EQ(Compilations, 2);
+}
+
+TEST_F(InterpreterCacheTest, failed_compilation)
+{
+    fs::path Program = getCompiledProgram(CacheDir.string(), describe(),
+                                          [](const fs::path&) { return false; });
+    EXPECT_TRUE(Program.empty());
+    EXPECT_TRUE(fs::is_empty(CacheDir));
+}
+
+TEST_F(InterpreterCacheTest, concurrent_store)
+{
+    // Another run stores the same program while this one compiles it: its entry is used.
+    std::string Description = describe();
+    fs::path Stored;
+    fs::path Program =
+        getCompiledProgram(CacheDir.string(), Description, [&](const fs::path& Dir) {
+            Stored = getProgram(Description);
+            writeFile(Dir / "program", "compiled concurrently");
+            return true;
+        });
+    EXPECT_FALSE(Stored.empty());
+    EXPECT_EQ(Program, Stored);
+    EXPECT_EQ(Compilations, 1);
+    EXPECT_EQ(std::distance(fs::directory_iterator(CacheDir), fs::directory_iterator()), 1);
+
+    // The entry the other run stored belongs to another program: it is replaced.
+    fs::remove_all(CacheDir);
+    Program = getCompiledProgram(CacheDir.string(), Description, [&](const fs::path& Dir) {
+        writeFile(getProgram(Description).parent_path() / "key.txt", "another program");
+        writeFile(Dir / "program", "compiled concurrently");
+        return true;
+    });
+    ASSERT_FALSE(Program.empty());
+    EXPECT_EQ(readFile(Program), "compiled concurrently");
+    EXPECT_EQ(readFile(Program.parent_path() / "key.txt"), Description);
+    EXPECT_EQ(std::distance(fs::directory_iterator(CacheDir), fs::directory_iterator()), 1);
+}
@@ -0,0 +1,174 @@
+#include <gtest/gtest.h>
+
+#if defined(__unix__)
+#include <signal.h>
+#include <sys/socket.h>
+#include <sys/un.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+#include <boost/filesystem.hpp>
+#include <chrono>
+#include <cstring>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include "../Server.h"
+
+namespace fs = boost::filesystem;
+
+// Echoes its arguments on stdout and returns their count.
+static int echoArgs(int Argc, char** Argv)
+{
+    for(int I = 0; I < Argc; I++)
+    {
+        std::cout << Argv[I] << "\n";
+    }
+    return Argc;
+}
+
+class ServerTest : public ::testing::Test
+{
+protected:
+    void SetUp() override
+    {
+        Directory = fs::temp_directory_path() / fs::unique_path();
+        fs::create_directories(Directory);
+        SocketPath = (Directory / "ddisasm.sock").string();
+
+        ServerPid = fork();
+        ASSERT_GE(ServerPid, 0);
+        if(ServerPid == 0)
+        {
+            std::exit(serveJobs(SocketPath, echoArgs));
+        }
+        while(!fs::exists(SocketPath))
+        {
+            std::this_thread::sleep_for(std::chrono::milliseconds(10));
+        }
+    }
+
+    void TearDown() override
+    {
+        kill(ServerPid, SIGTERM);
+        waitpid(ServerPid, nullptr, 0);
+        fs::remove_all(Directory);
+    }
+
+    int connectToServer()
+    {
+        int Conn = socket(AF_UNIX, SOCK_STREAM, 0);
+        sockaddr_un Addr = {};
+        Addr.sun_family = AF_UNIX;
+        std::strncpy(Addr.sun_path, SocketPath.c_str(), sizeof(Addr.sun_path) - 1);
+        // The socket exists shortly before the server listens on it.
+        for(int Attempt = 0; Attempt < 100; Attempt++)
+        {
+            if(connect(Conn, reinterpret_cast<sockaddr*>(&Addr), sizeof(Addr)) == 0)
+            {
+                return Conn;
+            }
+            std::this_thread::sleep_for(std::chrono::milliseconds(10));
+        }
+        ADD_FAILURE() << "could not connect to " << SocketPath;
+        return Conn;
+    }
+
+    // Submit a job, see serveJobs() in Server.h.
+    void submit(int Conn, const std::vector<std::string>& Args, int OutFd, int ErrFd)
+    {
+        std::string Payload;
+        for(const std::string& Arg : Args)
+        {
+            Payload += Arg + '\0';
+        }
+        uint32_t Length = Payload.size();
+
+        int Fds[2] = {OutFd, ErrFd};
+        char Control[CMSG_SPACE(sizeof(Fds))] = {};
+        iovec Iov = {&Length, sizeof(Length)};
+        msghdr Msg = {};
+        Msg.msg_iov = &Iov;
+        Msg.msg_iovlen = 1;
+        Msg.msg_control = Control;
+        Msg.msg_controllen = sizeof(Control);
+        cmsghdr* Cmsg = CMSG_FIRSTHDR(&Msg);
+        Cmsg->cmsg_level = SOL_SOCKET;
+        Cmsg->cmsg_type = SCM_RIGHTS;
+        Cmsg->cmsg_len = CMSG_LEN(sizeof(Fds));
+        std::memcpy(CMSG_DATA(Cmsg), Fds, sizeof(Fds));
+        ASSERT_EQ(sendmsg(Conn, &Msg, 0), static_cast<ssize_t>(sizeof(Length)));
+        ASSERT_EQ(write(Conn, Payload.data(), Payload.size()),
+                  static_cast<ssize_t>(Payload.size()));
+    }
+
+    int32_t receiveStatus(int Conn)
+    {
+        int32_t Status = -1;
+        EXPECT_EQ(read(Conn, &Status, sizeof(Status)), static_cast<ssize_t>(sizeof(Status)));
+        close(Conn);
+        return Status;
+    }
+
+    // Run a job and return its exit status, with its stdout in Output.
+    int32_t run(const std::vector<std::string>& Args, std::string& Output)
+    {
+        int Pipe[2];
+        EXPECT_EQ(pipe(Pipe), 0);
+        int Conn = connectToServer();
+        submit(Conn, Args, Pipe[1], STDERR_FILENO);
+        close(Pipe[1]);
+
+        char Buffer[256];
+        ssize_t Count;
+        while((Count = read(Pipe[0], Buffer, sizeof(Buffer))) > 0)
+        {
+            Output.append(Buffer, Count);
+        }
+        close(Pipe[0]);
+        return receiveStatus(Conn);
+    }
+
+    fs::path Directory;
+    std::string SocketPath;
+    pid_t ServerPid;
+};
+
+TEST_F(ServerTest, run_job)
+{
+    std::string Output;
+    EXPECT_EQ(run({Directory.string(), "binary", "--ir", "-"}, Output), 4);
+    EXPECT_EQ(Output, "ddisasm\nbinary\n--ir\n-\n");
+}
+
+TEST_F(ServerTest, idle_client)
+{
+    // A client that connects without sending its job does not hold up others.
+    int Idle = connectToServer();
+    std::string Output;
+    EXPECT_EQ(run({Directory.string(), "binary"}, Output), 2);
+    close(Idle);
+
+    // Nor does a client that hangs up before its job finishes.
+    Output.clear();
+    EXPECT_EQ(run({Directory.string()}, Output), 1);
+}
+
+TEST_F(ServerTest, missing_directory)
+{
+    std::string Output;
+    EXPECT_EQ(run({(Directory / "missing").string(), "binary"}, Output), EXIT_FAILURE);
+    EXPECT_EQ(Output, "");
+}
+
+TEST_F(ServerTest, missing_descriptors)
+{
+    // A job without the client's stdout and stderr is rejected.
+    int Conn = connectToServer();
+    uint32_t Length = 0;
+    ASSERT_EQ(write(Conn, &Length, sizeof(Length)), static_cast<ssize_t>(sizeof(Length)));
+    EXPECT_EQ(receiveStatus(Conn), EXIT_FAILURE);
+}
+
+#endif /* defined(__unix__) */
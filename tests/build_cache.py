@@ -0,0 +1,170 @@
+"""
+Cache of the artifacts built by compiling an example directory.
+
+An entry is keyed on the content of the example directory after `make clean`,
+the identity of the compilers and the build flags. It holds the files that
+`make` created or modified, so a later build with the same inputs restores
+them instead of running the compilers again.
+"""
+import functools
+import hashlib
+import io
+import os
+import subprocess
+import tarfile
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Files that are written next to the sources by disassembling a binary and
+# that are not removed by `make clean`; they must not affect the key.
+IGNORED_SUFFIXES = (".gtirb", ".stripped", ".sstripped")
+
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+def snapshot(directory: Path) -> Snapshot:
+    """
+    Get the size and modification time of each file under 'directory'.
+    """
+    files = {}
+    for root, _, names in os.walk(str(directory)):
+        for name in names:
+            path = os.path.join(root, name)
+            stat = os.lstat(path)
+            files[os.path.relpath(path, str(directory))] = (
+                stat.st_size,
+                stat.st_mtime_ns,
+            )
+    return files
+
+
+def hash_directory(directory: Path) -> str:
+    digest = hashlib.sha256()
+    for relpath in sorted(snapshot(directory)):
+        if relpath.endswith(IGNORED_SUFFIXES):
+            continue
+        path = directory / relpath
+        digest.update(relpath.encode() + b"\0")
+        if path.is_symlink():
+            digest.update(os.readlink(str(path)).encode())
+        else:
+            digest.update(hashlib.sha256(path.read_bytes()).digest())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def compiler_identity(wrapper: Tuple[str, ...], compiler: str) -> str:
+    """
+    Describe the version of 'compiler', as reported by the compiler itself.
+    """
+    try:
+        proc = subprocess.run(
+            list(wrapper) + [compiler, "--version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            timeout=60,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return compiler + ": unavailable"
+    return compiler + ": " + proc.stdout.decode(errors="replace")
+
+
+def check_member(member: tarfile.TarInfo, build_dir: Path) -> None:
+    """
+    Reject a cache entry member that would be extracted outside 'build_dir'
+    or that is not a regular file, directory or relative symbolic link, as
+    the "data" extraction filter of newer Python versions does.
+    """
+    root = os.path.realpath(str(build_dir))
+
+    def inside(path: str) -> bool:
+        return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+    target = os.path.join(root, member.name)
+    if os.path.isabs(member.name) or not inside(target):
+        raise tarfile.TarError("member outside the build directory")
+    if member.issym():
+        link = os.path.join(os.path.dirname(target), member.linkname)
+        if os.path.isabs(member.linkname) or not inside(link):
+            raise tarfile.TarError("link outside the build directory")
+    elif not (member.isfile() or member.isdir()):
+        raise tarfile.TarError("unsupported member type")
+
+
+class BuildCache:
+    """
+    A directory of build artifacts, one tar archive per key.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def key(
+        self,
+        source_dir: Path,
+        wrapper: List[str],
+        compilers: List[str],
+        flags: List[str],
+        exec_wrapper: Optional[str],
+        arch: Optional[str],
+    ) -> str:
+        lines = [hash_directory(source_dir)]
+        lines += [compiler_identity(tuple(wrapper), c) for c in compilers]
+        lines += [" ".join(wrapper), repr(flags), repr(exec_wrapper)]
+        lines.append(repr(arch))
+        return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / (key + ".tar")
+
+    def restore(self, key: str, build_dir: Path) -> bool:
+        """
+        Extract the artifacts cached under 'key' into 'build_dir'. Return
+        False on a cache miss.
+        """
+        entry = self._entry_path(key)
+        try:
+            with tarfile.open(str(entry)) as archive:
+                members = archive.getmembers()
+                # Check the members even where the "data" filter exists: it
+                # extracts absolute members below 'build_dir' rather than
+                # rejecting them.
+                for member in members:
+                    check_member(member, build_dir)
+                if hasattr(tarfile, "data_filter"):
+                    archive.extractall(str(build_dir), filter="data")
+                else:
+                    archive.extractall(str(build_dir))
+        except (OSError, tarfile.TarError):
+            return False
+        # Make the restored artifacts newer than the sources, as if they had
+        # just been built, so that later make targets do not rebuild them.
+        for member in members:
+            if not member.issym():
+                os.utime(str(build_dir / member.name))
+        return True
+
+    def store(self, key: str, build_dir: Path, before: Snapshot) -> None:
+        """
+        Cache the files of 'build_dir' that were created or modified since
+        the snapshot 'before' was taken.
+        """
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as archive:
+            for relpath, stat in sorted(snapshot(build_dir).items()):
+                if before.get(relpath) != stat:
+                    archive.add(str(build_dir / relpath), arcname=relpath)
+
+        # Write to a temporary file first so that concurrent test runs never
+        # see a partial entry.
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.directory))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp_path, str(self._entry_path(key)))
+        except OSError:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,145 @@
+import io
+import os
+import platform
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+
+import build_cache
+
+
+@unittest.skipUnless(platform.system() == "Linux", "This test is linux only.")
+class BuildCacheTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.cache = build_cache.BuildCache(str(self.tmp / "cache"))
+        self.source_dir = self.tmp / "src"
+        self.source_dir.mkdir()
+        (self.source_dir / "ex.c").write_text("int main() { return 0; }\n")
+
+    def fake_compiler(self, name, version):
+        path = self.tmp / name
+        path.write_text(f"#!/bin/sh\necho '{version}'\n")
+        path.chmod(0o755)
+        return str(path)
+
+    def key(self, compilers, flags):
+        return self.cache.key(
+            self.source_dir, [], compilers, flags, None, None
+        )
+
+    def test_key(self):
+        """
+        The key changes with the sources, the compilers and the flags, and
+        not with files written by disassembling.
+        """
+        gcc = self.fake_compiler("gcc", "gcc 12.2.0")
+        key = self.key([gcc], ["-O0"])
+        self.assertEqual(self.key([gcc], ["-O0"]), key)
+
+        (self.source_dir / "ex.gtirb").write_bytes(b"ir")
+        self.assertEqual(self.key([gcc], ["-O0"]), key)
+
+        self.assertNotEqual(self.key([gcc], ["-O1"]), key)
+
+        other_gcc = self.fake_compiler("other-gcc", "gcc 13.1.0")
+        self.assertNotEqual(self.key([other_gcc], ["-O0"]), key)
+
+        (self.source_dir / "ex.c").write_text("int main() { return 1; }\n")
+        self.assertNotEqual(self.key([gcc], ["-O0"]), key)
+
+    def test_store_restore(self):
+        """
+        Only the files created or modified by the build are cached, and they
+        are restored with their content.
+        """
+        build_dir = self.tmp / "build"
+        build_dir.mkdir()
+        (build_dir / "ex.c").write_text("source")
+        (build_dir / "stale.o").write_text("old")
+        before = build_cache.snapshot(build_dir)
+
+        (build_dir / "ex").write_bytes(b"\x7fELF")
+        (build_dir / "obj").mkdir()
+        (build_dir / "obj" / "ex.o").write_bytes(b"object")
+        os.symlink("ex", str(build_dir / "ex.link"))
+        self.cache.store("key", build_dir, before)
+
+        self.assertFalse(self.cache.restore("missing", self.tmp / "other"))
+
+        restore_dir = self.tmp / "restored"
+        restore_dir.mkdir()
+        self.assertTrue(self.cache.restore("key", restore_dir))
+        self.assertEqual(
+            sorted(build_cache.snapshot(restore_dir)),
+            ["ex", "ex.link", os.path.join("obj", "ex.o")],
+        )
+        self.assertEqual((restore_dir / "ex").read_bytes(), b"\x7fELF")
+        self.assertEqual(
+            (restore_dir / "obj" / "ex.o").read_bytes(), b"object"
+        )
+        self.assertEqual(os.readlink(str(restore_dir / "ex.link")), "ex")
+
+    def store_members(self, key, members):
+        """
+        Write a cache entry holding the given (TarInfo, content) members.
+        """
+        self.cache.directory.mkdir(parents=True, exist_ok=True)
+        path = self.cache.directory / (key + ".tar")
+        with tarfile.open(str(path), "w") as archive:
+            for info, content in members:
+                if content is None:
+                    archive.addfile(info)
+                else:
+                    info.size = len(content)
+                    archive.addfile(info, io.BytesIO(content))
+
+    def test_unsafe_members(self):
+        """
+        Entries with members that would be written outside the build
+        directory are rejected.
+        """
+        build_dir = self.tmp / "build"
+        build_dir.mkdir()
+        outside = self.tmp / "outside"
+
+        absolute = tarfile.TarInfo(str(outside))
+        parent = tarfile.TarInfo("../outside")
+        symlink = tarfile.TarInfo("link")
+        symlink.type = tarfile.SYMTYPE
+        symlink.linkname = "../outside"
+        absolute_symlink = tarfile.TarInfo("link")
+        absolute_symlink.type = tarfile.SYMTYPE
+        absolute_symlink.linkname = str(outside)
+        hardlink = tarfile.TarInfo("link")
+        hardlink.type = tarfile.LNKTYPE
+        hardlink.linkname = "../outside"
+
+        unsafe = [
+            ("absolute", [(absolute, b"x")]),
+            ("parent", [(parent, b"x")]),
+            ("symlink", [(symlink, None)]),
+            ("absolute_symlink", [(absolute_symlink, None)]),
+            ("hardlink", [(hardlink, None)]),
+        ]
+        for key, members in unsafe:
+            with self.subTest(key):
+                for info, _ in members:
+                    with self.assertRaises(tarfile.TarError):
+                        build_cache.check_member(info, build_dir)
+
+                self.store_members(key, members)
+                self.assertFalse(self.cache.restore(key, build_dir))
+                self.assertFalse(os.path.lexists(str(outside)))
+
+        inside = tarfile.TarInfo("link")
+        inside.type = tarfile.SYMTYPE
+        inside.linkname = "ex"
+        build_cache.check_member(inside, build_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
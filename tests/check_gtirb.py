@@ -1,142 +1,265 @@
 #!/usr/bin/env python3
 import argparse
-from typing import List, Union
+import bisect
+import contextlib
+import glob
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Union
 import sys
+import time
 
 import capstone_gt
 import gtirb
 from gtirb_capstone.instructions import GtirbInstructionDecoder
 
 
+# Sections whose code is not checked.
+SKIPPED_SECTIONS = [
+    ".plt",
+    ".init",
+    ".fini",
+    ".MIPS.stubs",
+]
+
+# Functions whose code is not checked.
+SKIPPED_FUNCTIONS = [
+    "__do_global_ctors_aux",
+    "__do_global_dtors_aux",
+    "__libc_csu_fini",
+    "__libc_csu_init",
+    "_dl_relocate_static_pie",
+    "_start",
+    "deregister_tm_clones",
+    "frame_dummy",
+    "register_tm_clones",
+]
+
+
+class ModuleIndex:
+    """
+    Lookup tables over a GTIRB module, built once so that the checks can
+    query symbols, functions, padding and sections of each node in constant
+    or logarithmic time.
+
+    Each table is built on first use, so checks that do not need a table
+    (and the AuxData it is built from) do not pay for it. The last
+    instruction of each code block is cached as well.
+    """
+
+    def __init__(self, module: gtirb.Module):
+        self.module = module
+        self._decoder = None
+        self._last_instructions = {}
+        self._symbol_names = None
+        self._function_entry_names = None
+        self._skipped_function_blocks = None
+        self._padding_addresses = None
+        self._skipped_intervals = None
+
+    def lookup_sym(self, node: gtirb.Block) -> Union[str, None]:
+        """
+        Find a symbol name that describes the node.
+        """
+        if self._symbol_names is None:
+            self._symbol_names = {}
+            for sym in self.module.symbols:
+                if sym.referent is not None:
+                    self._symbol_names.setdefault(sym.referent, sym.name)
+        return self._symbol_names.get(node)
+
+    def node_str(self, node: gtirb.Block) -> str:
+        """
+        Generate a string that uniquely identifies the node
+        """
+        if isinstance(node, gtirb.ProxyBlock):
+            return self.lookup_sym(node) or node.uuid
+        else:
+            return hex(node.address)
+
+    def get_func_entry_name(self, node: gtirb.CodeBlock) -> Union[str, None]:
+        """
+        If the node is the entry point to a function, return the function
+        name.
+
+        Otherwise returns None
+        """
+        if self._function_entry_names is None:
+            self._function_entry_names = {}
+            aux_data = self.module.aux_data
+            entries = aux_data["functionEntries"].data
+            for key, value in aux_data["functionNames"].data.items():
+                for entry in entries[key]:
+                    self._function_entry_names.setdefault(entry, value.name)
+        return self._function_entry_names.get(node)
+
+    def is_skipped_section(self, node: gtirb.CodeBlock) -> bool:
+        """
+        Determine if the node is part of an uninteresting section.
+        """
+        if self._skipped_intervals is None:
+            intervals = sorted(
+                (interval.address, interval.address + interval.size)
+                for section in self.module.sections
+                if section.name in SKIPPED_SECTIONS
+                for interval in section.byte_intervals
+                if interval.address is not None
+            )
+            self._skipped_intervals = (
+                [start for start, _ in intervals],
+                [end for _, end in intervals],
+            )
+
+        starts, ends = self._skipped_intervals
+        # Byte intervals do not overlap, so only the last interval starting
+        # at or before the node can contain it.
+        i = bisect.bisect_right(starts, node.address) - 1
+        return i >= 0 and node.address < ends[i]
+
+    def belongs_to_skipped_func(self, node: gtirb.CodeBlock) -> bool:
+        """
+        Determine if a CFG node is in a skipped function or section
+        """
+        if self._skipped_function_blocks is None:
+            self._skipped_function_blocks = set()
+            aux_data = self.module.aux_data
+            blocks = aux_data["functionBlocks"].data
+            for key, value in aux_data["functionNames"].data.items():
+                if value.name in SKIPPED_FUNCTIONS:
+                    self._skipped_function_blocks.update(blocks[key])
+
+        if node in self._skipped_function_blocks:
+            return True
+        return self.is_skipped_section(node)
+
+    def is_padding(self, node: gtirb.CodeBlock) -> bool:
+        """
+        Determine if a CFG node is padding
+        """
+        if self._padding_addresses is None:
+            self._padding_addresses = {
+                key.element_id.address + key.displacement
+                for key in self.module.aux_data["padding"].data
+            }
+        return node.address in self._padding_addresses
+
+    def _decode(self, block: gtirb.CodeBlock) -> List[capstone_gt.CsInsn]:
+        if self._decoder is None:
+            self._decoder = GtirbInstructionDecoder(self.module.isa)
+        return list(self._decoder.get_instructions(block))
+
+    def last_instruction(self, block: gtirb.CodeBlock) -> capstone_gt.CsInsn:
+        """
+        Get the last instruction of a code block.
+        """
+        last_inst = self._last_instructions.get(block)
+        if last_inst is None:
+            last_inst = self._decode(block)[-1]
+            self._last_instructions[block] = last_inst
+        return last_inst
+
+
 def lookup_sym(node: gtirb.Block) -> Union[str, None]:
     """
     Find a symbol name that describes the node.
+
+    Checks that look up many nodes should use ModuleIndex instead.
     """
     for sym in node.module.symbols:
         if sym._payload == node:
             return sym.name
 
 
-def node_str(node: gtirb.Block) -> str:
-    """
-    Generate a string that uniquely identifies the node
-    """
-    if isinstance(node, gtirb.ProxyBlock):
-        return lookup_sym(node) or node.uuid
-    else:
-        return hex(node.address)
-
-
-def has_undefined_branch(branches: List[gtirb.Edge]) -> bool:
+def has_undefined_branch(
+    index: ModuleIndex, branches: List[gtirb.Edge]
+) -> bool:
     """
     Determine if any of the branches are not resolved to a target.
     """
     for branch in branches:
-        if isinstance(branch.target, gtirb.ProxyBlock) and not lookup_sym(
-            branch.target
-        ):
+        if isinstance(
+            branch.target, gtirb.ProxyBlock
+        ) and not index.lookup_sym(branch.target):
             return True
     return False
 
 
-def has_symbolic_branch(branches: List[gtirb.Edge]) -> bool:
+def has_symbolic_branch(
+    index: ModuleIndex, branches: List[gtirb.Edge]
+) -> bool:
     """
     Determine if any of the branches are to a defined symbol.
     """
     for branch in branches:
-        if lookup_sym(branch.target):
+        if index.lookup_sym(branch.target):
             return True
     return False
 
 
-def is_skipped_section(node: gtirb.CodeBlock) -> bool:
-    """
-    Determine if the node is part of an uninteresting section.
+class Check:
     """
-    skipped_sections = [
-        ".plt",
-        ".init",
-        ".fini",
-        ".MIPS.stubs",
-    ]
-
-    for section in node.module.sections:
-        if section.name not in skipped_sections:
-            continue
-
-        for interval in section.byte_intervals:
-            start = interval.address
-            end = interval.address + interval.size
-
-            if start <= node.address and node.address < end:
-                return True
-    return False
-
+    A check of a GTIRB module that inspects CFG nodes and edges.
 
-def get_func_entry_name(node: gtirb.CodeBlock) -> Union[str, None]:
+    run_checks walks the CFG of the module once for all the selected checks,
+    calling visit_node for every CFG node and visit_edge for every edge of
+    each active check, then calls finish. Checks report problems with error
+    and warning, which print them and record them in errors and warnings.
     """
-    If the node is the entry point to a function, return the function name.
 
-    Otherwise returns None
-    """
-    for key, value in node.module.aux_data["functionNames"].data.items():
-        if node in node.module.aux_data["functionEntries"].data[key]:
-            return value.name
-
-
-def belongs_to_skipped_func(node: gtirb.CodeBlock) -> bool:
-    """
-    Determine if a CFG node is
-    """
-    skipped_funcs = [
-        "__do_global_ctors_aux",
-        "__do_global_dtors_aux",
-        "__libc_csu_fini",
-        "__libc_csu_init",
-        "_dl_relocate_static_pie",
-        "_start",
-        "deregister_tm_clones",
-        "frame_dummy",
-        "register_tm_clones",
-    ]
+    def __init__(self, module: gtirb.Module, index: ModuleIndex):
+        self.module = module
+        self.index = index
+        self.error_count = 0
+        self.errors = []
+        self.warnings = []
 
-    for name in skipped_funcs:
-        for key, value in node.module.aux_data["functionNames"].data.items():
-            if value.name == name:
-                if node in node.module.aux_data["functionBlocks"].data[key]:
-                    return True
+    def error(self, message: str, address: Optional[int] = None) -> None:
+        print("ERROR:", message)
+        self.errors.append((address, message))
+        self.error_count += 1
 
-    return is_skipped_section(node)
+    def warning(self, message: str, address: Optional[int] = None) -> None:
+        print("WARNING:", message)
+        self.warnings.append((address, message))
 
+    def active(self) -> bool:
+        """
+        Determine if the check applies to the module at all.
+        """
+        return True
 
-def is_padding(node: gtirb.CodeBlock) -> bool:
-    """
-    Determine if a CFG node is padding
-    """
-    for key, padding_size in node.module.aux_data["padding"].data.items():
-        padding_addr = key.element_id.address + key.displacement
+    def visit_node(
+        self, node: gtirb.CfgNode, outgoing_edges: List[gtirb.Edge]
+    ) -> None:
+        pass
 
-        if padding_addr == node.address:
-            return True
+    def visit_edge(self, edge: gtirb.Edge) -> None:
+        pass
 
-    return False
+    def finish(self) -> int:
+        """
+        Complete the check and return the number of errors found.
+        """
+        return self.error_count
 
 
-def check_unreachable(module: gtirb.Module) -> int:
+class UnreachableCheck(Check):
     """
     Check a GTIRB module for unexpected unreachable code
     """
-    error_count = 0
 
-    for node in module.cfg_nodes:
+    def visit_node(self, node, outgoing_edges):
+        index = self.index
         if (
             not isinstance(node, gtirb.CodeBlock)
-            or belongs_to_skipped_func(node)
-            or is_padding(node)
+            or index.belongs_to_skipped_func(node)
+            or index.is_padding(node)
         ):
-            continue
+            return
 
-        func = get_func_entry_name(node)
+        func = index.get_func_entry_name(node)
         if len(list(node.incoming_edges)) == 0 and func != "main":
 
             if func:
@@ -145,38 +268,39 @@ def check_unreachable(module: gtirb.Module) -> int:
                 # We warn for these - if this code isn't being run, we're not
                 # testing whether ddisasm disassembled it well, and we may want
                 # to consider reworking those examples.
-                print(
-                    'WARNING: unreachable function "{}" at {}'.format(
-                        func, node_str(node)
-                    )
+                self.warning(
+                    'unreachable function "{}" at {}'.format(
+                        func, index.node_str(node)
+                    ),
+                    node.address,
                 )
             else:
                 # Unreachable code that is not a function entry is likely to
                 # be an error, such as jump table where not all possible
                 # targets were discovered.
-                print("ERROR: unreachable code at", node_str(node))
-                error_count += 1
-
-    return error_count
+                self.error(
+                    "unreachable code at " + index.node_str(node),
+                    node.address,
+                )
 
 
-def check_unresolved_branch(module: gtirb.Module) -> int:
+class UnresolvedBranchCheck(Check):
     """
     Check a GTIRB module for unresolved branches
     """
-    error_count = 0
 
-    for node in module.cfg_nodes:
+    def visit_node(self, node, outgoing_edges):
+        index = self.index
         if (
             not isinstance(node, gtirb.CodeBlock)
-            or belongs_to_skipped_func(node)
-            or is_padding(node)
+            or index.belongs_to_skipped_func(node)
+            or index.is_padding(node)
         ):
-            continue
+            return
 
         branches = []
 
-        for edge in node.outgoing_edges:
+        for edge in outgoing_edges:
             if edge.label.type not in (
                 gtirb.Edge.Type.Return,
                 gtirb.Edge.Type.Fallthrough,
@@ -185,81 +309,84 @@ def check_unresolved_branch(module: gtirb.Module) -> int:
 
         # Calls to PLT functions seem to have a branch to a ProxyBlock for
         # that symbol and a branch to the original PLT function.
-        if has_undefined_branch(branches) and not has_symbolic_branch(
-            branches
+        if has_undefined_branch(index, branches) and not has_symbolic_branch(
+            index, branches
         ):
-            print("ERROR: unresolved jump in", node_str(node))
-            error_count += 1
-
-    return error_count
+            self.error(
+                "unresolved jump in " + index.node_str(node), node.address
+            )
 
 
-def check_cfg_empty(module: gtirb.Module) -> int:
+class CfgEmptyCheck(Check):
     """
     Check if a GTIRB module has an empty CFG
     """
-    if len(list(module.cfg_nodes)) == 0:
-        print("ERROR: CFG has no nodes")
-        return 1
 
-    return 0
+    def __init__(self, module, index):
+        super().__init__(module, index)
+        self.node_count = 0
+
+    def visit_node(self, node, outgoing_edges):
+        self.node_count += 1
 
+    def finish(self):
+        if self.node_count == 0:
+            self.error("CFG has no nodes")
+        return self.error_count
 
-def check_main_is_code(module: gtirb.Module) -> int:
+
+class MainIsCodeCheck(Check):
     """
     Check a GTIRB module for a `main` symbol that is not a CodeBlock.
-
-    Returns the number of errors found.
     """
-    error_count = 0
 
-    for sym in module.symbols:
-        if sym.name == "main":
-            if not isinstance(sym.referent, gtirb.CodeBlock):
-                print("ERROR: main is not code")
-                error_count += 1
+    def active(self):
+        # This check does not need the CFG.
+        return False
 
-    return error_count
+    def finish(self):
+        for sym in self.module.symbols_named("main"):
+            if not isinstance(sym.referent, gtirb.CodeBlock):
+                self.error("main is not code")
+        return self.error_count
 
 
-def check_decode_mode_matches_arch(module: gtirb.Module) -> int:
+class DecodeModeMatchesArchCheck(Check):
     """
     Ensure a GTIRB only uses DecodeMode values that match the architecture
-
-    Returns the number of errors found.
     """
-    error_count = 0
 
     # if a new mode is added, we will raise a KeyError unless it is added
     # to this dictionary.
-    mode_to_arch = {
+    MODE_TO_ARCH = {
         gtirb.CodeBlock.DecodeMode.Thumb: gtirb.module.Module.ISA.ARM
     }
 
-    for block in module.code_blocks:
-        if block.decode_mode == gtirb.CodeBlock.DecodeMode.Default:
+    def visit_node(self, node, outgoing_edges):
+        if not isinstance(node, gtirb.CodeBlock):
+            return
+        if node.decode_mode == gtirb.CodeBlock.DecodeMode.Default:
             # "Default" is correct on every arch
-            continue
-
-        if module.isa != mode_to_arch[block.decode_mode]:
-            print(f"ERROR: {module.isa} does not support {block.decode_mode}")
-            error_count += 1
+            return
 
-    return error_count
+        if self.module.isa != self.MODE_TO_ARCH[node.decode_mode]:
+            self.error(
+                f"{self.module.isa} does not support {node.decode_mode}",
+                node.address,
+            )
 
 
-def check_outgoing_edges(module: gtirb.Module) -> int:
+class OutgoingEdgesCheck(Check):
     """
     Check outgoing edges for invalid configurations
     """
-    error_count = 0
 
-    for node in module.cfg_nodes:
+    def visit_node(self, node, outgoing_edges):
         fallthrough_count = 0
         direct_call_count = 0
         direct_jump_count = 0
 
-        for edge in node.outgoing_edges:
+        for edge in outgoing_edges:
 
             if edge.label.direct and edge.label.type == gtirb.Edge.Type.Call:
                 direct_call_count += 1
@@ -270,17 +397,14 @@ def check_outgoing_edges(module: gtirb.Module) -> int:
             elif edge.label.type == gtirb.Edge.Type.Fallthrough:
                 fallthrough_count += 1
 
+        node_str = self.index.node_str
+        address = getattr(node, "address", None)
         if fallthrough_count > 1:
-            print("ERROR: multiple fallthrough from ", node_str(node))
-            error_count += 1
+            self.error("multiple fallthrough from " + node_str(node), address)
         if direct_call_count > 1:
-            print("ERROR: multiple direct call from ", node_str(node))
-            error_count += 1
+            self.error("multiple direct call from " + node_str(node), address)
         if direct_jump_count > 1:
-            print("ERROR: multiple direct jump from ", node_str(node))
-            error_count += 1
-
-    return error_count
+            self.error("multiple direct jump from " + node_str(node), address)
 
 
 def is_rep_loop(inst: capstone_gt.CsInsn) -> bool:
@@ -329,20 +453,14 @@ def is_pc_relative(inst: capstone_gt.CsInsn) -> bool:
     )
 
 
-def check_edge_instruction_group(module: gtirb.Module) -> int:
+class EdgeInstructionGroupCheck(Check):
     """
     Check edges for valid instruction groups
     """
-    # TODO: support non-x86 checks
-    if module.isa not in [gtirb.Module.ISA.X64, gtirb.Module.ISA.IA32]:
-        return 0
-
-    err_count = 0
-    decoder = GtirbInstructionDecoder(module.isa)
 
     # TODO: there is one more generic capstone group, X86_GRP_PRIVILEGE.
     # does it belong in Syscall?
-    edge_type_groups = {
+    EDGE_TYPE_GROUPS = {
         gtirb.Edge.Type.Branch: set(
             (
                 capstone_gt.x86.X86_GRP_JUMP,
@@ -355,16 +473,17 @@ def check_edge_instruction_group(module: gtirb.Module) -> int:
         gtirb.Edge.Type.Sysret: set((capstone_gt.x86.X86_GRP_IRET,)),
     }
 
-    for edge in module.ir.cfg:
+    def active(self):
+        # TODO: support non-x86 checks
+        return self.module.isa in [gtirb.Module.ISA.X64, gtirb.Module.ISA.IA32]
+
+    def visit_edge(self, edge):
         if edge.label.type == gtirb.Edge.Type.Fallthrough:
             # fallthrough edges do not map to a specified instruction group
-            continue
+            return
 
         block = edge.source
-
-        # get the last instruction
-        for instruction in decoder.get_instructions(block):
-            last_inst = instruction
+        last_inst = self.index.last_instruction(block)
 
         # ensure instruction can be an edge
 
@@ -374,40 +493,37 @@ def check_edge_instruction_group(module: gtirb.Module) -> int:
             and is_rep_loop(last_inst)
             and edge.target == block
         ):
-            continue
+            return
 
-        valid_groups = edge_type_groups[edge.label.type]
+        valid_groups = self.EDGE_TYPE_GROUPS[edge.label.type]
         if not any(last_inst.group(grp) for grp in valid_groups):
-            print(
-                "ERROR: invalid edge instruction group at 0x{:08x}: {}".format(
+            self.error(
+                "invalid edge instruction group at 0x{:08x}: {}".format(
                     last_inst.address, last_inst.groups
-                )
+                ),
+                last_inst.address,
             )
-            err_count += 1
 
-    return err_count
 
-
-def check_cfg_completeness(module: gtirb.Module) -> int:
+class CfgCompletenessCheck(Check):
     """
     Check we have 1 call/branch edge from all direct or
     pc-relative calls/jumps.
     """
-    # TODO: support non-x86 checks
-    if module.isa not in [gtirb.Module.ISA.X64, gtirb.Module.ISA.IA32]:
-        return 0
 
-    err_count = 0
-    decoder = GtirbInstructionDecoder(module.isa)
+    def active(self):
+        # TODO: support non-x86 checks
+        return self.module.isa in [gtirb.Module.ISA.X64, gtirb.Module.ISA.IA32]
+
+    def visit_node(self, block, outgoing_edges):
+        if not isinstance(block, gtirb.CodeBlock):
+            return
 
-    for block in module.code_blocks:
-        # get the last instruction
-        for instruction in decoder.get_instructions(block):
-            last_inst = instruction
+        last_inst = self.index.last_instruction(block)
         if last_inst.group(capstone_gt.x86.X86_GRP_CALL):
             call_edges = [
                 edge
-                for edge in block.outgoing_edges
+                for edge in outgoing_edges
                 if edge.label.type == gtirb.EdgeType.Call
             ]
             if is_direct(last_inst) or is_pc_relative(last_inst):
@@ -416,18 +532,18 @@ def check_cfg_completeness(module: gtirb.Module) -> int:
                 # trick to get the PC value.
                 if (
                     is_direct(last_inst)
-                    and module.isa == gtirb.Module.ISA.IA32
+                    and self.module.isa == gtirb.Module.ISA.IA32
                     and last_inst.operands[0].imm
                     == last_inst.address + last_inst.size
                 ):
-                    continue
+                    return
 
                 if len(call_edges) != 1:
-                    print(
-                        "ERROR: expected 1 call edge at "
-                        f"0x{last_inst.address:08x} and got {len(call_edges)}"
+                    self.error(
+                        "expected 1 call edge at "
+                        f"0x{last_inst.address:08x} and got {len(call_edges)}",
+                        last_inst.address,
                     )
-                    err_count += 1
         elif last_inst.group(capstone_gt.x86.X86_GRP_JUMP):
 
             # The first block of plt sections looks like:
@@ -443,34 +559,32 @@ def check_cfg_completeness(module: gtirb.Module) -> int:
                 block.section.address == block.address
                 and block.section.name in [".plt", ".plt.sec", ".plt.got"]
             ):
-                continue
+                return
 
             branch_edges = [
                 edge
-                for edge in block.outgoing_edges
+                for edge in outgoing_edges
                 if edge.label.type == gtirb.EdgeType.Branch
             ]
             if is_direct(last_inst) or is_pc_relative(last_inst):
                 if len(branch_edges) != 1:
-                    print(
-                        "ERROR: expected 1 branch edge at "
+                    self.error(
+                        "expected 1 branch edge at "
                         f"0x{last_inst.address:08x} and got"
-                        f" {len(branch_edges)}"
+                        f" {len(branch_edges)}",
+                        last_inst.address,
                     )
-                    err_count += 1
-
-    return err_count
 
 
 CHECKS = {
-    "unreachable": check_unreachable,
-    "unresolved_branch": check_unresolved_branch,
-    "cfg_empty": check_cfg_empty,
-    "main_is_code": check_main_is_code,
-    "decode_mode_matches_arch": check_decode_mode_matches_arch,
-    "outgoing_edges": check_outgoing_edges,
-    "edge_instruction_group": check_edge_instruction_group,
-    "cfg_completeness": check_cfg_completeness,
+    "unreachable": UnreachableCheck,
+    "unresolved_branch": UnresolvedBranchCheck,
+    "cfg_empty": CfgEmptyCheck,
+    "main_is_code": MainIsCodeCheck,
+    "decode_mode_matches_arch": DecodeModeMatchesArchCheck,
+    "outgoing_edges": OutgoingEdgesCheck,
+    "edge_instruction_group": EdgeInstructionGroupCheck,
+    "cfg_completeness": CfgCompletenessCheck,
 }
 
 
@@ -480,25 +594,191 @@ class NoSuchCheckError(Exception):
     pass
 
 
-def run_checks(module: gtirb.Module, selected_checks: List[str]):
+def check_module(
+    module: gtirb.Module, selected_checks: List[str]
+) -> Dict[str, Check]:
     """
-    Run specified checks
+    Run specified checks and return the finished checks by name; the time in
+    seconds spent in each check is stored in its `time` attribute.
+
+    All the checks share a single traversal of the CFG.
 
     Raises NoSuchCheckError for unexpected names in selected_checks
     """
-    error_count = 0
     for selected_check in selected_checks:
         if selected_check not in CHECKS:
             raise NoSuchCheckError(f"No such check: {selected_check}")
 
-        error_count += CHECKS[selected_check](module)
+    index = ModuleIndex(module)
+    elapsed = {}
+    checks = {}
+    for name in selected_checks:
+        start = time.perf_counter()
+        checks[name] = CHECKS[name](module, index)
+        elapsed[name] = time.perf_counter() - start
+
+    # Only call the callbacks that checks actually implement.
+    node_visitors = []
+    edge_visitors = []
+    for name, check in checks.items():
+        if not check.active():
+            continue
+        if type(check).visit_node is not Check.visit_node:
+            node_visitors.append((name, check.visit_node))
+        if type(check).visit_edge is not Check.visit_edge:
+            edge_visitors.append((name, check.visit_edge))
+
+    if node_visitors or edge_visitors:
+        for node in module.cfg_nodes:
+            outgoing_edges = list(node.outgoing_edges)
+            for name, visit_node in node_visitors:
+                start = time.perf_counter()
+                visit_node(node, outgoing_edges)
+                elapsed[name] += time.perf_counter() - start
+            for edge in outgoing_edges:
+                for name, visit_edge in edge_visitors:
+                    start = time.perf_counter()
+                    visit_edge(edge)
+                    elapsed[name] += time.perf_counter() - start
+
+    for name, check in checks.items():
+        start = time.perf_counter()
+        check.finish()
+        check.time = elapsed[name] + time.perf_counter() - start
+    return checks
+
+
+def run_checks(
+    module: gtirb.Module,
+    selected_checks: List[str],
+    timings: Optional[Dict[str, float]] = None,
+):
+    """
+    Run specified checks
+
+    If `timings` is given, it receives the time in seconds spent in each
+    check.
+
+    Raises NoSuchCheckError for unexpected names in selected_checks
+    """
+    checks = check_module(module, selected_checks)
+    if timings is not None:
+        timings.update((name, check.time) for name, check in checks.items())
+    return sum(check.error_count for check in checks.values())
+
+
+def check_file(path: str, selected_checks: List[str]) -> Dict[str, Any]:
+    """
+    Check the first module of the GTIRB file at `path` and return a report
+    entry with the errors, warnings and time of each check.
+
+    Messages are recorded in the report instead of being printed.
+    """
+    report = {"path": path, "error_count": 0, "checks": {}}
+    start = time.perf_counter()
+    try:
+        module = gtirb.IR.load_protobuf(path).modules[0]
+    except Exception as e:
+        report["exception"] = f"{type(e).__name__}: {e}"
+        report["error_count"] = 1
+        return report
+    report["load_time"] = time.perf_counter() - start
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        checks = check_module(module, selected_checks)
+    for name, check in checks.items():
+        report["checks"][name] = {
+            "error_count": check.error_count,
+            "time": check.time,
+            "errors": [
+                {"address": address, "message": message}
+                for address, message in check.errors
+            ],
+            "warnings": [
+                {"address": address, "message": message}
+                for address, message in check.warnings
+            ],
+        }
+        report["error_count"] += check.error_count
+    report["time"] = time.perf_counter() - start
+    return report
+
+
+def expand_paths(patterns: List[str]) -> List[str]:
+    """
+    Expand glob patterns into a sorted list of paths.
+
+    Raises FileNotFoundError if a pattern matches nothing.
+    """
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                raise FileNotFoundError(f"no files match {pattern}")
+            paths.extend(matches)
+        else:
+            paths.append(pattern)
+    return paths
+
+
+def check_files(
+    paths: List[str],
+    selected_checks: List[str],
+    jobs: int,
+    report_path: str,
+    report_format: str,
+    timings: bool = False,
+) -> int:
+    """
+    Check many GTIRB files in a process pool and write a report. Return the
+    number of files with errors.
+
+    If `timings` is set, the time spent in each check is printed to stderr
+    after the summary of each file.
+    """
+    if report_path == "-":
+        report_file = contextlib.nullcontext(sys.stdout)
+    else:
+        report_file = open(report_path, "w")
+
+    failed_files = 0
+    reports = []
+    with report_file as out, ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(check_file, path, selected_checks) for path in paths
+        ]
+        for future in as_completed(futures):
+            report = future.result()
+            if report["error_count"]:
+                failed_files += 1
+            print(
+                "{}: {} errors".format(report["path"], report["error_count"]),
+                file=sys.stderr,
+            )
+            if timings:
+                for name, check in report["checks"].items():
+                    print(f"  {name}: {check['time']:.3f}s", file=sys.stderr)
+            if report_format == "ndjson":
+                out.write(json.dumps(report) + "\n")
+                out.flush()
+            else:
+                reports.append(report)
 
-    return error_count
+        if report_format == "json":
+            reports.sort(key=lambda report: report["path"])
+            json.dump({"files": reports}, out, indent=1)
+            out.write("\n")
+    return failed_files
 
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("path")
+    parser.add_argument(
+        "path",
+        nargs="+",
+        help="GTIRB files to check, or glob patterns matching them",
+    )
 
     check_names = list(CHECKS.keys())
     check_names.append("all")
@@ -509,11 +789,54 @@ def main():
         default="all",
         help="The name of the check to run",
     )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print the time spent in each check to stderr",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of files to check concurrently in batch mode",
+    )
+    parser.add_argument(
+        "--report",
+        help="Write a report of all the files to this path ('-' for stdout)",
+    )
+    parser.add_argument(
+        "--report-format",
+        choices=["json", "ndjson"],
+        default="json",
+        help="Format of the report",
+    )
     args = parser.parse_args()
 
-    module = gtirb.IR.load_protobuf(args.path).modules[0]
     checks = list(CHECKS.keys()) if args.check == "all" else [args.check]
-    error_count = run_checks(module, checks)
+    try:
+        paths = expand_paths(args.path)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+
+    if len(paths) != 1 or args.report:
+        # Batch mode: exit with the number of files with errors.
+        failed_files = check_files(
+            paths,
+            checks,
+            args.jobs,
+            args.report or "-",
+            args.report_format,
+            args.timings,
+        )
+        sys.exit(min(failed_files, 255))
+
+    module = gtirb.IR.load_protobuf(paths[0]).modules[0]
+    timings = {}
+    error_count = run_checks(module, checks, timings)
+    if args.timings:
+        for name, seconds in timings.items():
+            print(f"{name}: {seconds:.3f}s", file=sys.stderr)
     sys.exit(error_count)
 
 
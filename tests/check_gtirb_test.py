@@ -0,0 +1,264 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import unittest.mock
+import uuid
+from pathlib import Path
+
+import gtirb
+
+import check_gtirb
+
+
+def build_module() -> gtirb.Module:
+    """
+    Build a small x64 module:
+
+        0x1000 main: call f        (falls through to 0x1005)
+        0x1005       ret
+        0x1006       nop x 10      (padding)
+        0x1010 f:    jmp main
+        0x1012       ret           (unreachable)
+        0x2000       ret           (.plt)
+    """
+    ir = gtirb.IR()
+    module = gtirb.Module(
+        name="test",
+        isa=gtirb.Module.ISA.X64,
+        file_format=gtirb.Module.FileFormat.ELF,
+        byte_order=gtirb.Module.ByteOrder.Little,
+        ir=ir,
+    )
+    text = gtirb.Section(name=".text", module=module)
+    contents = b"\xe8\x0b\x00\x00\x00" + b"\xc3" + b"\x90" * 10
+    contents += b"\xeb\xee" + b"\xc3"
+    interval = gtirb.ByteInterval(
+        address=0x1000, contents=contents, section=text
+    )
+    main = gtirb.CodeBlock(offset=0, size=5, byte_interval=interval)
+    ret = gtirb.CodeBlock(offset=5, size=1, byte_interval=interval)
+    gtirb.CodeBlock(offset=6, size=10, byte_interval=interval)
+    f = gtirb.CodeBlock(offset=0x10, size=2, byte_interval=interval)
+    gtirb.CodeBlock(offset=0x12, size=1, byte_interval=interval)
+
+    plt = gtirb.Section(name=".plt", module=module)
+    plt_interval = gtirb.ByteInterval(
+        address=0x2000, contents=b"\xc3", section=plt
+    )
+    gtirb.CodeBlock(offset=0, size=1, byte_interval=plt_interval)
+
+    main_sym = gtirb.Symbol(name="main", payload=main, module=module)
+    gtirb.Symbol(name="f", payload=f, module=module)
+
+    def edge(source, target, edge_type):
+        ir.cfg.add(
+            gtirb.Edge(
+                source, target, gtirb.Edge.Label(type=edge_type, direct=True)
+            )
+        )
+
+    edge(main, f, gtirb.Edge.Type.Call)
+    edge(main, ret, gtirb.Edge.Type.Fallthrough)
+    edge(f, main, gtirb.Edge.Type.Branch)
+
+    function = uuid.uuid4()
+    module.aux_data["functionEntries"] = gtirb.AuxData(
+        type_name="mapping<UUID,set<UUID>>", data={function: {main}}
+    )
+    module.aux_data["functionBlocks"] = gtirb.AuxData(
+        type_name="mapping<UUID,set<UUID>>", data={function: {main, ret}}
+    )
+    module.aux_data["functionNames"] = gtirb.AuxData(
+        type_name="mapping<UUID,UUID>", data={function: main_sym}
+    )
+    module.aux_data["padding"] = gtirb.AuxData(
+        type_name="mapping<Offset,uint64_t>",
+        data={gtirb.Offset(interval, 6): 10},
+    )
+    return module
+
+
+def block_at(module: gtirb.Module, address: int) -> gtirb.CodeBlock:
+    return next(iter(module.code_blocks_at(address)))
+
+
+class ModuleIndexTests(unittest.TestCase):
+    def test_lookups(self):
+        module = build_module()
+        index = check_gtirb.ModuleIndex(module)
+
+        main = block_at(module, 0x1000)
+        self.assertEqual(index.lookup_sym(main), "main")
+        self.assertEqual(index.lookup_sym(block_at(module, 0x1005)), None)
+        self.assertEqual(index.node_str(main), "0x1000")
+        self.assertEqual(index.get_func_entry_name(main), "main")
+        self.assertEqual(
+            index.get_func_entry_name(block_at(module, 0x1010)), None
+        )
+
+        self.assertTrue(index.is_padding(block_at(module, 0x1006)))
+        self.assertFalse(index.is_padding(main))
+
+        self.assertTrue(index.is_skipped_section(block_at(module, 0x2000)))
+        self.assertFalse(index.is_skipped_section(main))
+        self.assertTrue(
+            index.belongs_to_skipped_func(block_at(module, 0x2000))
+        )
+        self.assertFalse(index.belongs_to_skipped_func(main))
+
+    def test_instruction_cache(self):
+        """
+        The last instruction of each block is decoded only once.
+        """
+        module = build_module()
+        main = block_at(module, 0x1000)
+        index = check_gtirb.ModuleIndex(module)
+        with unittest.mock.patch.object(
+            index, "_decode", wraps=index._decode
+        ) as decode:
+            self.assertEqual(index.last_instruction(main).mnemonic, "call")
+            index.last_instruction(main)
+        self.assertEqual(decode.call_count, 1)
+
+
+class CheckModuleTests(unittest.TestCase):
+    def test_all_checks(self):
+        module = build_module()
+        with unittest.mock.patch("sys.stdout", new=io.StringIO()):
+            checks = check_gtirb.check_module(
+                module, list(check_gtirb.CHECKS.keys())
+            )
+
+        self.assertEqual(set(checks), set(check_gtirb.CHECKS))
+        for name, check in checks.items():
+            expected = 1 if name == "unreachable" else 0
+            self.assertEqual(check.error_count, expected, name)
+            self.assertGreaterEqual(check.time, 0)
+        self.assertEqual(
+            checks["unreachable"].errors,
+            [(0x1012, "unreachable code at 0x1012")],
+        )
+
+    def test_single_traversal(self):
+        """
+        Every CFG node and edge is visited once per check.
+        """
+        visits = []
+
+        class CountingCheck(check_gtirb.Check):
+            def visit_node(self, node, outgoing_edges):
+                visits.append(node)
+
+            def visit_edge(self, edge):
+                visits.append(edge)
+
+        module = build_module()
+        with unittest.mock.patch.dict(
+            check_gtirb.CHECKS, {"a": CountingCheck, "b": CountingCheck}
+        ):
+            check_gtirb.check_module(module, ["a", "b"])
+
+        nodes = list(module.cfg_nodes)
+        edges = list(module.ir.cfg)
+        self.assertEqual(len(visits), 2 * (len(nodes) + len(edges)))
+        self.assertEqual(set(visits), set(nodes) | set(edges))
+
+    def test_run_checks(self):
+        module = build_module()
+        timings = {}
+        with unittest.mock.patch("sys.stdout", new=io.StringIO()):
+            errors = check_gtirb.run_checks(
+                module, ["unreachable", "cfg_empty"], timings
+            )
+        self.assertEqual(errors, 1)
+        self.assertEqual(set(timings), {"unreachable", "cfg_empty"})
+
+        with self.assertRaises(check_gtirb.NoSuchCheckError):
+            check_gtirb.run_checks(module, ["not_a_check"])
+
+
+class BatchTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        for name in ("a.gtirb", "b.gtirb"):
+            build_module().ir.save_protobuf(str(self.dir / name))
+        (self.dir / "bad.gtirb").write_bytes(b"not a GTIRB file")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_main(self, *args):
+        return subprocess.run(
+            [sys.executable, check_gtirb.__file__, *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+    def test_check_file(self):
+        report = check_gtirb.check_file(
+            str(self.dir / "a.gtirb"), ["unreachable"]
+        )
+        self.assertEqual(report["error_count"], 1)
+        self.assertEqual(
+            report["checks"]["unreachable"]["errors"],
+            [{"address": 0x1012, "message": "unreachable code at 0x1012"}],
+        )
+
+        report = check_gtirb.check_file(
+            str(self.dir / "bad.gtirb"), ["unreachable"]
+        )
+        self.assertEqual(report["error_count"], 1)
+        self.assertIn("exception", report)
+
+    def test_report(self):
+        report_path = str(self.dir / "report.json")
+        proc = self.run_main(
+            str(self.dir / "*.gtirb"), "-j", "2", "--report", report_path
+        )
+        self.assertEqual(proc.returncode, 3)
+        with open(report_path) as f:
+            report = json.load(f)
+        self.assertEqual(
+            [os.path.basename(entry["path"]) for entry in report["files"]],
+            ["a.gtirb", "b.gtirb", "bad.gtirb"],
+        )
+
+        proc = self.run_main(
+            str(self.dir / "a.gtirb"),
+            "--report",
+            "-",
+            "--report-format",
+            "ndjson",
+        )
+        self.assertEqual(proc.returncode, 1)
+        (line,) = proc.stdout.splitlines()
+        self.assertEqual(json.loads(line)["error_count"], 1)
+
+    def test_timings(self):
+        """
+        --timings prints the time of each check in single and batch mode.
+        """
+        for paths in (["a.gtirb"], ["a.gtirb", "b.gtirb"]):
+            proc = self.run_main(
+                *(str(self.dir / path) for path in paths),
+                "--check",
+                "cfg_empty",
+                "--timings",
+            )
+            self.assertEqual(proc.returncode, 0)
+            self.assertEqual(proc.stderr.count("cfg_empty: "), len(paths))
+
+    def test_no_match(self):
+        proc = self.run_main(str(self.dir / "*.missing"))
+        self.assertEqual(proc.returncode, 2)
+        self.assertIn("no files match", proc.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
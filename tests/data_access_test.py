@@ -6,29 +6,32 @@ import gtirb
 import snippets
 
 
+BATCH = snippets.SnippetBatch()
+ARM_BATCH = snippets.SnippetBatch(arch=gtirb.Module.ISA.ARM)
+
+
 class DataAccessTests(unittest.TestCase):
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_x86_simple(self):
-        module = snippets.asm_to_gtirb(
-            """
-            .access:
-            movl .data0(%rip), %eax
-            jmp .end
-            .data0:
-                .long 0
-            .end:
-            """
-        )
-
+    @BATCH.snippet(
+        """
+        .access:
+        movl .data0(%rip), %eax
+        jmp .end
+        .data0:
+            .long 0
+        .end:
+        """
+    )
+    def test_x86_simple(self, view):
         accesses = snippets.parse_souffle_output(
-            module, "arch.simple_data_load"
+            view.module, "arch.simple_data_load"
         )
         self.assertIn(
             (
-                next(module.symbols_named(".access")).referent.address,
-                next(module.symbols_named(".data0")).referent.address,
+                next(view.symbols_named(".access")).referent.address,
+                next(view.symbols_named(".data0")).referent.address,
                 4,
             ),
             accesses,
@@ -37,29 +40,29 @@ class DataAccessTests(unittest.TestCase):
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_x86_composite(self):
-        module = snippets.asm_to_gtirb(
-            """
-            .ref:
-            leaq .data0(%rip), %rax
-            .load:
-            mov (.data1 - .data0)(%rax), %eax
-            jmp .end
-            .data0:
-                .long 0
-            .data1:
-                .long 0
-            .end:
-            """
-        )
+    @BATCH.snippet(
+        """
+        .ref:
+        leaq .data0(%rip), %rax
+        .load:
+        mov (.data1 - .data0)(%rax), %eax
+        jmp .end
+        .data0:
+            .long 0
+        .data1:
+            .long 0
+        .end:
+        """
+    )
+    def test_x86_composite(self, view):
         accesses = snippets.parse_souffle_output(
-            module, "composite_data_access"
+            view.module, "composite_data_access"
         )
         self.assertIn(
             (
-                next(module.symbols_named(".ref")).referent.address,
-                next(module.symbols_named(".load")).referent.address,
-                next(module.symbols_named(".data1")).referent.address,
+                next(view.symbols_named(".ref")).referent.address,
+                next(view.symbols_named(".load")).referent.address,
+                next(view.symbols_named(".data1")).referent.address,
                 4,
             ),
             accesses,
@@ -68,25 +71,23 @@ class DataAccessTests(unittest.TestCase):
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_arm_simple(self):
-        module = snippets.asm_to_gtirb(
-            """
-            .access:
-            ldr r0, .data0
-            .data0:
-                .long 0
-            .end:
-            """,
-            arch=gtirb.Module.ISA.ARM,
-        )
-
+    @ARM_BATCH.snippet(
+        """
+        .access:
+        ldr r0, .data0
+        .data0:
+            .long 0
+        .end:
+        """
+    )
+    def test_arm_simple(self, view):
         accesses = snippets.parse_souffle_output(
-            module, "arch.simple_data_load"
+            view.module, "arch.simple_data_load"
         )
         self.assertIn(
             (
-                next(module.symbols_named(".access")).referent.address,
-                next(module.symbols_named(".data0")).referent.address,
+                next(view.symbols_named(".access")).referent.address,
+                next(view.symbols_named(".data0")).referent.address,
                 4,
             ),
             accesses,
@@ -95,30 +96,28 @@ class DataAccessTests(unittest.TestCase):
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_arm_composite_ldr(self):
-        module = snippets.asm_to_gtirb(
-            """
-            .ref:
-            adr r0, .data0
-            .load:
-            ldr r0, [r0, #.data1-.data0]
-            .data0:
-                .long 0
-            .data1:
-                .long 0
-            .end:
-            """,
-            arch=gtirb.Module.ISA.ARM,
-        )
-
+    @ARM_BATCH.snippet(
+        """
+        .ref:
+        adr r0, .data0
+        .load:
+        ldr r0, [r0, #.data1-.data0]
+        .data0:
+            .long 0
+        .data1:
+            .long 0
+        .end:
+        """
+    )
+    def test_arm_composite_ldr(self, view):
         accesses = snippets.parse_souffle_output(
-            module, "composite_data_access"
+            view.module, "composite_data_access"
         )
         self.assertIn(
             (
-                next(module.symbols_named(".ref")).referent.address,
-                next(module.symbols_named(".load")).referent.address,
-                next(module.symbols_named(".data1")).referent.address,
+                next(view.symbols_named(".ref")).referent.address,
+                next(view.symbols_named(".load")).referent.address,
+                next(view.symbols_named(".data1")).referent.address,
                 4,
             ),
             accesses,
@@ -127,30 +126,28 @@ class DataAccessTests(unittest.TestCase):
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_arm_composite_ldm(self):
-        module = snippets.asm_to_gtirb(
-            """
-            .ref:
-            adr r0, .data0
-            .load:
-            ldm r0, {r0, r1, r2}
-            .data0:
-                .long 0
-                .long 1
-                .long 2
-            .end:
-            """,
-            arch=gtirb.Module.ISA.ARM,
-        )
-
+    @ARM_BATCH.snippet(
+        """
+        .ref:
+        adr r0, .data0
+        .load:
+        ldm r0, {r0, r1, r2}
+        .data0:
+            .long 0
+            .long 1
+            .long 2
+        .end:
+        """
+    )
+    def test_arm_composite_ldm(self, view):
         accesses = snippets.parse_souffle_output(
-            module, "composite_data_access"
+            view.module, "composite_data_access"
         )
         self.assertIn(
             (
-                next(module.symbols_named(".ref")).referent.address,
-                next(module.symbols_named(".load")).referent.address,
-                next(module.symbols_named(".data0")).referent.address,
+                next(view.symbols_named(".ref")).referent.address,
+                next(view.symbols_named(".load")).referent.address,
+                next(view.symbols_named(".data0")).referent.address,
                 12,
             ),
             accesses,
@@ -159,30 +156,28 @@ class DataAccessTests(unittest.TestCase):
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_arm_composite_vld(self):
-        module = snippets.asm_to_gtirb(
-            """
-            .ref:
-            adr r0, .data0
-            .load:
-            vld1.8 {d0}, [r0]
-            b .end
-            .data0:
-                .byte 0
-            .align 2
-            .end:
-            """,
-            arch=gtirb.Module.ISA.ARM,
-        )
-
+    @ARM_BATCH.snippet(
+        """
+        .ref:
+        adr r0, .data0
+        .load:
+        vld1.8 {d0}, [r0]
+        b .end
+        .data0:
+            .byte 0
+        .align 2
+        .end:
+        """
+    )
+    def test_arm_composite_vld(self, view):
         accesses = snippets.parse_souffle_output(
-            module, "composite_data_access"
+            view.module, "composite_data_access"
         )
         self.assertIn(
             (
-                next(module.symbols_named(".ref")).referent.address,
-                next(module.symbols_named(".load")).referent.address,
-                next(module.symbols_named(".data0")).referent.address,
+                next(view.symbols_named(".ref")).referent.address,
+                next(view.symbols_named(".load")).referent.address,
+                next(view.symbols_named(".data0")).referent.address,
                 8,
             ),
             accesses,
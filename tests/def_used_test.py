@@ -45,7 +45,10 @@ class DefUsedTests(unittest.TestCase):
                     binary,
                     format="--ir",
                     strip=False,
-                    extra_args=["--with-souffle-relations"],
+                    extra_args=[
+                        "--souffle-relations-filter",
+                        "disassembly.reg_def_use.def_used",
+                    ],
                 )[0]
             )
 
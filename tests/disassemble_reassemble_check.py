@@ -1,16 +1,23 @@
 import argparse
 import contextlib
 import gtirb
+import multiprocessing
 import os
 import shlex
+import shutil
 import subprocess
+import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from timeit import default_timer as timer
-from typing import List
+from typing import List, Tuple
 
 import platform
 
 import asm_db
+import build_cache
 import check_gtirb
 
 
@@ -110,6 +117,31 @@ MAKE_CHROOT = os.getenv("E2E_MAKE_CHROOT", None)
 MAKE_CHROOT_ROOT = resolve_chroot_root(MAKE_CHROOT)
 
 
+# Directory of the cache of compiled examples, see build_cache.py. Unset to
+# always build from scratch.
+BUILD_CACHE = (
+    build_cache.BuildCache(os.environ["E2E_BUILD_CACHE"])
+    if os.getenv("E2E_BUILD_CACHE")
+    else None
+)
+
+# Number of compiler/optimization configurations of an example that are built
+# and tested concurrently. Configurations run one at a time by default.
+E2E_JOBS = int(os.getenv("E2E_JOBS", "1")) or 1
+
+# Most examples' `make check` compares their output through the fixed path
+# /tmp/res.txt, so tests of concurrent configurations must not overlap.
+# The lock is shared by the workers of one disassemble_reassemble_test()
+# call only: separate test processes running at the same time (e.g. several
+# CI jobs on one machine) can still overlap.
+_test_lock = contextlib.nullcontext()
+
+
+def _init_worker(test_lock):
+    global _test_lock
+    _test_lock = test_lock
+
+
 def build_chroot_wrapper() -> List[str]:
     """Build command for executing in the configured chroot"""
     if MAKE_CHROOT:
@@ -151,6 +183,9 @@ def compile(
     Clean the project and compile it using the compiler
     'compiler', the cxx compiler 'cxx_compiler' and the flags in
     'optimizations' and 'extra_flags'
+
+    If E2E_BUILD_CACHE is set, the artifacts of a previous build with the
+    same sources, compilers and flags are restored instead.
     """
 
     def quote_args(*args):
@@ -169,11 +204,32 @@ def compile(
     completedProcess = subprocess.run(
         make("clean"), env=env, stdout=subprocess.DEVNULL
     )
-    if completedProcess.returncode == 0:
-        completedProcess = subprocess.run(
-            make(), env=env, stdout=subprocess.DEVNULL
+    if completedProcess.returncode != 0:
+        return False
+
+    if BUILD_CACHE:
+        build_dir = Path(os.getcwd())
+        key = BUILD_CACHE.key(
+            build_dir,
+            build_chroot_wrapper(),
+            [compiler, cxx_compiler],
+            [optimizations, *extra_flags],
+            exec_wrapper,
+            arch,
         )
-    return completedProcess.returncode == 0
+        if BUILD_CACHE.restore(key, build_dir):
+            return True
+        before = build_cache.snapshot(build_dir)
+
+    completedProcess = subprocess.run(
+        make(), env=env, stdout=subprocess.DEVNULL
+    )
+    if completedProcess.returncode != 0:
+        return False
+
+    if BUILD_CACHE:
+        BUILD_CACHE.store(key, build_dir, before)
+    return True
 
 
 def disassemble(
@@ -306,9 +362,10 @@ def test(exec_wrapper=None):
     env = dict(os.environ)
     if exec_wrapper:
         env["EXEC"] = exec_wrapper
-    completedProcess = subprocess.run(
-        make("check"), env=env, stderr=subprocess.DEVNULL, timeout=60
-    )
+    with _test_lock:
+        completedProcess = subprocess.run(
+            make("check"), env=env, stderr=subprocess.DEVNULL, timeout=60
+        )
     if completedProcess.returncode != 0:
         print(bcolors.fail("# Testing FAILED\n"))
         return False
@@ -317,6 +374,175 @@ def test(exec_wrapper=None):
         return True
 
 
+@contextlib.contextmanager
+def redirect_output(path):
+    """
+    Redirect the stdout and stderr file descriptors of this process, and
+    hence of its subprocesses, to the file 'path'.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = [os.dup(1), os.dup(2)]
+    with open(path, "w") as f:
+        os.dup2(f.fileno(), 1)
+        os.dup2(f.fileno(), 2)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for fd, saved_fd in enumerate(saved_fds, 1):
+            os.dup2(saved_fd, fd)
+            os.close(saved_fd)
+
+
+def run_configuration(
+    make_dir,
+    binary,
+    compiler,
+    cxx_compiler,
+    optimization,
+    options,
+    private_copy=False,
+) -> Tuple[Counter, str]:
+    """
+    Compile, disassemble, reassemble and test one configuration of an example.
+
+    The configuration is built in 'make_dir' itself unless 'private_copy' is
+    set, in which case it is built in a private copy of 'make_dir' and its
+    output is captured rather than printed.
+
+    Return the errors by category and the captured output, if any.
+    """
+    errors = Counter()
+    if not private_copy:
+        with cd(make_dir):
+            _run_configuration(
+                make_dir,
+                binary,
+                compiler,
+                cxx_compiler,
+                optimization,
+                errors,
+                **options,
+            )
+        return errors, ""
+
+    make_dir = Path(make_dir).resolve()
+    # The copy is created next to the original so that it stays within the
+    # chroot configured with E2E_MAKE_CHROOT.
+    with tempfile.TemporaryDirectory(
+        prefix=make_dir.name + "-", dir=str(make_dir.parent)
+    ) as work_dir:
+        work_make_dir = Path(work_dir) / make_dir.name
+        shutil.copytree(str(make_dir), str(work_make_dir), symlinks=True)
+        log = Path(work_dir) / "output.log"
+        with redirect_output(log), cd(work_make_dir):
+            _run_configuration(
+                make_dir,
+                binary,
+                compiler,
+                cxx_compiler,
+                optimization,
+                errors,
+                **options,
+            )
+        output = log.read_text(errors="replace")
+    return errors, output
+
+
+def _run_configuration(
+    make_dir,
+    binary,
+    compiler,
+    cxx_compiler,
+    optimization,
+    errors,
+    extra_compile_flags,
+    extra_reassemble_flags,
+    extra_link_flags,
+    reassembly_compiler,
+    linker,
+    strip_exe,
+    strip,
+    sstrip,
+    reassemble_function,
+    skip_test,
+    exec_wrapper,
+    arch,
+    extra_ddisasm_flags,
+    cfg_checks,
+    upload,
+):
+    print(
+        bcolors.okblue(
+            "Project",
+            str(make_dir),
+            "with",
+            compiler,
+            "and",
+            optimization,
+            *extra_compile_flags,
+        )
+    )
+    if not compile(
+        compiler,
+        cxx_compiler,
+        optimization,
+        extra_compile_flags,
+        exec_wrapper,
+        arch,
+    ):
+        errors["compile"] += 1
+        return
+
+    gtirb_filename = binary + ".gtirb"
+    success, time = disassemble(
+        binary,
+        None,
+        strip_exe,
+        strip,
+        sstrip,
+        extra_args=["--ir", gtirb_filename] + extra_ddisasm_flags,
+    )
+
+    # Do some GTIRB checks
+    if success:
+        module = gtirb.IR.load_protobuf(gtirb_filename).modules[0]
+        errors["gtirb"] += check_gtirb.run_checks(module, cfg_checks or [])
+
+    if upload:
+        asm_db.upload(
+            os.path.basename(make_dir),
+            binary + ".s",
+            [compiler, cxx_compiler],
+            [optimization] + extra_compile_flags,
+            strip,
+        )
+    print("Time " + str(time))
+    if not success:
+        errors["disassembly"] += 1
+        return
+    if not reassemble_function(
+        reassembly_compiler, binary, extra_reassemble_flags
+    ):
+        errors["reassembly"] += 1
+        return
+    if linker and not link(
+        linker,
+        binary,
+        [Path(binary).with_suffix(".o").name],
+        extra_link_flags,
+    ):
+        errors["link"] += 1
+        return
+    if skip_test or reassemble_function == skip_reassemble:
+        print(bcolors.warning(" No testing"))
+        return
+    if not test(exec_wrapper):
+        errors["test"] += 1
+
+
 def disassemble_reassemble_test(
     make_dir,
     binary,
@@ -338,98 +564,73 @@ def disassemble_reassemble_test(
     extra_ddisasm_flags=[],
     cfg_checks=None,
     upload=True,
+    jobs=None,
 ):
     """
     Disassemble, reassemble and test an example with the given compilers and
     optimizations.
+
+    Configurations are built in 'make_dir' one at a time, unless 'jobs' (by
+    default E2E_JOBS) is greater than one: then up to 'jobs' configurations
+    run concurrently, each in its own copy of 'make_dir'.
     """
     assert len(c_compilers) == len(cxx_compilers)
-    compile_errors = 0
-    disassembly_errors = 0
-    reassembly_errors = 0
-    link_errors = 0
-    test_errors = 0
-    gtirb_errors = 0
-    with cd(make_dir):
-        for compiler, cxx_compiler in zip(c_compilers, cxx_compilers):
-            for optimization in optimizations:
-                print(
-                    bcolors.okblue(
-                        "Project",
-                        str(make_dir),
-                        "with",
-                        compiler,
-                        "and",
-                        optimization,
-                        *extra_compile_flags,
-                    )
-                )
-                if not compile(
-                    compiler,
-                    cxx_compiler,
-                    optimization,
-                    extra_compile_flags,
-                    exec_wrapper,
-                    arch,
-                ):
-                    compile_errors += 1
-                    continue
-
-                gtirb_filename = binary + ".gtirb"
-                success, time = disassemble(
+    options = dict(
+        extra_compile_flags=extra_compile_flags,
+        extra_reassemble_flags=extra_reassemble_flags,
+        extra_link_flags=extra_link_flags,
+        reassembly_compiler=reassembly_compiler,
+        linker=linker,
+        strip_exe=strip_exe,
+        strip=strip,
+        sstrip=sstrip,
+        reassemble_function=reassemble_function,
+        skip_test=skip_test,
+        exec_wrapper=exec_wrapper,
+        arch=arch,
+        extra_ddisasm_flags=extra_ddisasm_flags,
+        cfg_checks=cfg_checks,
+        upload=upload,
+    )
+    configurations = [
+        (compiler, cxx_compiler, optimization)
+        for compiler, cxx_compiler in zip(c_compilers, cxx_compilers)
+        for optimization in optimizations
+    ]
+    jobs = min(jobs or E2E_JOBS, len(configurations))
+
+    errors = Counter()
+    if jobs <= 1:
+        for configuration in configurations:
+            config_errors, _ = run_configuration(
+                make_dir, binary, *configuration, options
+            )
+            errors.update(config_errors)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(multiprocessing.Lock(),),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    run_configuration,
+                    make_dir,
                     binary,
-                    None,
-                    strip_exe,
-                    strip,
-                    sstrip,
-                    extra_args=["--ir", gtirb_filename] + extra_ddisasm_flags,
+                    *configuration,
+                    options,
+                    private_copy=True,
                 )
-
-                # Do some GTIRB checks
-                if success:
-                    module = gtirb.IR.load_protobuf(gtirb_filename).modules[0]
-                    gtirb_errors += check_gtirb.run_checks(
-                        module, cfg_checks or []
-                    )
-
-                if upload:
-                    asm_db.upload(
-                        os.path.basename(make_dir),
-                        binary + ".s",
-                        [compiler, cxx_compiler],
-                        [optimization] + extra_compile_flags,
-                        strip,
-                    )
-                print("Time " + str(time))
-                if not success:
-                    disassembly_errors += 1
-                    continue
-                if not reassemble_function(
-                    reassembly_compiler, binary, extra_reassemble_flags
-                ):
-                    reassembly_errors += 1
-                    continue
-                if linker and not link(
-                    linker,
-                    binary,
-                    [Path(binary).with_suffix(".o").name],
-                    extra_link_flags,
-                ):
-                    link_errors += 1
-                    continue
-                if skip_test or reassemble_function == skip_reassemble:
-                    print(bcolors.warning(" No testing"))
-                    continue
-                if not test(exec_wrapper):
-                    test_errors += 1
-    total_errors = (
-        compile_errors
-        + gtirb_errors
-        + disassembly_errors
-        + reassembly_errors
-        + link_errors
-        + test_errors
-    )
+                for configuration in configurations
+            ]
+            # Print the output of each configuration as a whole once it is
+            # done, rather than interleaving concurrent runs.
+            for future in as_completed(futures):
+                config_errors, output = future.result()
+                print(output, end="", flush=True)
+                errors.update(config_errors)
+
+    total_errors = sum(errors.values())
     return total_errors == 0
 
 
@@ -463,6 +664,11 @@ if __name__ == "__main__":
     parser.add_argument(
         "--skip_reassemble", help="skip reassemble", action="store_true"
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="number of configurations to test concurrently",
+    )
 
     args = parser.parse_args()
     disassemble_reassemble_test(
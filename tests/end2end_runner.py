@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Run the YAML end-to-end example suite as independent work items.
+
+Every (config, test, compiler, optimization) combination of the `tests/*.yaml`
+configs is a separate case. Cases can be split between machines with
+`--shard I/N` and run concurrently on each machine with `--jobs`. Results are
+written as JSON and/or JUnit XML reports; the JSON reports of several shards
+can be merged with `--merge`.
+
+Run from the repository root, like end2end_test.py.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from timeit import default_timer as timer
+from typing import Any, Dict, List, NamedTuple
+
+import yaml
+
+import disassemble_reassemble_check
+from disassemble_reassemble_check import (
+    disassemble_reassemble_test as drt,
+    redirect_output,
+)
+from end2end_test import compatible_test, example_arguments
+
+
+class Case(NamedTuple):
+    """
+    One compiler/optimization configuration of a test of a YAML config.
+    """
+
+    config_file: str
+    index: int
+    test: Dict[str, Any]
+    compiler: str
+    cxx_compiler: str
+    optimization: str
+
+    @property
+    def suite(self) -> str:
+        return Path(self.config_file).stem
+
+    @property
+    def name(self) -> str:
+        return "{:03d}-{} [{} {}]".format(
+            self.index, self.test["name"], self.compiler, self.optimization
+        )
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def expand_cases(config_files: List[str]) -> List[Case]:
+    """
+    Expand the tests of the configs that are compatible with this host into
+    cases, in a deterministic order.
+    """
+    cases = []
+    for config_file in config_files:
+        config = load_config(config_file)
+        for index, test in enumerate(config["tests"]):
+            if not compatible_test(config, test):
+                continue
+            build = test["build"]
+            for compiler, cxx_compiler in zip(build["c"], build["cpp"]):
+                for optimization in build["optimizations"]:
+                    cases.append(
+                        Case(
+                            config_file,
+                            index,
+                            test,
+                            compiler,
+                            cxx_compiler,
+                            optimization,
+                        )
+                    )
+    return cases
+
+
+def parse_shard(text: str):
+    """
+    Parse a 1-based "I/N" shard specification.
+    """
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected I/N, e.g. 1/4")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError("expected 1 <= I <= N")
+    return index, count
+
+
+def run_case(case: Case) -> Dict[str, Any]:
+    """
+    Run a single case and return its report entry.
+    """
+    path, binary, args = example_arguments(case.test)
+    args.update(
+        c_compilers=[case.compiler],
+        cxx_compilers=[case.cxx_compiler],
+        optimizations=[case.optimization],
+        jobs=1,
+    )
+    start = timer()
+    with tempfile.TemporaryDirectory() as log_dir:
+        log = Path(log_dir) / "output.log"
+        try:
+            with redirect_output(log):
+                status = "passed" if drt(path, binary, **args) else "failed"
+        except Exception as e:
+            status = "error"
+            with open(log, "a") as f:
+                f.write("{}: {}\n".format(type(e).__name__, e))
+        output = log.read_text(errors="replace")
+    return {
+        "suite": case.suite,
+        "name": case.name,
+        "config": case.config_file,
+        "test": case.test["name"],
+        "compiler": case.compiler,
+        "cxx_compiler": case.cxx_compiler,
+        "optimization": case.optimization,
+        "flags": case.test["build"]["flags"],
+        "status": status,
+        "time": timer() - start,
+        "output": output,
+    }
+
+
+def run_cases(cases: List[Case], jobs: int) -> List[Dict[str, Any]]:
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=disassemble_reassemble_check._init_worker,
+        initargs=(multiprocessing.Lock(),),
+    ) as executor:
+        futures = [executor.submit(run_case, case) for case in cases]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            print(
+                "[{}/{}] {} {}/{}".format(
+                    done,
+                    len(cases),
+                    result["status"].upper(),
+                    result["suite"],
+                    result["name"],
+                ),
+                flush=True,
+            )
+            if result["status"] != "passed":
+                print(result["output"], end="", flush=True)
+            results.append(result)
+    return sorted(
+        results, key=lambda result: (result["suite"], result["name"])
+    )
+
+
+# Characters that are not allowed in XML 1.0, such as the terminal color
+# escapes in the test output.
+_XML_INVALID_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def write_junit(results: List[Dict[str, Any]], path: str) -> None:
+    suites = ET.Element("testsuites")
+    for suite_name in sorted({result["suite"] for result in results}):
+        suite_results = [r for r in results if r["suite"] == suite_name]
+        suite = ET.SubElement(
+            suites,
+            "testsuite",
+            name=suite_name,
+            tests=str(len(suite_results)),
+            failures=str(sum(r["status"] == "failed" for r in suite_results)),
+            errors=str(sum(r["status"] == "error" for r in suite_results)),
+            time="{:.3f}".format(sum(r["time"] for r in suite_results)),
+        )
+        for result in suite_results:
+            case = ET.SubElement(
+                suite,
+                "testcase",
+                classname=suite_name,
+                name=result["name"],
+                time="{:.3f}".format(result["time"]),
+            )
+            if result["status"] != "passed":
+                tag = "failure" if result["status"] == "failed" else "error"
+                ET.SubElement(case, tag, message=result["status"])
+            ET.SubElement(case, "system-out").text = _XML_INVALID_CHARS.sub(
+                "", result["output"]
+            )
+    ET.ElementTree(suites).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def write_reports(results: List[Dict[str, Any]], args) -> None:
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"cases": results}, f, indent=1)
+    if args.junit:
+        write_junit(results, args.junit)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Run the YAML end-to-end tests as independent cases"
+    )
+    parser.add_argument(
+        "configs",
+        nargs="*",
+        help="YAML configs to run (default: tests/*.yaml)",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=(1, 1),
+        metavar="I/N",
+        help="only run the I-th of N interleaved slices of the cases",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of cases to run concurrently",
+    )
+    parser.add_argument("--json", help="write a JSON report to this file")
+    parser.add_argument("--junit", help="write a JUnit report to this file")
+    parser.add_argument(
+        "--merge",
+        nargs="+",
+        metavar="REPORT",
+        help="merge these JSON reports instead of running any cases",
+    )
+    args = parser.parse_args()
+
+    if args.merge:
+        results = []
+        for report in args.merge:
+            with open(report) as f:
+                results.extend(json.load(f)["cases"])
+        results.sort(key=lambda result: (result["suite"], result["name"]))
+    else:
+        config_files = args.configs or sorted(
+            str(path) for path in Path("tests").glob("*.yaml")
+        )
+        shard_index, shard_count = args.shard
+        cases = expand_cases(config_files)[shard_index - 1 :: shard_count]
+
+        # Run the setup and teardown commands of the configs in this shard.
+        shard_configs = sorted({case.config_file for case in cases})
+        for config_file in shard_configs:
+            config = load_config(config_file)
+            if "setup" in config:
+                subprocess.run(config["setup"])
+        try:
+            results = run_cases(cases, args.jobs) if cases else []
+        finally:
+            for config_file in shard_configs:
+                config = load_config(config_file)
+                if "teardown" in config:
+                    subprocess.run(config["teardown"])
+
+    write_reports(results, args)
+    failed = [r for r in results if r["status"] != "passed"]
+    print(
+        "{} cases, {} passed, {} failed".format(
+            len(results), len(results) - len(failed), len(failed)
+        )
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
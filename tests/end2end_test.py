@@ -37,6 +37,36 @@ def compatible_test(config, test):
     return True
 
 
+def example_arguments(config):
+    """
+    Get the example directory, the binary and the keyword arguments of
+    disassemble_reassemble_test for the test case 'config'.
+    """
+    path = Path(config["path"]) / config["name"]
+    binary = config.get("binary", config["name"])
+    args = {
+        "extra_compile_flags": config["build"]["flags"],
+        "extra_reassemble_flags": config["reassemble"]["flags"],
+        "extra_link_flags": config.get("link", {}).get("flags", []),
+        "linker": config.get("link", {}).get("linker"),
+        "reassembly_compiler": config["reassemble"]["compiler"],
+        "c_compilers": config["build"]["c"],
+        "cxx_compilers": config["build"]["cpp"],
+        "optimizations": config["build"]["optimizations"],
+        "strip_exe": config["test"].get("strip_exe", "strip-dummy"),
+        "strip": config["test"].get("strip", False),
+        "sstrip": config["test"].get("sstrip", False),
+        "skip_test": config["test"].get("skip", False),
+        "cfg_checks": config["test"].get("cfg_checks"),
+        "exec_wrapper": config["test"].get("wrapper"),
+        "arch": config.get("arch"),
+        "extra_ddisasm_flags": config.get("disassemble", {}).get("flags", []),
+    }
+    if config["reassemble"].get("skip", False):
+        args["reassemble_function"] = skip_reassemble
+    return path, binary, args
+
+
 class TestExamples(unittest.TestCase):
     def setUp(self):
         self.configs = Path("./tests/").glob("*.yaml")
@@ -79,30 +109,7 @@ class TestExamples(unittest.TestCase):
                 subprocess.run(config["teardown"])
 
     def disassemble_example(self, config):
-        path = Path(config["path"]) / config["name"]
-        binary = config.get("binary", config["name"])
-        args = {
-            "extra_compile_flags": config["build"]["flags"],
-            "extra_reassemble_flags": config["reassemble"]["flags"],
-            "extra_link_flags": config.get("link", {}).get("flags", []),
-            "linker": config.get("link", {}).get("linker"),
-            "reassembly_compiler": config["reassemble"]["compiler"],
-            "c_compilers": config["build"]["c"],
-            "cxx_compilers": config["build"]["cpp"],
-            "optimizations": config["build"]["optimizations"],
-            "strip_exe": config["test"].get("strip_exe", "strip-dummy"),
-            "strip": config["test"].get("strip", False),
-            "sstrip": config["test"].get("sstrip", False),
-            "skip_test": config["test"].get("skip", False),
-            "cfg_checks": config["test"].get("cfg_checks"),
-            "exec_wrapper": config["test"].get("wrapper"),
-            "arch": config.get("arch"),
-            "extra_ddisasm_flags": config.get("disassemble", {}).get(
-                "flags", []
-            ),
-        }
-        if config["reassemble"].get("skip", False):
-            args["reassemble_function"] = skip_reassemble
+        path, binary, args = example_arguments(config)
         self.assertTrue(drt(path, binary, **args))
 
 
@@ -1,5 +1,6 @@
 import os
 import platform
+import shutil
 import subprocess
 import tempfile
 import unittest
@@ -104,6 +105,75 @@ class ExtraArgsTest(unittest.TestCase):
                 self.assertNotIn("bad-hint", invalid_text)
                 self.assertNotIn("0x100000", invalid_text)
 
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_cache_dir(self):
+        """
+        Test `--cache-dir': the second disassembly of the same binary with the
+        same options is served from the cache and yields the same GTIRB.
+        """
+        with tempfile.TemporaryDirectory() as cache_dir, cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+
+            cmd = ["ddisasm", "ex", "--cache-dir", cache_dir, "--ir"]
+            first = subprocess.run(
+                cmd + ["first.gtirb"], capture_output=True, check=True
+            )
+            self.assertIn(b"Building the initial gtirb", first.stderr)
+            self.assertEqual(len(list(Path(cache_dir).glob("*.gtirb"))), 1)
+
+            second = subprocess.run(
+                cmd + ["second.gtirb"], capture_output=True, check=True
+            )
+            self.assertIn(b"Loading the cached gtirb", second.stderr)
+
+            first_ir = gtirb.IR.load_protobuf("first.gtirb")
+            second_ir = gtirb.IR.load_protobuf("second.gtirb")
+            self.assertEqual(
+                sorted(sym.name for sym in first_ir.modules[0].symbols),
+                sorted(sym.name for sym in second_ir.modules[0].symbols),
+            )
+
+            # Options that change the analysis miss the cache.
+            third = subprocess.run(
+                cmd + ["third.gtirb", "--skip-function-analysis"],
+                capture_output=True,
+                check=True,
+            )
+            self.assertIn(b"Building the initial gtirb", third.stderr)
+            self.assertEqual(len(list(Path(cache_dir).glob("*.gtirb"))), 2)
+
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_cache_dir_renamed_input(self):
+        """
+        Test `--cache-dir' with a copy of a cached binary under another name:
+        the hit is named after the copy, not after the original binary.
+        """
+        with tempfile.TemporaryDirectory() as cache_dir, cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+            shutil.copy("ex", "ex_copy")
+
+            for binary in ("ex", "ex_copy"):
+                subprocess.run(
+                    [
+                        "ddisasm",
+                        binary,
+                        "--cache-dir",
+                        cache_dir,
+                        "--ir",
+                        binary + ".gtirb",
+                    ],
+                    check=True,
+                )
+            self.assertEqual(len(list(Path(cache_dir).glob("*.gtirb"))), 1)
+
+            module = gtirb.IR.load_protobuf("ex_copy.gtirb").modules[0]
+            self.assertEqual(module.name, "ex_copy")
+            self.assertEqual(module.binary_path, "ex_copy")
+
     @unittest.skipUnless(
         os.path.exists("./build/lib/libfunctors.so")
         and platform.system() == "Linux",
@@ -1,5 +1,7 @@
+import fnmatch
 import os
 import platform
+import tempfile
 import unittest
 import re
 import subprocess
@@ -352,6 +354,60 @@ class AuxDataTests(unittest.TestCase):
             # compare the relations directories
             subprocess.check_call(["diff", "dbg", "aux"])
 
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_souffle_relations_filter(self):
+        """Test that relation filters select the same relations."""
+
+        patterns = (
+            "disassembly.stack_def_use.*,*.block_*,no-return-analysis.cfg_*"
+        )
+        with cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+
+            with tempfile.TemporaryDirectory() as debug_dir:
+                self.assertTrue(
+                    disassemble(
+                        "ex",
+                        format="--ir",
+                        extra_args=[
+                            "--souffle-relations-filter",
+                            patterns,
+                            "--debug-dir",
+                            debug_dir,
+                            "--debug-dir-filter",
+                            patterns,
+                        ],
+                    )[0]
+                )
+                dumped = sorted(
+                    "{}.{}".format(path.parent.name, path.stem)
+                    for path in Path(debug_dir).glob("*/*")
+                    if path.suffix in (".facts", ".csv")
+                )
+
+            m = gtirb.IR.load_protobuf("ex.gtirb").modules[0]
+            packaged = sorted(
+                name
+                for table in ("souffleFacts", "souffleOutputs")
+                for name in m.aux_data[table].data
+            )
+
+            self.assertIn("disassembly.stack_def_use.def_used", packaged)
+            self.assertIn("disassembly.block_points", packaged)
+            self.assertIn("no-return-analysis.cfg_edge", packaged)
+            for name in packaged:
+                self.assertTrue(
+                    any(
+                        fnmatch.fnmatchcase(name, pattern)
+                        for pattern in patterns.split(",")
+                    ),
+                    name,
+                )
+            # Nullary relations are not packaged.
+            self.assertLessEqual(set(packaged), set(dumped))
+
     def assert_regex_match(self, text, pattern):
         """
         Like unittest's assertRegex, but also return the match object on
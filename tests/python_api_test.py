@@ -0,0 +1,429 @@
+import asyncio
+import contextlib
+import io
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import unittest.mock
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from disassemble_reassemble_check import cd, compile
+
+try:
+    import ddisasm
+    import ddisasm.aio
+    import ddisasm.cache
+    import ddisasm.client
+    import ddisasm.stats
+    import gtirb
+except ImportError:
+    ddisasm = None
+
+ex_dir = Path("./examples/")
+
+
+@unittest.skipIf(ddisasm is None, "ddisasm package not installed")
+@unittest.skipUnless(platform.system() == "Linux", "This test is linux only.")
+class DisassembleTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def fake_ddisasm(self, body):
+        """
+        Make disassemble() run a Python script with the given body instead
+        of ddisasm.
+        """
+        tool_path = Path(self.tmp.name) / "ddisasm"
+        tool_path.write_text(f"#!{sys.executable}\n{body}")
+        tool_path.chmod(0o755)
+
+        @contextlib.contextmanager
+        def fake_path():
+            yield tool_path
+
+        patcher = unittest.mock.patch.object(
+            ddisasm, "ddisasm_path", fake_path
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_stream(self):
+        """
+        The IR is decoded from stdout and stderr is forwarded.
+        """
+        ir = gtirb.IR()
+        gtirb.Module(name="ex", isa=gtirb.Module.ISA.X64, ir=ir)
+        ir_path = Path(self.tmp.name) / "ex.gtirb"
+        ir.save_protobuf(str(ir_path))
+        self.fake_ddisasm(
+            "import sys\n"
+            "sys.stderr.write('Building the initial gtirb\\n')\n"
+            f"sys.stdout.buffer.write(open({str(ir_path)!r}, 'rb').read())\n"
+        )
+
+        stderr = io.StringIO()
+        with unittest.mock.patch.object(sys, "stderr", stderr):
+            result = ddisasm.disassemble("ex")
+
+        self.assertEqual(result.modules[0].name, "ex")
+        self.assertIn("Building the initial gtirb", stderr.getvalue())
+
+    def test_error(self):
+        """
+        A non-zero exit raises CalledProcessError carrying ddisasm's stderr.
+        """
+        self.fake_ddisasm(
+            "import sys\nsys.stderr.write('Error: boom\\n')\nsys.exit(3)\n"
+        )
+
+        with unittest.mock.patch.object(sys, "stderr", io.StringIO()):
+            with self.assertRaises(subprocess.CalledProcessError) as context:
+                ddisasm.disassemble("ex")
+
+        self.assertEqual(context.exception.returncode, 3)
+        self.assertIn(b"Error: boom", context.exception.stderr)
+
+    def test_timeout(self):
+        """
+        A run that outlives its timeout is killed and raises TimeoutExpired.
+        """
+        pid_path = Path(self.tmp.name) / "pid"
+        self.fake_ddisasm(
+            "import os, time\n"
+            f"open({str(pid_path)!r}, 'w').write(str(os.getpid()))\n"
+            "time.sleep(60)\n"
+        )
+
+        start = time.monotonic()
+        with self.assertRaises(subprocess.TimeoutExpired):
+            ddisasm.disassemble("ex", timeout=1)
+        self.assertLess(time.monotonic() - start, 30)
+
+        with self.assertRaises(ProcessLookupError):
+            os.kill(int(pid_path.read_text()), 0)
+
+
+@unittest.skipIf(ddisasm is None, "ddisasm package not installed")
+class DisassembleManyTests(unittest.TestCase):
+    def test_largest_first(self):
+        """
+        Inputs are started largest first and threads_per_job is passed on.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for name, size in (("small", 1), ("large", 100), ("medium", 10)):
+                path = Path(tmp) / name
+                path.write_bytes(b"\0" * size)
+                paths.append(path)
+
+            with unittest.mock.patch.object(
+                ddisasm, "disassemble", return_value=None
+            ) as disassemble:
+                results = list(
+                    ddisasm.disassemble_many(
+                        paths, workers=1, threads_per_job=2
+                    )
+                )
+
+        self.assertEqual(
+            [call.args[0].name for call in disassemble.call_args_list],
+            ["large", "medium", "small"],
+        )
+        for call in disassemble.call_args_list:
+            self.assertEqual(call.kwargs["threads"], 2)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result.error is None for result in results))
+
+    def test_errors_are_reported(self):
+        """
+        Any exception raised for one input is recorded in its result without
+        stopping the batch.
+        """
+
+        def disassemble(path, **options):
+            if path == "bad":
+                raise ValueError("malformed GTIRB")
+            return path
+
+        with unittest.mock.patch.object(
+            ddisasm, "disassemble", side_effect=disassemble
+        ):
+            results = {
+                result.path: result
+                for result in ddisasm.disassemble_many(
+                    ["good", "bad"], workers=2
+                )
+            }
+
+        self.assertEqual(results["good"].ir, "good")
+        self.assertIsNone(results["good"].error)
+        self.assertIsNone(results["bad"].ir)
+        self.assertIsInstance(results["bad"].error, ValueError)
+
+    def test_missing_input(self):
+        """
+        A real ddisasm failure is reported as a CalledProcessError.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            missing = Path(tmp) / "missing"
+            (result,) = ddisasm.disassemble_many([missing], workers=1)
+
+        self.assertEqual(result.path, missing)
+        self.assertIsNone(result.ir)
+        self.assertIsInstance(result.error, subprocess.CalledProcessError)
+
+
+@unittest.skipIf(ddisasm is None, "ddisasm package not installed")
+class AioTests(unittest.TestCase):
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_disassemble(self):
+        """
+        Concurrent runs sharing a semaphore complete and decode their IR.
+        """
+        with cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+
+            async def run():
+                semaphore = asyncio.Semaphore(1)
+                return await asyncio.gather(
+                    ddisasm.aio.disassemble("ex", semaphore=semaphore),
+                    ddisasm.aio.disassemble("ex", semaphore=semaphore),
+                )
+
+            irs = asyncio.run(run())
+
+        for ir in irs:
+            self.assertEqual(len(ir.modules), 1)
+            self.assertEqual(ir.modules[0].name, "ex")
+
+    def test_error(self):
+        """
+        A failing ddisasm run raises CalledProcessError.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            missing = Path(tmp) / "missing"
+            with self.assertRaises(subprocess.CalledProcessError):
+                asyncio.run(ddisasm.aio.disassemble(missing))
+
+
+@unittest.skipIf(ddisasm is None, "ddisasm package not installed")
+class CacheTests(unittest.TestCase):
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_key_matches_ddisasm(self):
+        """
+        The keys computed by DisassemblyCache name the entries that ddisasm
+        stores with `--cache-dir'.
+        """
+        with tempfile.TemporaryDirectory() as cache_dir, cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+            with open("hints.txt", "w") as hints:
+                print("disassembly.invalid\t0x100000", file=hints)
+
+            cache = ddisasm.cache.DisassemblyCache(cache_dir)
+            for options in (
+                {},
+                {"skip_function_analysis": True},
+                {"hints": "hints.txt"},
+                {"souffle_relations_filter": ["disassembly.*"]},
+            ):
+                with self.subTest(options=options):
+                    cache.disassemble("ex", **options)
+                    entry = Path(cache_dir) / (
+                        cache.key("ex", **options) + ".gtirb"
+                    )
+                    self.assertTrue(entry.exists())
+
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_renamed_input(self):
+        """
+        A hit for a copy of a cached binary is named after the copy.
+        """
+        with tempfile.TemporaryDirectory() as cache_dir, cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+            shutil.copy("ex", "ex_copy")
+
+            cache = ddisasm.cache.DisassemblyCache(cache_dir)
+            cache.disassemble("ex")
+            ir = cache.get("ex_copy")
+
+        self.assertIsNotNone(ir)
+        self.assertEqual(ir.modules[0].name, "ex_copy")
+        self.assertEqual(ir.modules[0].binary_path, "ex_copy")
+
+    def test_unreadable_file(self):
+        """
+        Unreadable files are keyed as "-", as in ddisasm.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            missing = os.path.join(tmp, "missing")
+            self.assertEqual(ddisasm.cache._sha256_file(missing), "-")
+
+            cache = ddisasm.cache.DisassemblyCache(tmp)
+            with unittest.mock.patch.object(
+                ddisasm.cache, "_ddisasm_version", return_value="1.0"
+            ):
+                self.assertEqual(
+                    cache.key(missing, hints=missing),
+                    cache.key(missing, hints=os.path.join(tmp, "other")),
+                )
+
+
+@unittest.skipIf(ddisasm is None, "ddisasm package not installed")
+@unittest.skipUnless(platform.system() == "Linux", "This test is linux only.")
+class ClientTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp.name, "ddisasm.sock")
+        with ddisasm.ddisasm_path() as tool_path:
+            self.server = subprocess.Popen(
+                [str(tool_path), "--serve", self.socket_path]
+            )
+        while not os.path.exists(self.socket_path):
+            self.assertIsNone(self.server.poll(), "the server exited")
+            time.sleep(0.01)
+        self.client = ddisasm.client.Client(self.socket_path)
+
+    def tearDown(self):
+        self.server.terminate()
+        self.server.wait()
+        self.tmp.cleanup()
+
+    def test_run(self):
+        """
+        The job writes to the given stdout and reports its exit status.
+        """
+        read_fd, write_fd = os.pipe()
+        status = self.client.run(["--version"], stdout=write_fd)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as output:
+            version = output.read()
+        self.assertEqual(status, 0)
+        with ddisasm.ddisasm_path() as tool_path:
+            expected = subprocess.run(
+                [str(tool_path), "--version"],
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+            ).stdout
+        self.assertEqual(version, expected)
+
+        self.assertNotEqual(self.client.run(["missing"]), 0)
+
+    def test_disassemble(self):
+        """
+        Concurrent jobs, including one from a client that never sends its
+        job, do not hold each other up.
+        """
+        with cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as idle:
+                idle.connect(self.socket_path)
+                with ThreadPoolExecutor(2) as executor:
+                    irs = list(
+                        executor.map(self.client.disassemble, ["ex", "ex"])
+                    )
+
+            with self.assertRaises(subprocess.CalledProcessError):
+                self.client.disassemble("missing")
+
+        for ir in irs:
+            self.assertEqual(ir.modules[0].name, "ex")
+
+
+@unittest.skipIf(ddisasm is None, "ddisasm package not installed")
+class MainTests(unittest.TestCase):
+    def test_version(self):
+        """
+        `python -m ddisasm' runs the packaged executable with the same
+        arguments and exit status.
+        """
+        with ddisasm.ddisasm_path() as tool_path:
+            expected = subprocess.run(
+                [str(tool_path), "--version"],
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+                check=True,
+            ).stdout
+        # Resolving the executable again returns the same cached path.
+        with ddisasm.ddisasm_path() as tool_path_again:
+            self.assertEqual(tool_path, tool_path_again)
+
+        proc = subprocess.run(
+            [sys.executable, "-m", "ddisasm", "--version"],
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        self.assertEqual(proc.returncode, 0)
+        self.assertEqual(proc.stdout, expected)
+
+        proc = subprocess.run(
+            [sys.executable, "-m", "ddisasm", "--not-an-option"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self.assertNotEqual(proc.returncode, 0)
+
+
+@unittest.skipIf(ddisasm is None, "ddisasm package not installed")
+class StatsTests(unittest.TestCase):
+    def test_read_events(self):
+        """
+        Each non-empty line is one event.
+        """
+        stream = io.StringIO('{"event": "pass"}\n\n{"event": "phase"}\n')
+        self.assertEqual(
+            list(ddisasm.stats.read_events(stream)),
+            [{"event": "pass"}, {"event": "phase"}],
+        )
+
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_run(self):
+        """
+        Events are read through a pipe where /dev/fd is available and through
+        a temporary file otherwise.
+        """
+        with cd(ex_dir / "ex1"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+
+            for has_dev_fd in (True, False):
+                with self.subTest(has_dev_fd=has_dev_fd):
+                    with unittest.mock.patch.object(
+                        ddisasm.stats, "_has_dev_fd", return_value=has_dev_fd
+                    ):
+                        events = list(ddisasm.stats.run("ex"))
+
+                    passes = [
+                        event["pass"]
+                        for event in events
+                        if event["event"] == "pass"
+                    ]
+                    self.assertIn("disassembly", passes)
+                    for event in events:
+                        self.assertEqual(event["module"], "ex")
+                        self.assertGreaterEqual(event["wall_time"], 0)
+
+                    with unittest.mock.patch.object(
+                        ddisasm.stats, "_has_dev_fd", return_value=has_dev_fd
+                    ):
+                        with self.assertRaises(subprocess.CalledProcessError):
+                            list(ddisasm.stats.run("missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import base64
+import struct
+import unittest
+import zlib
+
+try:
+    from ddisasm.relations import Relation
+except ImportError:
+    Relation = None
+
+TYPES = (
+    "<EA:u:address,N:i:number,U:u:unsigned,F:f:float,S:s:symbol,V:r:stack_var>"
+)
+
+CSV = (
+    "0\t-1\t0\t0.5\tmain\t[RSP, -8]\n"
+    "0x10\t2\t18446744073709551615\t-1.25\t\t[SP, 16]\n"
+    "0x20\t0\t3\t1e+100\tmain\t[RSP, -8]\n"
+)
+
+TUPLES = [
+    (0x0, -1, 0, 0.5, "main", ("RSP", -8)),
+    (0x10, 2, 2**64 - 1, -1.25, "", ("SP", 16)),
+    (0x20, 0, 3, 1e100, "main", ("RSP", -8)),
+]
+
+
+def columnar(tuples, compress=False):
+    """
+    Encode tuples in the columnar encoding of
+    src/gtirb-decoder/ColumnarRelation.h, with the attributes of TYPES.
+    """
+    payload = struct.pack("<Q", len(tuples))
+    columns = list(zip(*tuples)) or [()] * 6
+    payload += struct.pack("<{}Q".format(len(tuples)), *columns[0])
+    payload += struct.pack("<{}q".format(len(tuples)), *columns[1])
+    payload += struct.pack("<{}Q".format(len(tuples)), *columns[2])
+    payload += struct.pack("<{}d".format(len(tuples)), *columns[3])
+    texts = [
+        columns[4],
+        ["[{}, {}]".format(*value) for value in columns[5]],
+    ]
+    for column in texts:
+        values = sorted(set(column))
+        payload += struct.pack("<I", len(values))
+        for value in values:
+            encoded = value.encode()
+            payload += struct.pack("<I", len(encoded)) + encoded
+        payload += struct.pack(
+            "<{}I".format(len(column)), *map(values.index, column)
+        )
+
+    if compress:
+        type_spec = "columnar/1/zlib;" + TYPES.strip("<>")
+        frame = struct.pack("<Q", len(payload)) + zlib.compress(payload)
+    else:
+        type_spec = "columnar/1/none;" + TYPES.strip("<>")
+        frame = payload
+    return type_spec, base64.b64encode(frame).decode()
+
+
+@unittest.skipIf(Relation is None, "ddisasm package not installed")
+class RelationTests(unittest.TestCase):
+    def relations(self, tuples, csv):
+        """
+        Get the relation of `tuples` in each encoding.
+        """
+        yield "csv", Relation("test.relation", TYPES, csv)
+        for compress in (False, True):
+            type_spec, data = columnar(tuples, compress)
+            yield type_spec, Relation("test.relation", type_spec, data)
+
+    def test_tuples(self):
+        for encoding, relation in self.relations(TUPLES, CSV):
+            with self.subTest(encoding=encoding):
+                self.assertEqual(len(relation), 3)
+                self.assertEqual(
+                    relation.attributes, ["EA", "N", "U", "F", "S", "V"]
+                )
+                self.assertEqual(list(relation), TUPLES)
+                self.assertEqual([relation.row(i) for i in range(3)], TUPLES)
+                self.assertEqual(list(relation.column("EA")), [0, 16, 32])
+                self.assertEqual(
+                    list(relation.column(4)), ["main", "", "main"]
+                )
+
+    def test_python_values(self):
+        """
+        Iteration, row() and lookup() all hand out plain Python values.
+        """
+        for encoding, relation in self.relations(TUPLES, CSV):
+            with self.subTest(encoding=encoding):
+                for values in (
+                    next(iter(relation)),
+                    relation.row(0),
+                    relation.lookup("EA", 0)[0],
+                ):
+                    self.assertEqual(
+                        [type(value) for value in values],
+                        [int, int, int, float, str, tuple],
+                    )
+
+    def test_lookup(self):
+        for encoding, relation in self.relations(TUPLES, CSV):
+            with self.subTest(encoding=encoding):
+                self.assertEqual(
+                    relation.lookup("S", "main"), [TUPLES[0], TUPLES[2]]
+                )
+                self.assertEqual(relation.lookup("V", ("SP", 16)), [TUPLES[1]])
+                self.assertEqual(relation.lookup("N", 2), [TUPLES[1]])
+                self.assertEqual(relation.lookup("EA", 0x30), [])
+
+    def test_empty(self):
+        for encoding, relation in self.relations([], ""):
+            with self.subTest(encoding=encoding):
+                self.assertEqual(len(relation), 0)
+                self.assertEqual(list(relation), [])
+                self.assertEqual(len(relation.columns), 6)
+                self.assertEqual(relation.lookup("S", "main"), [])
+
+    def test_symbols(self):
+        """
+        Symbols are split on newlines only and may be empty.
+        """
+        relation = Relation(
+            "test.relation", "<S:s:symbol>", "a\x0bb\x0c \n\nc\n"
+        )
+        self.assertEqual(list(relation), [("a\x0bb\x0c ",), ("",), ("c",)])
+
+    def test_arity_mismatch(self):
+        with self.assertRaises(ValueError):
+            Relation("test.relation", "<A:i:number,B:i:number>", "1\t2\n3\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
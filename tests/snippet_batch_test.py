@@ -0,0 +1,90 @@
+import platform
+import unittest
+
+import snippets
+
+# Snippets of data_access_test.py and stack_var_test.py, which exercise
+# labels, data within code and stack variables.
+SNIPPETS = (
+    """
+    .access:
+    movl .data0(%rip), %eax
+    jmp .end
+    .data0:
+        .long 0
+    .end:
+    """,
+    """
+    .ref:
+    leaq .data0(%rip), %rax
+    .load:
+    mov (.data1 - .data0)(%rax), %eax
+    jmp .end
+    .data0:
+        .long 0
+    .data1:
+        .long 0
+    .end:
+    """,
+    """
+    mov %rsp, %rbp
+    mov %rax, -8(%rbp)
+    mov -8(%rbp), %rcx
+    """,
+)
+
+RELATIONS = (
+    "arch.simple_data_load",
+    "composite_data_access",
+    "stack_def_use.def_used",
+)
+
+
+def relative_tuples(module, relation, bounds):
+    """
+    Get the tuples of a relation within `bounds`, with the addresses in
+    their first attribute made relative to the start of the snippet.
+    """
+    start, end = bounds
+    tuples = set()
+    for fields in snippets.parse_souffle_output(module, relation):
+        if isinstance(fields[0], int) and start <= fields[0] < end:
+            tuples.add(
+                tuple(
+                    field - start
+                    if isinstance(field, int) and start <= field < end
+                    else field
+                    for field in fields
+                )
+            )
+    return tuples
+
+
+class SnippetBatchTests(unittest.TestCase):
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_same_results(self):
+        """
+        A batch finds the same relation tuples in each snippet as a separate
+        ddisasm run on that snippet.
+        """
+        batch = snippets.SnippetBatch(cache_dir=None)
+        for snippet in SNIPPETS:
+            batch.add(snippet)
+
+        for snippet in SNIPPETS:
+            with self.subTest(snippet=snippet):
+                module = snippets.asm_to_gtirb(snippet)
+                bounds = snippets.snippet_bounds(module)
+                view = batch.view(snippet)
+                for relation in RELATIONS:
+                    self.assertEqual(
+                        relative_tuples(view.module, relation, view.bounds),
+                        relative_tuples(module, relation, bounds),
+                        relation,
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,11 @@
 import contextlib
+import functools
+import hashlib
+import io
 from pathlib import Path
 import os
+import re
+import shutil
 import subprocess
 import tempfile
 import typing
@@ -14,6 +19,18 @@ class SnippetTestException(Exception):
     """
 
 
+def arch_toolchain(arch: gtirb.Module.ISA) -> typing.Tuple[str, str, str, str]:
+    """
+    Get the compiler, return instruction, call instruction and symbol type
+    prefix used to build snippets for an architecture
+    """
+    if arch == gtirb.Module.ISA.ARM:
+        return "arm-linux-gnueabihf-gcc", "bx lr", "bl", "%"
+    elif arch == gtirb.Module.ISA.X64:
+        return "gcc", "retq", "callq", "@"
+    raise SnippetTestException(f"Unimplemented snippet arch: {arch}")
+
+
 @contextlib.contextmanager
 def assemble_snippet(
     snippet: str, arch=gtirb.Module.ISA
@@ -25,16 +42,7 @@ def assemble_snippet(
     `main_end` is placed at the end of the snippet.
     """
     with tempfile.TemporaryDirectory() as tmpdir:
-        if arch == gtirb.Module.ISA.ARM:
-            compiler = "arm-linux-gnueabihf-gcc"
-            ret = "bx lr"
-            type_prefix = "%"
-        elif arch == gtirb.Module.ISA.X64:
-            compiler = "gcc"
-            ret = "retq"
-            type_prefix = "@"
-        else:
-            raise SnippetTestException(f"Unimplemented snippet arch: {arch}")
+        compiler, ret, _, type_prefix = arch_toolchain(arch)
 
         src_path = os.path.join(tmpdir, "test.s")
         with open(src_path, "w") as f:
@@ -57,26 +65,49 @@ def assemble_snippet(
         yield binary_path
 
 
-def disassemble_to_gtirb(target: str) -> gtirb.Module:
+# Relations that snippet tests read with parse_souffle_output; only these are
+# packaged into the souffleOutputs auxdata.
+SNIPPET_RELATIONS = (
+    "disassembly.stack_def_use.def_used",
+    "disassembly.arch.simple_data_load",
+    "disassembly.composite_data_access",
+)
+
+
+def ddisasm_command(
+    target: str, output: str, relations: typing.Sequence[str]
+) -> typing.List[str]:
+    """
+    Build the ddisasm command used to disassemble snippet binaries
+    """
+    return [
+        "ddisasm",
+        target,
+        "--ir",
+        output,
+        "-j",
+        "1",
+        "--souffle-relations-filter",
+        ",".join(relations),
+    ]
+
+
+def disassemble_to_gtirb(
+    target: str, relations: typing.Sequence[str] = SNIPPET_RELATIONS
+) -> gtirb.Module:
     """
     Disassemble a binary and return the loaded GTIRB module
+
+    Only the relations matching the `relations` glob patterns are packaged
+    into auxdata.
     """
-    with tempfile.TemporaryDirectory() as tmpdir:
-        gtirb_path = os.path.join(tmpdir, "tmp.gtirb")
-        cmd = [
-            "ddisasm",
-            target,
-            "--ir",
-            gtirb_path,
-            "-j",
-            "1",
-            # Needed so stack_def_use.def_used is is available.
-            "--with-souffle-relations",
-        ]
-        subprocess.run(cmd, timeout=60, check=True)
-
-        loaded_gtirb = gtirb.IR.load_protobuf(gtirb_path)
-        return loaded_gtirb.modules[0]
+    cmd = ddisasm_command(target, "-", relations)
+    # Decode the GTIRB straight from ddisasm's stdout instead of round-tripping
+    # it through a temporary file.
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, timeout=60, check=True)
+
+    loaded_gtirb = gtirb.IR.load_protobuf_file(io.BytesIO(proc.stdout))
+    return loaded_gtirb.modules[0]
 
 
 def asm_to_gtirb(
@@ -89,16 +120,23 @@ def asm_to_gtirb(
         return disassemble_to_gtirb(binary)
 
 
-def snippet_bounds(module: gtirb.Module) -> typing.Tuple[int, int]:
+def snippet_bounds(
+    module: typing.Union[gtirb.Module, "SnippetView"],
+    start: str = "main",
+    end: str = "main_end",
+) -> typing.Tuple[int, int]:
     """
     Get a tuple representing a snippet's address range
 
-    Works for snippets assembled with assemble_snippet
+    Works for snippets assembled with assemble_snippet, which bound the
+    snippet with the symbols `main` and `main_end`, and for the views of
+    snippets built by a SnippetBatch.
     """
-    # snippets built with assemble_snippet bound the snippet with the symbols
-    # `main` and `main_end`
+    if isinstance(module, SnippetView):
+        return module.bounds
+
     bounds = []
-    for sym_name in ("main", "main_end"):
+    for sym_name in (start, end):
         for sym in module.symbols:
             if sym.name == sym_name:
                 break
@@ -111,10 +149,231 @@ def snippet_bounds(module: gtirb.Module) -> typing.Tuple[int, int]:
         if sym.referent.address is None:
             raise SnippetTestException(f"No address: '{sym_name}'")
 
-        bounds.append(sym.referent.address)
+        address = sym.referent.address
+        if sym.at_end:
+            # e.g. `main_end` when nothing follows main in its section
+            address += sym.referent.size
+        bounds.append(address)
     return tuple(bounds)
 
 
+# Label definitions in a snippet, e.g. `.end:`.
+_LABEL_DEFINITION = re.compile(r"^\s*([A-Za-z_.$][\w.$]*):", re.MULTILINE)
+
+
+class SnippetView:
+    """
+    A snippet within a module that was built by a SnippetBatch
+
+    The labels of the snippet were renamed to be unique in the module;
+    symbols_named() looks them up by their name in the snippet.
+    """
+
+    def __init__(self, module: gtirb.Module, key: str):
+        self.module = module
+        self.key = key
+        self.bounds = snippet_bounds(
+            module, f"snippet_{key}", f"snippet_{key}_end"
+        )
+
+    def symbols_named(self, name: str) -> typing.Iterator[gtirb.Symbol]:
+        return self.module.symbols_named(f"{name}_{self.key}")
+
+
+@functools.lru_cache(maxsize=None)
+def _tool_version(tool: str) -> str:
+    proc = subprocess.run(
+        [tool, "--version"], stdout=subprocess.PIPE, check=True
+    )
+    return proc.stdout.decode(errors="replace")
+
+
+@functools.lru_cache(maxsize=None)
+def _load_module(path: str) -> gtirb.Module:
+    return gtirb.IR.load_protobuf(path).modules[0]
+
+
+class SnippetBatch:
+    """
+    Snippets that are assembled into a single binary, as separate functions,
+    and disassembled with a single ddisasm run
+
+    Each snippet is its own function, so the tuples found within its bounds
+    are the same as when it is built alone with asm_to_gtirb.
+
+    Snippets are registered with `add` or the `snippet` test decorator; the
+    first view requested builds every snippet registered so far, so tests
+    should register their snippets when their module is imported.
+
+    If `cache_dir` (by default, the DDISASM_SNIPPET_CACHE environment
+    variable) is set, the disassembled binaries are kept there and snippets
+    are only built again if their text, the toolchain, or ddisasm changed.
+    """
+
+    def __init__(
+        self,
+        arch: gtirb.Module.ISA = gtirb.Module.ISA.X64,
+        relations: typing.Sequence[str] = SNIPPET_RELATIONS,
+        cache_dir: typing.Optional[str] = os.environ.get(
+            "DDISASM_SNIPPET_CACHE"
+        ),
+    ):
+        self.arch = arch
+        self.relations = relations
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._pending: typing.Dict[str, str] = {}
+        self._views: typing.Dict[str, SnippetView] = {}
+
+    def key(self, snippet: str) -> str:
+        """
+        Get the key of a snippet, which determines its function name in the
+        batch binary
+        """
+        digest = hashlib.sha256(f"{self.arch}\0{snippet}".encode())
+        return digest.hexdigest()[:16]
+
+    def _cache_index(self, key: str) -> Path:
+        """
+        Get the cache index entry of a snippet, which names the cached
+        binary it was built in
+        """
+        compiler = arch_toolchain(self.arch)[0]
+        digest = hashlib.sha256()
+        for part in (
+            key,
+            ",".join(self.relations),
+            _tool_version(compiler),
+            _tool_version("ddisasm"),
+        ):
+            digest.update(part.encode() + b"\0")
+        return self.cache_dir / "snippets" / digest.hexdigest()
+
+    def add(self, snippet: str) -> str:
+        """
+        Register a snippet to be built with the next batch
+        """
+        key = self.key(snippet)
+        if key not in self._views:
+            self._pending[key] = snippet
+        return key
+
+    def view(self, snippet: str) -> SnippetView:
+        """
+        Get the view of a snippet, building the pending snippets if needed
+        """
+        key = self.add(snippet)
+        if key not in self._views:
+            self._build()
+        return self._views[key]
+
+    def snippet(self, snippet: str):
+        """
+        Decorate a test method to be called with the view of `snippet`
+        """
+        self.add(snippet)
+
+        def decorator(test):
+            @functools.wraps(test)
+            def wrapper(test_case):
+                return test(test_case, self.view(snippet))
+
+            return wrapper
+
+        return decorator
+
+    def _cached_path(self, key: str) -> typing.Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        try:
+            name = self._cache_index(key).read_text()
+        except OSError:
+            return None
+        path = self.cache_dir / name
+        return path if path.exists() else None
+
+    def _build(self) -> None:
+        pending = {}
+        for key, snippet in self._pending.items():
+            path = self._cached_path(key)
+            if path is not None:
+                self._views[key] = SnippetView(_load_module(str(path)), key)
+            else:
+                pending[key] = snippet
+        # Snippets stay pending if building them fails, so that each of their
+        # tests reports the failure.
+        self._pending = pending
+        if not pending:
+            return
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            binary_path = os.path.join(tmpdir, "snippets")
+            self._assemble(pending, binary_path)
+
+            gtirb_path = binary_path + ".gtirb"
+            cmd = ddisasm_command(binary_path, gtirb_path, self.relations)
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, check=True)
+
+            if self.cache_dir is not None:
+                gtirb_path = self._store(list(pending), gtirb_path)
+            module = _load_module(gtirb_path)
+
+        for key in pending:
+            self._views[key] = SnippetView(module, key)
+        self._pending = {}
+
+    def _assemble(self, snippets: typing.Dict[str, str], path: str) -> None:
+        compiler, ret, call, type_prefix = arch_toolchain(self.arch)
+
+        # Call every snippet from main so that they are all reachable.
+        calls = "\n".join(f"{call} snippet_{key}" for key in snippets)
+        functions = []
+        for key, snippet in snippets.items():
+            for label in set(_LABEL_DEFINITION.findall(snippet)):
+                snippet = re.sub(
+                    r"(?<![\w.$]){}(?![\w.$])".format(re.escape(label)),
+                    f"{label}_{key}",
+                    snippet,
+                )
+            functions.append(
+                f"""
+                .globl snippet_{key}
+                .type snippet_{key}, {type_prefix}function
+                snippet_{key}:
+                {snippet}
+                {ret}
+                .globl snippet_{key}_end
+                snippet_{key}_end:
+                """
+            )
+
+        src_path = path + ".s"
+        with open(src_path, "w") as f:
+            f.write(
+                f"""
+                .globl main
+                .type main, {type_prefix}function
+                main:
+                {calls}
+                {ret}
+                """
+            )
+            f.write("".join(functions))
+        subprocess.run([compiler, "-o", path, src_path], check=True)
+
+    def _store(self, keys: typing.List[str], gtirb_path: str) -> str:
+        """
+        Move a disassembled batch into the cache directory and index the
+        snippets it contains
+        """
+        name = self._cache_index("".join(sorted(keys))).name
+        cached_path = self.cache_dir / (name + ".gtirb")
+        (self.cache_dir / "snippets").mkdir(parents=True, exist_ok=True)
+        shutil.move(gtirb_path, str(cached_path))
+        for key in keys:
+            self._cache_index(key).write_text(cached_path.name)
+        return str(cached_path)
+
+
 def parse_field(field: str, type_spec: str) -> typing.Any:
     """
     Parse a field in a tuple
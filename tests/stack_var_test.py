@@ -2,8 +2,6 @@ import platform
 import typing
 import unittest
 
-import gtirb
-
 import snippets
 
 
@@ -18,7 +16,7 @@ stack_var_type = typing.Tuple[str, int]
 
 
 def count_stack_def_use_in_snippet(
-    module: gtirb.Module,
+    view: snippets.SnippetView,
     stack_var_pair: typing.Tuple[stack_var_type, stack_var_type] = None,
 ) -> int:
     """
@@ -27,9 +25,9 @@ def count_stack_def_use_in_snippet(
     If stack_var is None, count all in_bounds tuples.
     """
     count = 0
-    bounds = snippets.snippet_bounds(module)
+    bounds = snippets.snippet_bounds(view)
     for def_used in snippets.parse_souffle_output(
-        module, "stack_def_use.def_used"
+        view.module, "stack_def_use.def_used"
     ):
         if stack_var_pair is not None and (
             def_used[1] != stack_var_pair[0]
@@ -41,308 +39,328 @@ def count_stack_def_use_in_snippet(
     return count
 
 
+BATCH = snippets.SnippetBatch()
+
+
 class StackVarTests(unittest.TestCase):
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_def_use(self):
+    @BATCH.snippet(
+        """
+        # Define a stack frame
+        subq $32,%rsp
+
+        # Def a stack variable, and then use it.
+        movq %rax,16(%rsp)
+        movq 16(%rsp),%rax
+        """
+    )
+    def test_stack_var_def_use(self, view):
         """
         Test a simple stack var def-use within a single block.
         """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $32,%rsp
-
-            # Def a stack variable, and then use it.
-            movq %rax,16(%rsp)
-            movq 16(%rsp),%rax
-            """
-        )
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RSP", 16))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RSP", 16))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_def_use_two_blocks(self):
+    @BATCH.snippet(
         """
-        Test stack var def-use across two adjacent blocks.
-        """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $32,%rsp
+        # Define a stack frame
+        subq $32,%rsp
 
-            # Def a stack variable
-            movq %rax,16(%rsp)
+        # Def a stack variable
+        movq %rax,16(%rsp)
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Use the stack variable
-            movq 16(%rsp),%rax
+        # Use the stack variable
+        movq 16(%rsp),%rax
 
-            .end:
-            """
-        )
+        .end:
+        """
+    )
+    def test_stack_var_def_use_two_blocks(self, view):
+        """
+        Test stack var def-use across two adjacent blocks.
+        """
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RSP", 16))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RSP", 16))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_def_use_two_uses(self):
+    @BATCH.snippet(
         """
-        Test stack var def-use where a single def has two uses.
-        """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $32,%rsp
+        # Define a stack frame
+        subq $32,%rsp
 
-            # Def a stack variable
-            movq %rax,16(%rsp)
+        # Def a stack variable
+        movq %rax,16(%rsp)
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Use the stack variable
-            movq 16(%rsp),%rax
+        # Use the stack variable
+        movq 16(%rsp),%rax
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Use the stack variable again
-            movq 16(%rsp),%rax
+        # Use the stack variable again
+        movq 16(%rsp),%rax
 
-            .end:
-            """
-        )
+        .end:
+        """
+    )
+    def test_stack_var_def_use_two_uses(self, view):
+        """
+        Test stack var def-use where a single def has two uses.
+        """
         self.assertEqual(
             2,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RSP", 16))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RSP", 16))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_adjustment_intrablock(self):
-        """
-        Test stack var def-use within a block with a stack pointer adjustment.
+    @BATCH.snippet(
         """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $32,%rsp
+        # Define a stack frame
+        subq $32,%rsp
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Adjust
-            subq $24,%rsp
+        # Adjust
+        subq $24,%rsp
 
-            # Use the stack variable
-            movq 40(%rsp),%rax
+        # Use the stack variable
+        movq 40(%rsp),%rax
 
-            .end:
-            """
-        )
+        .end:
+        """
+    )
+    def test_stack_var_adjustment_intrablock(self, view):
+        """
+        Test stack var def-use within a block with a stack pointer adjustment.
+        """
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RSP", 40))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RSP", 40))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_adjustment_intrablock_split(self):
+    @BATCH.snippet(
         """
-        Test stack var def-use within a block before two stack pointer
-        adjustments
-        """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $32,%rsp
+        # Define a stack frame
+        subq $32,%rsp
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Adjustment split in two parts
-            subq $12,%rsp
-            subq $12,%rsp
+        # Adjustment split in two parts
+        subq $12,%rsp
+        subq $12,%rsp
 
-            # Use the stack variable
-            movq 40(%rsp),%rax
+        # Use the stack variable
+        movq 40(%rsp),%rax
 
-            # Adjust again (should be irrelvant)
-            subq $8,%rsp
+        # Adjust again (should be irrelvant)
+        subq $8,%rsp
 
-            .end:
-            """
-        )
+        .end:
+        """
+    )
+    def test_stack_var_adjustment_intrablock_split(self, view):
+        """
+        Test stack var def-use within a block before two stack pointer
+        adjustments
+        """
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RSP", 40))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RSP", 40))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_adjustment_intrablock_between_adjustments(self):
-        """
-        Test stack var def-use within a block between two stack pointer
-        adjustments
+    @BATCH.snippet(
         """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $12,%rsp
+        # Define a stack frame
+        subq $12,%rsp
 
-            # Adjust/redefine (same block)
-            subq $8,%rsp
+        # Adjust/redefine (same block)
+        subq $8,%rsp
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Adjust the stack frame
-            subq $24,%rsp
+        # Adjust the stack frame
+        subq $24,%rsp
 
-            # Use the stack variable
-            movq 40(%rsp),%rax
-            """
-        )
+        # Use the stack variable
+        movq 40(%rsp),%rax
+        """
+    )
+    def test_stack_var_adjustment_intrablock_between_adjustments(self, view):
+        """
+        Test stack var def-use within a block between two stack pointer
+        adjustments
+        """
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RSP", 40))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RSP", 40))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_def_and_adjust_then_used(self):
-        """
-        Test stack var def-use where a stack var is defined and the frame is
-        adjusted in a block, and then it is used in a later block.
+    @BATCH.snippet(
         """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $12,%rsp
+        # Define a stack frame
+        subq $12,%rsp
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Adjust stack frame
-            subq $24,%rsp
+        # Adjust stack frame
+        subq $24,%rsp
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Use the stack variable
-            movq 40(%rsp),%rax
+        # Use the stack variable
+        movq 40(%rsp),%rax
 
-            .end:
-            """
-        )
+        .end:
+        """
+    )
+    def test_stack_var_def_and_adjust_then_used(self, view):
+        """
+        Test stack var def-use where a stack var is defined and the frame is
+        adjusted in a block, and then it is used in a later block.
+        """
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RSP", 40))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RSP", 40))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_def_then_adjust_and_used(self):
+    @BATCH.snippet(
         """
-        Test stack var def-use where a stack var is defined, and then the frame
-        adjusted and the var used in a later block.
-        """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $12,%rsp
+        # Define a stack frame
+        subq $12,%rsp
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Adjust stack frame
-            subq $24,%rsp
+        # Adjust stack frame
+        subq $24,%rsp
 
-            # Use the stack variable
-            movq 40(%rsp),%rax
+        # Use the stack variable
+        movq 40(%rsp),%rax
 
-            .end:
-            """
-        )
+        .end:
+        """
+    )
+    def test_stack_var_def_then_adjust_and_used(self, view):
+        """
+        Test stack var def-use where a stack var is defined, and then the frame
+        adjusted and the var used in a later block.
+        """
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RSP", 40))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RSP", 40))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_def_adjust_used(self):
+    @BATCH.snippet(
         """
-        Test stack var def-use where a stack var is defined, adjusted, and then
-        used in separate blocks.
-        """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $12,%rsp
+        # Define a stack frame
+        subq $12,%rsp
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Adjust stack frame
-            subq $24,%rsp
+        # Adjust stack frame
+        subq $24,%rsp
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Use the stack variable
-            movq 40(%rsp),%rax
+        # Use the stack variable
+        movq 40(%rsp),%rax
 
-            .end:
-            """
-        )
+        .end:
+        """
+    )
+    def test_stack_var_def_adjust_used(self, view):
+        """
+        Test stack var def-use where a stack var is defined, adjusted, and then
+        used in separate blocks.
+        """
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RSP", 40))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RSP", 40))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_move_base_reg_intrablock(self):
+    @BATCH.snippet(
+        """
+        # Define a stack frame
+        subq $12,%rsp
+
+        # Define a stack variable
+        movq %rax,16(%rsp)
+
+        # Move stack pointer to frame pointer
+        movq %rsp,%rbp
+
+        # Use the stack variable via the frame pointer
+        movq 16(%rbp),%rax
+
+        .end:
+        """
+    )
+    def test_stack_var_move_base_reg_intrablock(self, view):
         """
         Test stack var def-use where a stack var is defined, and the stack
         pointer is moved to the frame pointer.
@@ -350,330 +368,313 @@ class StackVarTests(unittest.TestCase):
         A MIPS-specific rule for this pattern used to exist, but it has been
         made redudant with arch-generic recognition.
         """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $12,%rsp
-
-            # Define a stack variable
-            movq %rax,16(%rsp)
-
-            # Move stack pointer to frame pointer
-            movq %rsp,%rbp
-
-            # Use the stack variable via the frame pointer
-            movq 16(%rbp),%rax
-
-            .end:
-            """
-        )
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RBP", 16))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RBP", 16))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_move_base_reg_interblock1(self):
+    @BATCH.snippet(
         """
-        Test stack var def-use where a stack var is defined, and the stack
-        pointer is moved to the frame pointer.
+        # Define a stack frame
+        subq $12,%rsp
 
-        In this case, the def and move occur in the same block, but not the use
-        """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $12,%rsp
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Move stack pointer to frame pointer
+        movq %rsp,%rbp
 
-            # Move stack pointer to frame pointer
-            movq %rsp,%rbp
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Use the stack variable via the frame pointer
+        movq 16(%rbp),%rax
 
-            # Use the stack variable via the frame pointer
-            movq 16(%rbp),%rax
+        .end:
+        """
+    )
+    def test_stack_var_move_base_reg_interblock1(self, view):
+        """
+        Test stack var def-use where a stack var is defined, and the stack
+        pointer is moved to the frame pointer.
 
-            .end:
-            """
-        )
+        In this case, the def and move occur in the same block, but not the use
+        """
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RBP", 16))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RBP", 16))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_move_base_reg_interblock2(self):
+    @BATCH.snippet(
         """
-        Test stack var def-use where a stack var is defined, and the stack
-        pointer is moved to the frame pointer.
+        # Define a stack frame
+        subq $12,%rsp
 
-        In this case, the def occurs in one block, and the move and use in
-        another.
-        """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $12,%rsp
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Move stack pointer to frame pointer
+        movq %rsp,%rbp
 
-            # Move stack pointer to frame pointer
-            movq %rsp,%rbp
+        # Use the stack variable via the frame pointer
+        movq 16(%rbp),%rax
 
-            # Use the stack variable via the frame pointer
-            movq 16(%rbp),%rax
+        .end:
+        """
+    )
+    def test_stack_var_move_base_reg_interblock2(self, view):
+        """
+        Test stack var def-use where a stack var is defined, and the stack
+        pointer is moved to the frame pointer.
 
-            .end:
-            """
-        )
+        In this case, the def occurs in one block, and the move and use in
+        another.
+        """
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RBP", 16))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RBP", 16))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_move_base_reg_interblock3(self):
+    @BATCH.snippet(
         """
-        Test stack var def-use where a stack var is defined, and the stack
-        pointer is moved to the frame pointer.
+        # Define a stack frame
+        subq $12,%rsp
 
-        In this case, the def, move, and use occur in different blocks.
-        """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $12,%rsp
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Move stack pointer to frame pointer
+        movq %rsp,%rbp
 
-            # Move stack pointer to frame pointer
-            movq %rsp,%rbp
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Use the stack variable via the frame pointer
+        movq 16(%rbp),%rax
 
-            # Use the stack variable via the frame pointer
-            movq 16(%rbp),%rax
+        .end:
+        """
+    )
+    def test_stack_var_move_base_reg_interblock3(self, view):
+        """
+        Test stack var def-use where a stack var is defined, and the stack
+        pointer is moved to the frame pointer.
 
-            .end:
-            """
-        )
+        In this case, the def, move, and use occur in different blocks.
+        """
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RBP", 16))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RBP", 16))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_adjustment_intrablock_redef(self):
+    @BATCH.snippet(
         """
-        Test stack var def-use within a block with a stack pointer adjustment.
-        """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $32,%rsp
+        # Define a stack frame
+        subq $32,%rsp
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Adjust
-            subq $24,%rsp
+        # Adjust
+        subq $24,%rsp
 
-            # Redefine stack pointer (not an adjustment)
-            movq %rax,%rsp
+        # Redefine stack pointer (not an adjustment)
+        movq %rax,%rsp
 
-            # Use the stack variable
-            movq 40(%rsp),%rax
+        # Use the stack variable
+        movq 40(%rsp),%rax
 
-            .end:
-            """
-        )
+        .end:
+        """
+    )
+    def test_stack_var_adjustment_intrablock_redef(self, view):
+        """
+        Test stack var def-use within a block with a stack pointer adjustment.
+        """
 
         # There should be no def_used for snippet
-        self.assertEqual(0, count_stack_def_use_in_snippet(module))
+        self.assertEqual(0, count_stack_def_use_in_snippet(view))
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_stack_var_adjustment_interblock_redef_after_use(self):
-        """
-        Test stack var def-use with adjustment where the stack pointer is
-        redefined after a use.
+    @BATCH.snippet(
         """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $32,%rsp
+        # Define a stack frame
+        subq $32,%rsp
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Adjust
-            subq $24,%rsp
+        # Adjust
+        subq $24,%rsp
 
-            # Use the stack variable
-            movq 40(%rsp),%rax
+        # Use the stack variable
+        movq 40(%rsp),%rax
 
-            # Redefine stack pointer (not an adjustment)
-            movq %rax,%rsp
+        # Redefine stack pointer (not an adjustment)
+        movq %rax,%rsp
 
-            .end:
-            """
-        )
+        .end:
+        """
+    )
+    def test_stack_var_adjustment_interblock_redef_after_use(self, view):
+        """
+        Test stack var def-use with adjustment where the stack pointer is
+        redefined after a use.
+        """
 
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RSP", 40))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RSP", 40))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_adjusted_killing_use(self):
-        """
-        Test that a definition before adjustment
-        kills the corresponding use.
+    @BATCH.snippet(
         """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $32,%rsp
+        # Define a stack frame
+        subq $32,%rsp
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Redefine (the later use is killed and should not be
-            # matched with the previous definition)
-            movq %rax,16(%rsp)
+        # Redefine (the later use is killed and should not be
+        # matched with the previous definition)
+        movq %rax,16(%rsp)
 
-            # Adjust
-            subq $24,%rsp
+        # Adjust
+        subq $24,%rsp
 
-            # Use the stack variable
-            movq 40(%rsp),%rax
+        # Use the stack variable
+        movq 40(%rsp),%rax
 
-            .end:
-            """
-        )
+        .end:
+        """
+    )
+    def test_adjusted_killing_use(self, view):
+        """
+        Test that a definition before adjustment
+        kills the corresponding use.
+        """
 
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RSP", 40))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RSP", 40))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_adjusted_killing_def(self):
-        """
-        Test that a definition before adjustment
-        is killed by the definition after the adjustment.
+    @BATCH.snippet(
         """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $32,%rsp
+        # Define a stack frame
+        subq $32,%rsp
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Adjust
-            subq $24,%rsp
+        # Adjust
+        subq $24,%rsp
 
-            # Redefine, this kills the previous definition.
-            movq %rax,40(%rsp)
+        # Redefine, this kills the previous definition.
+        movq %rax,40(%rsp)
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Use the stack variable
-            movq 40(%rsp),%rax
+        # Use the stack variable
+        movq 40(%rsp),%rax
 
-            .end:
-            """
-        )
+        .end:
+        """
+    )
+    def test_adjusted_killing_def(self, view):
+        """
+        Test that a definition before adjustment
+        is killed by the definition after the adjustment.
+        """
 
         self.assertEqual(
             0,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RSP", 40))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RSP", 40))),
         )
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 40), ("RSP", 40))),
+            count_stack_def_use_in_snippet(view, (("RSP", 40), ("RSP", 40))),
         )
 
     @unittest.skipUnless(
         platform.system() == "Linux", "This test is linux only."
     )
-    def test_adjusted_killing_use_intrablock(self):
-        """
-        Test that a definition before adjustment
-        kills the corresponding use.
+    @BATCH.snippet(
         """
-        module = snippets.asm_to_gtirb(
-            """
-            # Define a stack frame
-            subq $32,%rsp
+        # Define a stack frame
+        subq $32,%rsp
 
-            # Define a stack variable
-            movq %rax,16(%rsp)
+        # Define a stack variable
+        movq %rax,16(%rsp)
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Redefine (the later use is killed and should not be
-            # matched with the previous definition)
-            movq %rax,16(%rsp)
+        # Redefine (the later use is killed and should not be
+        # matched with the previous definition)
+        movq %rax,16(%rsp)
 
-            # Adjust
-            subq $24,%rsp
+        # Adjust
+        subq $24,%rsp
 
-            # Add control flow (splits blocks)
-            test $0, %rax
-            je .end
+        # Add control flow (splits blocks)
+        test $0, %rax
+        je .end
 
-            # Use the stack variable
-            movq 40(%rsp),%rax
+        # Use the stack variable
+        movq 40(%rsp),%rax
 
-            .end:
-            """
-        )
+        .end:
+        """
+    )
+    def test_adjusted_killing_use_intrablock(self, view):
+        """
+        Test that a definition before adjustment
+        kills the corresponding use.
+        """
 
         self.assertEqual(
             1,
-            count_stack_def_use_in_snippet(module, (("RSP", 16), ("RSP", 40))),
+            count_stack_def_use_in_snippet(view, (("RSP", 16), ("RSP", 40))),
         )
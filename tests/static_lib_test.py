@@ -169,3 +169,38 @@ class TestStaticLib(unittest.TestCase):
                         link(re_compiler, "ex", ["ex.o", binary], re_flags)
                     )
                     self.assertTrue(test(wrapper))
+
+    @unittest.skipUnless(
+        platform.system() == "Linux", "This test is linux only."
+    )
+    def test_module_workers(self):
+        """
+        Disassembling the members of an archive concurrently gives the same
+        results as disassembling them one at a time.
+        """
+        modules = [
+            "msg_one",
+            "msg_two",
+            "msg_three",
+            "msg_four_with_a_long_name",
+        ]
+        with cd(ex_dir / "ex_static_lib"):
+            self.assertTrue(compile("gcc", "g++", "-O0", []))
+
+            outputs = {}
+            for workers in ("1", "2"):
+                asm_dir = Path("libmsg-workers-" + workers)
+                self.assertTrue(
+                    disassemble(
+                        "libmsg.a",
+                        str(asm_dir),
+                        format="--asm",
+                        extra_args=["--module-workers", workers],
+                    )[0]
+                )
+                outputs[workers] = {
+                    name: (asm_dir / (name + ".s")).read_text()
+                    for name in modules
+                }
+
+            self.assertEqual(outputs["1"], outputs["2"])
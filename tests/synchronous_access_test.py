@@ -55,7 +55,10 @@ class SynchronousAccessTests(unittest.TestCase):
                     binary,
                     format="--ir",
                     strip=True,
-                    extra_args=["--with-souffle-relations"],
+                    extra_args=[
+                        "--souffle-relations-filter",
+                        "disassembly.preferred_data_access",
+                    ],
                 )[0]
             )
 
@@ -98,7 +101,10 @@ class SynchronousAccessTests(unittest.TestCase):
                     binary,
                     format="--ir",
                     strip=True,
-                    extra_args=["--with-souffle-relations"],
+                    extra_args=[
+                        "--souffle-relations-filter",
+                        "disassembly.synchronous_access",
+                    ],
                 )[0]
             )
 
@@ -34,7 +34,10 @@ class ValueRegTests(unittest.TestCase):
                     binary,
                     format="--ir",
                     strip=False,
-                    extra_args=["--with-souffle-relations"],
+                    extra_args=[
+                        "--souffle-relations-filter",
+                        "disassembly.value_reg",
+                    ],
                 )[0]
             )
 